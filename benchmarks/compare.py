@@ -0,0 +1,37 @@
+import json
+from typing import Any
+
+import click
+
+
+def compare(baseline: dict[str, Any], current: dict[str, Any]) -> list[tuple[str, int, float, float, float]]:
+  """(case, rows, baseline best, current best, ratio) for every case and size present in both results."""
+  previous = {(r['case'], r['rows']): r['best'] for r in baseline['results']}
+  return [
+    (r['case'], r['rows'], previous[(r['case'], r['rows'])], r['best'], r['best'] / previous[(r['case'], r['rows'])])
+    for r in current['results'] if (r['case'], r['rows']) in previous and previous[(r['case'], r['rows'])] > 0
+  ]
+
+
+@click.command()
+@click.argument("baseline", type=click.Path(exists=True))
+@click.argument("current", type=click.Path(exists=True))
+@click.option("--threshold", "-t", type=float, default=1.2, help="Slowdown ratio reported as a regression")
+def main(baseline: str, current: str, threshold: float) -> None:
+  """Compares two result files from `benchmarks.run`, failing if any case got slower than THRESHOLD times."""
+  with open(baseline) as b, open(current) as c:
+    base, curr = json.load(b), json.load(c)
+  click.echo(f"{'case':>20} {'rows':>8} {base['label']:>12} {curr['label']:>12}  ratio")
+  regressions = 0
+  for case, rows, before, after, ratio in compare(base, curr):
+    flag = ""
+    if ratio > threshold:
+      regressions += 1
+      flag = click.style("  REGRESSION", fg="red")
+    click.echo(f"{case:>20} {rows:>8} {before:>12.4f} {after:>12.4f}  {ratio:.2f}{flag}")
+  if regressions:
+    raise click.ClickException(f"{regressions} cases are slower than {threshold}x the baseline")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,210 @@
+import datetime
+import json
+import logging
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import click
+from sqlalchemy import create_engine
+
+from benchmarks.stub_tws import StubbedPlaceOrders
+from salduba.common.persistence.alchemy.db import Db
+from salduba.common.persistence.alchemy.repo import RecordBase
+from salduba.corvino.io.parse_input import InputParser, InputRow
+from salduba.corvino.io.results_out import ResultsBatch
+from salduba.corvino.io.synthetic import SyntheticUniverse
+from salduba.corvino.persistence.movement_record import MovementRecord2, MovementRecordOps
+from salduba.corvino.services.app import CorvinoApp
+from salduba.ib_tws_proxy.contracts.contract_repo import ContractRecordOps, DeltaNeutralContractOps
+from salduba.ib_tws_proxy.domain.enumerations import Exchange
+from salduba.ib_tws_proxy.orders.OrderRepo import OrderRecordOps
+
+_logger = logging.getLogger(__name__)
+
+default_sizes = [100, 1_000, 10_000, 100_000]
+
+
+class Workspace:
+  """Synthetic inputs and a seeded DB for one size. Each case run gets its own copy of the DB."""
+
+  def __init__(self, root: Path, rows: int) -> None:
+    self.root = root
+    self.rows = rows
+    self.universe = SyntheticUniverse(rows)
+    self.csv = self.universe.write(root.joinpath(f"movements_{rows}.csv"))
+    self._xlsx: Optional[Path] = None
+    self._template = root.joinpath(f"template_{rows}.db")
+    self.universe.seed_contracts(self._db_at(self._template, create=True))
+    self._copies = 0
+
+  @property
+  def xlsx(self) -> Path:
+    if not self._xlsx:
+      self._xlsx = self.universe.write(self.root.joinpath(f"movements_{self.rows}.xlsx"))
+    return self._xlsx
+
+  @staticmethod
+  def _db_at(path: Path, create: bool = False) -> Db:
+    engine = create_engine(f"sqlite:///{path.absolute()}")
+    if create:
+      RecordBase.metadata.create_all(engine)
+    return Db(engine)
+
+  def fresh_app(self) -> CorvinoApp:
+    self._copies += 1
+    copy = self.root.joinpath(f"run_{self.rows}_{self._copies}.db")
+    shutil.copyfile(self._template, copy)
+    app = CorvinoApp(
+      db=self._db_at(copy),
+      contract_repo=ContractRecordOps(),
+      dnc_repo=DeltaNeutralContractOps(),
+      movements_repo=MovementRecordOps(),
+      order_repo=OrderRecordOps(),
+      appFamily=1000)
+    app.placement_proxy = StubbedPlaceOrders
+    return app
+
+  def input_rows(self) -> list[InputRow]:
+    return InputParser.input_rows_from(str(self.csv))
+
+  def movements(self) -> list[MovementRecord2]:
+    app = self.fresh_app()
+    with app.db.for_work() as uow:
+      return app._prepare_movements(
+        "bench", "BENCH", datetime.datetime.now(), self.input_rows(), False, uow, override_exchange=Exchange.SMART)
+
+
+@dataclass
+class Case:
+  name: str
+  # Builds the state the measured operation needs, not measured.
+  setup: Callable[[Workspace], Any]
+  run: Callable[[Workspace, Any], Any]
+  max_rows: Optional[int] = None
+
+
+def _verify(ws: Workspace, state: tuple[CorvinoApp, list[InputRow]]) -> None:
+  app, rows = state
+  with app.db.for_work() as uow:
+    rs = app.verify_contracts_for_input_rows(rows, uow)
+    assert not rs.unknown, f"{len(rs.unknown)} synthetic contracts did not verify"
+
+
+def _prepare(ws: Workspace, state: tuple[CorvinoApp, list[InputRow]]) -> None:
+  app, rows = state
+  with app.db.for_work() as uow:
+    app._prepare_movements("bench", "BENCH", datetime.datetime.now(), rows, False, uow, override_exchange=Exchange.SMART)
+
+
+def _write_xlsx(ws: Workspace, state: tuple[list[InputRow], list[MovementRecord2]]) -> None:
+  rows, movements = state
+  ResultsBatch(datetime.datetime.now(), "Benchmark", rows, [], [], [], movements, {}) \
+    .write_xlsx(str(ws.root.joinpath(f"results_{ws.rows}.xlsx")))
+
+
+def _place(ws: Workspace, state: tuple[CorvinoApp, list[InputRow]]) -> None:
+  app, rows = state
+  with app.db.for_work() as uow:
+    rs = app.place_orders(rows, uow, f"bench_{ws.rows}", "BENCH", execute_trades=False)
+    assert len(rs.movements) == len(rows), rs.message
+
+
+cases = [
+  Case('parse_csv', lambda ws: None, lambda ws, _: InputParser.input_rows_from(str(ws.csv))),
+  Case('parse_xlsx', lambda ws: ws.xlsx, lambda ws, path: InputParser.input_rows_from(str(path)), max_rows=10_000),
+  Case('verify_contracts', lambda ws: (ws.fresh_app(), ws.input_rows()), _verify),
+  Case('prepare_movements', lambda ws: (ws.fresh_app(), ws.input_rows()), _prepare),
+  Case('write_xlsx', lambda ws: (ws.input_rows(), ws.movements()), _write_xlsx),
+  Case('to_order', lambda ws: ws.movements(), lambda ws, movements: [m.order.toOrder() for m in movements]),
+  Case('place_orders', lambda ws: (ws.fresh_app(), ws.input_rows()), _place, max_rows=10_000),
+]
+
+
+def measure(case: Case, ws: Workspace, repeat: int, memory: bool) -> dict[str, Any]:
+  times: list[float] = []
+  for _ in range(repeat):
+    state = case.setup(ws)
+    start = time.perf_counter()
+    case.run(ws, state)
+    times.append(time.perf_counter() - start)
+  result: dict[str, Any] = {
+    'case': case.name,
+    'rows': ws.rows,
+    'times': times,
+    'best': min(times),
+    'median': statistics.median(times),
+    'rows_per_sec': ws.rows / min(times) if min(times) > 0 else None,
+    'peak_bytes': None
+  }
+  if memory:
+    state = case.setup(ws)
+    tracemalloc.start()
+    try:
+      case.run(ws, state)
+      result['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+    finally:
+      tracemalloc.stop()
+  return result
+
+
+def _label() -> str:
+  try:
+    return subprocess.run(
+      ['git', 'describe', '--always', '--dirty'], capture_output=True, text=True, check=True).stdout.strip()
+  except (OSError, subprocess.CalledProcessError):
+    return "unknown"
+
+
+def run_suite(
+    sizes: list[int],
+    repeat: int = 3,
+    memory: bool = True,
+    only: Optional[list[str]] = None,
+    label: Optional[str] = None,
+    work_dir: Optional[Path] = None) -> dict[str, Any]:
+  results: list[dict[str, Any]] = []
+  with tempfile.TemporaryDirectory(dir=work_dir) as tmp_dir:
+    for rows in sizes:
+      ws = Workspace(Path(tmp_dir), rows)
+      for case in cases:
+        if (only and case.name not in only) or (case.max_rows and rows > case.max_rows):
+          continue
+        _logger.info(f"Running {case.name} for {rows} rows")
+        results.append(measure(case, ws, repeat, memory))
+        click.echo(f"{case.name:>20} {rows:>8} rows: best {results[-1]['best']:.4f}s")
+  return {
+    'label': label if label else _label(),
+    'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+    'python': platform.python_version(),
+    'platform': platform.platform(),
+    'repeat': repeat,
+    'results': results
+  }
+
+
+@click.command()
+@click.option("--sizes", "-s", type=int, multiple=True, help=f"Rows per synthetic file, default: {default_sizes}")
+@click.option("--repeat", "-r", type=int, default=3, help="Timed runs per case and size")
+@click.option("--memory/--no-memory", default=True, help="Also measure the peak of traced allocations in an extra run")
+@click.option(
+  "--case", "-c", "only", multiple=True, type=click.Choice([c.name for c in cases]), help="Cases to run, all by default")
+@click.option("--label", type=str, required=False, help="Label for the results, default: `git describe`")
+@click.option("--output", "-o", type=click.Path(), required=True, help="JSON file to store the results in")
+def main(sizes: tuple[int, ...], repeat: int, memory: bool, only: tuple[str, ...], label: Optional[str], output: str) -> None:
+  """Runs the benchmark cases over synthetic movement files and stores the results as JSON."""
+  results = run_suite(list(sizes) if sizes else default_sizes, repeat, memory, list(only), label)
+  with open(output, 'w') as f:
+    json.dump(results, f, indent=2)
+  click.echo(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+  main()
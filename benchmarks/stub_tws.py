@@ -0,0 +1,73 @@
+import queue
+from typing import Any, Callable
+
+from ibapi.client import EClient  # pyright: ignore
+from ibapi.contract import Contract  # pyright: ignore
+from ibapi.order import Order  # pyright: ignore
+from ibapi.order_state import OrderState  # pyright: ignore
+from ibapi.server_versions import MAX_CLIENT_VER  # pyright: ignore
+
+from salduba.ib_tws_proxy.orders.placing_orders import PlaceOrders
+
+
+class _StubConnection:
+  """Stands in for `ibapi.connection.Connection`: accepts the encoded messages and drops them."""
+
+  def __init__(self) -> None:
+    self.sent = 0
+
+  def isConnected(self) -> bool:
+    return True
+
+  def sendMsg(self, msg: bytes) -> int:
+    self.sent += 1
+    return len(msg)
+
+  def disconnect(self) -> None:
+    pass
+
+
+class StubbedPlaceOrders(PlaceOrders):
+  """
+  `PlaceOrders` against an in-process stand-in for TWS.
+
+  Requests still go through `EClient` message encoding and the operations tracker. Instead of a socket, the
+  stub answers each `placeOrder` with `openOrder` and `orderStatus` callbacks and `reqOpenOrders` with
+  `openOrderEnd`, delivered from the listener thread as TWS would.
+  """
+  stub_status = "PreSubmitted"
+
+  def __init__(self, *args: Any, **kwargs: Any) -> None:
+    super().__init__(*args, **kwargs)
+    self._callbacks: queue.SimpleQueue[Callable[[], None]] = queue.SimpleQueue()
+
+  def connect(self, host: str, port: int, clientId: int) -> None:
+    self.host = host
+    self.port = port
+    self.clientId = clientId
+    self.conn = _StubConnection()
+    self.serverVersion_ = MAX_CLIENT_VER
+    self.connTime = "stub"
+    self.setConnState(EClient.CONNECTED)
+
+  def run(self) -> None:
+    self.managedAccounts("DU0000000")
+    self.nextValidId(1)
+    while not self.done:
+      try:
+        callback = self._callbacks.get(timeout=0.05)
+      except queue.Empty:
+        continue
+      callback()
+
+  def placeOrder(self, orderId: int, contract: Contract, order: Order) -> None:
+    super().placeOrder(orderId, contract, order)
+    state = OrderState()
+    state.status = self.stub_status
+    self._callbacks.put(lambda: self.openOrder(orderId, contract, order, state))
+    self._callbacks.put(lambda: self.orderStatus(
+      orderId, self.stub_status, 0.0, float(order.totalQuantity), 0.0, orderId, 0, 0.0, self.clientId, "", 0.0))
+
+  def reqOpenOrders(self) -> None:
+    super().reqOpenOrders()
+    self._callbacks.put(self.openOrderEnd)
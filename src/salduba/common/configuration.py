@@ -5,14 +5,16 @@ import os
 import shutil
 from contextlib import AbstractContextManager
 from dataclasses import dataclass, field
+from enum import StrEnum
 from importlib import resources as lib_res
 from importlib.abc import Traversable
 from pathlib import Path
-from typing import Any, Optional
+from typing import TYPE_CHECKING, Any, Optional
 
 import click
-import yaml
-from platformdirs import PlatformDirs, PlatformDirsABC
+
+if TYPE_CHECKING:
+  from platformdirs import PlatformDirsABC
 
 _logger = logging.getLogger(__name__)
 
@@ -27,6 +29,14 @@ class Meta:
 
   override_config_path: Optional[Path] = None
 
+  # Resolved paths, filled on first use. Resolving probes several candidate directories, which is slow on network
+  # mounted home directories, so it is done once per `Meta` until `invalidate` is called.
+  _resolved: dict[Any, Any] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+  def invalidate(self) -> None:
+    """Forgets the resolved directories and files so that they are looked up again on next use."""
+    self._resolved.clear()
+
   @property
   def config_dir_path(self) -> Path:
     return self.override_config_path if self.override_config_path else Path(self.home, f".{self.app_id}")
@@ -51,10 +61,17 @@ class Meta:
   output_key = "output"
   db_key = "db"
   tws_key = "tws"
+  risk_key = "risk"
+  market_data_key = "market_data"
+  historical_key = "historical"
 
   @property
-  def platform(self) -> PlatformDirsABC:
-    return PlatformDirs(self.app_id)
+  def platform(self) -> 'PlatformDirsABC':
+    if 'platform' not in self._resolved:
+      from platformdirs import PlatformDirs
+      self._resolved['platform'] = PlatformDirs(self.app_id)
+    platform: PlatformDirsABC = self._resolved['platform']
+    return platform
 
   @property
   def log_config_path(self) -> Path:
@@ -65,6 +82,12 @@ class Meta:
     return self.resolve_configuration_file(self.config_file_name, self.default_config_file_context)
 
   def resolve_configuration_dir(self) -> Path:
+    if 'config_dir' not in self._resolved:
+      self._resolved['config_dir'] = self._resolve_configuration_dir()
+    config_dir: Path = self._resolved['config_dir']
+    return config_dir
+
+  def _resolve_configuration_dir(self) -> Path:
     config_dir_candidates: list[Path] = [
       self.config_dir_path,
       self.home,
@@ -80,6 +103,13 @@ class Meta:
     return self.config_dir_path
 
   def resolve_configuration_file(self, file_name: str, default_contents: AbstractContextManager[Path]) -> Path:
+    key = ('config_file', file_name)
+    if key not in self._resolved:
+      self._resolved[key] = self._resolve_configuration_file(file_name, default_contents)
+    config_file: Path = self._resolved[key]
+    return config_file
+
+  def _resolve_configuration_file(self, file_name: str, default_contents: AbstractContextManager[Path]) -> Path:
     config_dir = self.resolve_configuration_dir()
     candidate = config_dir.joinpath(file_name)
     if candidate.is_dir():
@@ -122,6 +152,13 @@ class Meta:
   #   return file_path
 
   def resolve_storage_file(self, storage_name: str, override_dir: Optional[str] = None) -> Path:
+    key = ('storage_file', storage_name, override_dir)
+    if key not in self._resolved:
+      self._resolved[key] = self._resolve_storage_file(storage_name, override_dir)
+    storage_file: Path = self._resolved[key]
+    return storage_file
+
+  def _resolve_storage_file(self, storage_name: str, override_dir: Optional[str] = None) -> Path:
     if override_dir:
       storage_path = Path(override_dir).joinpath(storage_name)
     else:
@@ -151,6 +188,8 @@ class Meta:
 
   @property
   def resolve_config(self) -> 'Cfg':
+    import yaml
+
     config_file = self.config_file_path
     with open(config_file, 'r') as cf:
       dictCfg = yaml.safe_load(cf.read())
@@ -223,39 +262,42 @@ class InputConfig:
     return InputConfig(**d)
 
 
+class OutputFormat(StrEnum):
+  XLSX = "xlsx"
+  CSV = "csv"
+  JSONL = "jsonl"
+  PARQUET = "parquet"
+
+
 @dataclass
 class OutputConfig:
   output_dir: Path = Path.cwd()
   file_prefix: str = "cervino_command_output"
   file_name: str = file_prefix + '.xlsx'
+  format: OutputFormat = OutputFormat.XLSX
   inputs_sheet: str = "inputs"
   known_sheet: str = "known"
   updated_sheet: str = "updated"
   missing_sheet: str = "missing"
   movement_sheet: str = "movement"
   error_sheet: str = "errors"
+  preview_sheet: str = "preview"
+  margin_sheet: str = "margin"
+  exposure_sheet: str = "exposure"
+  violation_sheet: str = "violations"
+  position_sheet: str = "positions"
 
   @staticmethod
   def configure(meta: Meta, values: dict[str, Any]) -> 'OutputConfig':
     d: dict[str, Any] = {}
     if 'output_dir' in values:
       d['output_dir'] = Path(values['output_dir'])
-    if 'file_prefix' in values:
-      d['file_prefix'] = values['file_prefix']
-    if 'file_name' in values:
-      d['file_name'] = values['file_name']
-    if 'inputs_sheet' in values:
-      d['inputs_sheet'] = values['inputs_sheet']
-    if 'known_sheet' in values:
-      d['known_sheet'] = values['known_sheet']
-    if 'updated_sheet' in values:
-      d['updated_sheet'] = values['updated_sheet']
-    if 'missing_sheet' in values:
-      d['missing_sheet'] = values['missing_sheet']
-    if 'movement_sheet' in values:
-      d['movement_sheet'] = values['movement_sheet']
-    if 'error_sheet' in values:
-      d['error_sheet'] = values['error_sheet']
+    if 'format' in values:
+      d['format'] = OutputFormat(values['format'])
+    for k in ['file_prefix', 'file_name', 'inputs_sheet', 'known_sheet', 'updated_sheet', 'missing_sheet', 'movement_sheet',
+              'error_sheet', 'preview_sheet', 'margin_sheet', 'exposure_sheet', 'violation_sheet', 'position_sheet']:
+      if k in values:
+        d[k] = values[k]
     return OutputConfig(**d)
 
 
@@ -304,6 +346,94 @@ class DbConfig:
     return DbConfig(**d)
 
 
+class RiskMode(StrEnum):
+  BLOCK = "block"  # Violations stop the placement of the batch
+  FLAG = "flag"  # Violations are reported and the batch is placed
+  OFF = "off"
+
+
+@dataclass
+class RiskConfig:
+  """
+  Limits of the pre-trade checks of a batch, see `salduba.corvino.services.pre_trade`. Notionals are in `base_currency`,
+  converted with `fx_rates` (units of `base_currency` per unit of each currency). Limits left out are not checked.
+  """
+  mode: RiskMode = RiskMode.BLOCK
+  base_currency: str = "USD"
+  fx_rates: dict[str, float] = field(default_factory=dict)
+  max_order_quantity: Optional[float] = None
+  max_order_notional: Optional[float] = None
+  max_turnover: Optional[float] = None
+  max_name_weight: Optional[float] = None
+  max_notional_by_currency: dict[str, float] = field(default_factory=dict)
+  max_notional_by_country: dict[str, float] = field(default_factory=dict)
+  max_notional_by_exchange: dict[str, float] = field(default_factory=dict)
+
+  @property
+  def needs_prices(self) -> bool:
+    return bool(
+      self.max_order_notional is not None or self.max_turnover is not None or self.max_name_weight is not None
+      or self.max_notional_by_currency or self.max_notional_by_country or self.max_notional_by_exchange)
+
+  @staticmethod
+  def configure(meta: Meta, values: dict[str, Any]) -> 'RiskConfig':
+    d: dict[str, Any] = {}
+    if 'mode' in values:
+      d['mode'] = RiskMode(values['mode'])
+    if 'base_currency' in values:
+      d['base_currency'] = values['base_currency']
+    for k in ['max_order_quantity', 'max_order_notional', 'max_turnover', 'max_name_weight']:
+      if values.get(k) is not None:
+        d[k] = float(values[k])
+    for k in ['fx_rates', 'max_notional_by_currency', 'max_notional_by_country', 'max_notional_by_exchange']:
+      if values.get(k):
+        d[k] = {str(key): float(v) for key, v in values[k].items()}
+    return RiskConfig(**d)
+
+
+@dataclass
+class MarketDataConfig:
+  """
+  Snapshots of market prices: reused for `staleness` seconds, of the TWS `market_data_type` (1 live, 2 frozen, 3 delayed,
+  4 delayed frozen) and with at most `max_lines` requests open at once, within the market data lines of the account.
+  """
+  staleness: int = 60
+  market_data_type: int = 1
+  max_lines: int = 90
+
+  @staticmethod
+  def configure(meta: Meta, values: dict[str, Any]) -> 'MarketDataConfig':
+    d: dict[str, Any] = {}
+    for k in ['staleness', 'market_data_type', 'max_lines']:
+      if values.get(k) is not None:
+        d[k] = int(values[k])
+    return MarketDataConfig(**d)
+
+
+@dataclass
+class HistoricalConfig:
+  """
+  Historical bars from TWS, stored under `storage_name` in the data directory, of `what_to_show` (TRADES, MIDPOINT, BID,
+  ASK, ...), within regular trading hours with `use_rth` and with at most `max_open` requests open at once.
+  """
+  storage_name: str = "bars"
+  what_to_show: str = "TRADES"
+  use_rth: bool = True
+  max_open: int = 50
+
+  @staticmethod
+  def configure(meta: Meta, values: dict[str, Any]) -> 'HistoricalConfig':
+    d: dict[str, Any] = {}
+    for k in ['storage_name', 'what_to_show']:
+      if values.get(k):
+        d[k] = str(values[k])
+    if values.get('use_rth') is not None:
+      d['use_rth'] = bool(values['use_rth'])
+    if values.get('max_open') is not None:
+      d['max_open'] = int(values['max_open'])
+    return HistoricalConfig(**d)
+
+
 @dataclass
 class Cfg:
   meta: Meta = field(default_factory=(lambda : defaultMeta))
@@ -313,6 +443,9 @@ class Cfg:
   output: OutputConfig = field(default_factory=(lambda : OutputConfig()))
   db: DbConfig = field(default_factory=(lambda : DbConfig()))
   tws: TwsConfig = field(default_factory=(lambda : TwsConfig()))
+  risk: RiskConfig = field(default_factory=(lambda : RiskConfig()))
+  market_data: MarketDataConfig = field(default_factory=(lambda : MarketDataConfig()))
+  historical: HistoricalConfig = field(default_factory=(lambda : HistoricalConfig()))
 
   @staticmethod
   def configure(meta: Meta, values: dict[str, Any]) -> 'Cfg':
@@ -327,6 +460,12 @@ class Cfg:
       d[meta.db_key] = DbConfig.configure(meta, values[meta.db_key])
     if meta.tws_key in values:
       d[meta.tws_key] = TwsConfig.configure(meta, values[meta.tws_key])
+    if values.get(meta.risk_key):
+      d[meta.risk_key] = RiskConfig.configure(meta, values[meta.risk_key])
+    if values.get(meta.market_data_key):
+      d[meta.market_data_key] = MarketDataConfig.configure(meta, values[meta.market_data_key])
+    if values.get(meta.historical_key):
+      d[meta.historical_key] = HistoricalConfig.configure(meta, values[meta.historical_key])
     return Cfg(**d)
 
 
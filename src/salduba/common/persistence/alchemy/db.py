@@ -5,6 +5,8 @@ from sqlalchemy import ExecutableDDLElement, MetaData, create_engine, create_moc
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
 
+from salduba.util import tracing
+
 
 class UnitOfWork:
   def __init__(self, session: Session) -> None:
@@ -22,7 +24,8 @@ class UnitOfWork:
 
   def checkpoint(self) -> None:
     if self.session and self.session.is_active:
-      self.session.commit()
+      with tracing.span("db commit", "db"):
+        self.session.commit()
     else:
       raise Exception("Cannot commit an inactive UnitOfWork")
 
@@ -57,7 +60,8 @@ class Db:
       raise exc
     finally:
       if self.session and self.session.is_active:
-        self.session.commit()
+        with tracing.span("db commit", "db"):
+          self.session.commit()
         self.session.close()
       self.session = None
 
@@ -1,18 +1,64 @@
+import hashlib
 import logging
-
-from pyway.migrate import Migrate  # type: ignore
-from pyway.settings import ConfigFile  # type: ignore
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import Optional
 
 from salduba.common.configuration import DbConfig
+from salduba.util import tracing
 
 _logger = logging.getLogger(__name__)
 
+_fingerprint_table = 'schema_fingerprint'
+
+
+def migrations_fingerprint(migration_dir: str) -> tuple[str, str]:
+  """The latest migration version and a hash over the names and contents of all migration files."""
+  files = sorted(p for p in Path(migration_dir).iterdir() if p.suffix == '.sql')
+  digest = hashlib.sha256()
+  for f in files:
+    digest.update(f.name.encode())
+    digest.update(f.read_bytes())
+  return (files[-1].name.split('__')[0] if files else ''), digest.hexdigest()
+
+
+def _stored_fingerprint(db_file: str) -> Optional[tuple[str, str]]:
+  with closing(sqlite3.connect(db_file)) as conn:
+    try:
+      row = conn.execute(f"SELECT version, migrations_hash FROM {_fingerprint_table}").fetchone()
+    except sqlite3.OperationalError:
+      return None
+  return (row[0], row[1]) if row else None
 
+
+def _store_fingerprint(db_file: str, fingerprint: tuple[str, str]) -> None:
+  with closing(sqlite3.connect(db_file)) as conn, conn:
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {_fingerprint_table} (version TEXT NOT NULL, migrations_hash TEXT NOT NULL)")
+    conn.execute(f"DELETE FROM {_fingerprint_table}")
+    conn.execute(f"INSERT INTO {_fingerprint_table} (version, migrations_hash) VALUES (?, ?)", fingerprint)
+
+
+@tracing.traced("migrate db")
 def init_db(configuration: DbConfig) -> None:
+  """
+  Migrates the DB with pyway unless the migrations recorded at the last successful run are the same as the
+  ones shipped now, in which case the (much slower) pyway run is skipped.
+  """
+  db_file = str(configuration.storage_path.absolute())
+  fingerprint = migrations_fingerprint(configuration.migration_path)
+  if _stored_fingerprint(db_file) == fingerprint:
+    _logger.debug(f"Schema of {db_file} is current at {fingerprint[0]}, skipping migrations")
+    return
+
+  from pyway.migrate import Migrate  # type: ignore
+  from pyway.settings import ConfigFile  # type: ignore
+
   config = ConfigFile()
   config.database_type = 'sqlite'
-  config.database_name = str(configuration.storage_path.absolute())
+  config.database_name = db_file
   config.database_table = 'pyway_info'
   config.database_migration_dir = configuration.migration_path
 
   _logger.info(Migrate(config).run())
+  _store_fingerprint(db_file, fingerprint)
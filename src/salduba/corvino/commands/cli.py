@@ -1,36 +1,55 @@
 import logging
+import re
 from datetime import datetime
-from importlib import metadata
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any, Optional
 
 import click
 
 from salduba.common.configuration import Cfg, InputConfig, Meta, defaultMeta
-from salduba.common.persistence.alchemy.db import Db, UnitOfWork
-from salduba.common.persistence.alchemy.repo import RecordBase
-from salduba.common.persistence.pyway.migrating import init_db
-from salduba.corvino.io.parse_input import InputParser, InputRow
-from salduba.corvino.io.results_out import ResultsBatch
-from salduba.corvino.persistence.movement_record import MovementRecordOps
-from salduba.corvino.services.app import CorvinoApp
-from salduba.ib_tws_proxy.contracts.contract_repo import ContractRecordOps, DeltaNeutralContractOps
-from salduba.ib_tws_proxy.orders.OrderRepo import OrderRecordOps
-from salduba.util.logging import init_logging
+from salduba.corvino.commands import client, profiling
+
+# Only `click` and the configuration are imported eagerly so that `--help`, `--version` and argument errors answer
+# without loading pandas, openpyxl, SQLAlchemy or ibapi. Each command imports what it needs when it runs.
+if TYPE_CHECKING:
+  from salduba.common.persistence.alchemy.db import UnitOfWork
+  from salduba.corvino.io.parse_input import InputRow
+  from salduba.corvino.io.results_out import ResultsBatch
+  from salduba.corvino.services.app import CorvinoApp
+  from salduba.ib_tws_proxy.orders.slicing import SlicingPolicy
 
 initial_configuration = defaultMeta
 
 __app_name__ = 'salduba_corvino'
-__version__ = metadata.version(__app_name__)
 
+_logger = logging.getLogger(__name__)
 
-with initial_configuration.log_config_path as l_path:
-  init_logging(l_path)
 
-_logger = logging.getLogger(__name__)
+def __getattr__(name: str) -> Any:
+  if name == '__version__':
+    return app_version()
+  raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def app_version() -> str:
+  from importlib import metadata
+  return metadata.version(__app_name__)
 
 
-def build_app(configuration: Cfg) -> CorvinoApp:
+def build_app(configuration: Cfg) -> 'CorvinoApp':
+  from salduba.common.persistence.alchemy.db import Db
+  from salduba.common.persistence.pyway.migrating import init_db
+  from salduba.corvino.persistence.movement_record import MovementRecordOps
+  from salduba.corvino.services.app import CorvinoApp
+  from salduba.ib_tws_proxy.contracts.contract_repo import ContractRecordOps, DeltaNeutralContractOps
+  from salduba.ib_tws_proxy.executions.execution_repo import ExecutionRecordOps
+  from salduba.ib_tws_proxy.historical.bar_store import BarStore
+  from salduba.ib_tws_proxy.market_data.price_repo import MarketPriceOps
+  from salduba.ib_tws_proxy.orders.OrderRepo import OrderRecordOps
+  from salduba.ib_tws_proxy.orders.placement_journal import PlacementIntentOps
+  from salduba.ib_tws_proxy.positions.position_repo import PositionRecordOps
+  from salduba.util.logging import init_logging
+
   init_logging(configuration.meta.log_config_path)
 
   init_db(configuration.db)
@@ -46,13 +65,42 @@ def build_app(configuration: Cfg) -> CorvinoApp:
     order_repo=OrderRecordOps(),
     appFamily=1000,
     host=configuration.tws.host,
-    port=configuration.tws.port)
+    port=configuration.tws.port,
+    execution_repo=ExecutionRecordOps(),
+    intent_repo=PlacementIntentOps(),
+    position_repo=PositionRecordOps(),
+    price_repo=MarketPriceOps(),
+    market_data=configuration.market_data,
+    bar_store=BarStore(configuration.cervino.data_dir.joinpath(configuration.historical.storage_name)),
+    historical=configuration.historical)
+  return app
+
+
+def app_for(ctx: click.Context) -> 'CorvinoApp':
+  """The application for the invocation, built on first use so that sub-command `--help` does not open the DB."""
+  if 'app' not in ctx.obj:
+    ctx.obj['app'] = build_app(ctx.obj['config'])
+  app: CorvinoApp = ctx.obj['app']
   return app
 
 
+def print_version(ctx: click.Context, param: click.Option | click.Parameter, value: Any) -> None:
+  if not value or ctx.resilient_parsing:
+    return
+  click.echo(f"{ctx.info_name}, version {app_version()}")
+  ctx.exit()
+
+
 @click.group(invoke_without_command=True, no_args_is_help=True)
 @click.pass_context
-@click.version_option()
+@click.option(
+  "--version",
+  is_flag=True,
+  expose_value=False,
+  is_eager=True,
+  help="Show the version and exit.",
+  callback=print_version
+)
 @click.option(
   "--config", "-c",
   type=str,
@@ -60,17 +108,79 @@ def build_app(configuration: Cfg) -> CorvinoApp:
   help="Path to the configuration file to use",
   callback=Meta.config_path
 )
+@click.option(
+  "--profile",
+  type=click.Choice(profiling.modes),
+  required=False,
+  help="Profile the command with cProfile, tracemalloc or both, in all its threads. Reports are written next to the output file"
+)
+@click.option(
+  "--trace",
+  is_flag=True,
+  help="Record a timeline of the command in Chrome Trace Event format, written next to the output file"
+)
 def cli(
     ctx: click.Context,
-    config: str
+    config: str,
+    profile: Optional[str],
+    trace: bool
     ) -> None:
-  config_path = Path(config)
-  meta = Meta(override_config_path=config_path.parent)
-  cfg = meta.resolve_config
-  click.echo(f"{__app_name__}, v{__version__}")
+  from salduba.util import tracing
+  from salduba.util.logging import init_logging
   ctx.ensure_object(dict)
+  if trace:
+    start_tracing(ctx)
+  init_logging(initial_configuration.log_config_path)
+
+  with tracing.span("load configuration"):
+    config_path = Path(config)
+    meta = Meta(override_config_path=config_path.parent)
+    cfg = meta.resolve_config
+  click.echo(f"{__app_name__}, v{app_version()}")
   ctx.obj['config'] = cfg
-  ctx.obj['app'] = build_app(cfg)
+  if profile:
+    start_profiling(ctx, profile)
+
+
+def _report_tag(ctx: click.Context) -> str:
+  """The batch name when the sub-command has one, otherwise the sub-command name and a timestamp."""
+  tag = ctx.obj.get('batch', f"{ctx.invoked_subcommand}_{datetime.now().strftime('%Y%m%d%H%M%S')}")
+  return re.sub(r'[^A-Za-z0-9_.-]', '_', tag)
+
+
+def start_tracing(ctx: click.Context) -> None:
+  """
+  Traces the rest of the invocation, writing the timeline as `<output file stem>_<tag>.trace.json` next to the
+  output file when the context closes.
+  """
+  from salduba.util import tracing
+  tracing.start()
+
+  def write_trace() -> None:
+    tracer = tracing.stop()
+    if tracer and 'config' in ctx.obj:
+      output = Path(ctx.obj['config'].output.file_name).absolute()
+      trace_file = tracer.write(output.with_name(f"{output.stem}_{_report_tag(ctx)}.trace.json"))
+      click.echo(f"Trace written to: {trace_file}", err=True)
+
+  ctx.call_on_close(write_trace)
+
+
+def start_profiling(ctx: click.Context, mode: str) -> None:
+  """
+  Profiles the rest of the invocation, writing the reports next to the output file when the context closes,
+  after the sub-command has finished or failed.
+  """
+  cfg: Cfg = ctx.obj['config']
+  output = Path(cfg.output.file_name).absolute()
+  profiler = profiling.CommandProfiler(mode, output.parent, output.stem)
+
+  def write_reports() -> None:
+    for report in profiler.stop(_report_tag(ctx)):
+      click.echo(f"Profile written to: {report}", err=True)
+
+  ctx.call_on_close(write_reports)
+  profiler.start()
 
 
 @cli.command(
@@ -80,10 +190,60 @@ def cli(
 )
 @click.pass_context
 def dump_ddl(ctx: click.Context) -> None:
-  app: CorvinoApp = ctx.obj['app']
+  from salduba.common.persistence.alchemy.repo import RecordBase
+  app: CorvinoApp = app_for(ctx)
   app.db.print_schema(RecordBase.metadata)
 
 
+@cli.command(
+  help=click.style("USE FOR DEVELOPMENT ONLY", fg="bright_red") + """\n
+    Generates a synthetic movements file (csv or xlsx, from the suffix of OUTPUT_FILE) for load testing,
+    with tickers spread over all the supported countries.
+  """
+)
+@click.option("--rows", "-n", type=click.IntRange(min=1), default=1000, help="Rows in the file, default: 1000")
+@click.option(
+  "--duplicates",
+  type=click.FloatRange(0, 1),
+  default=0.0,
+  help="Ratio of rows that repeat the ticker of an earlier row, default: 0"
+)
+@click.option(
+  "--unknown",
+  type=click.FloatRange(0, 1),
+  default=0.0,
+  help="Ratio of rows with a ticker that has no contract, default: 0"
+)
+@click.option("--seed", type=int, default=7, help="Random seed, the same seed gives the same file. Default: 7")
+@click.option(
+  "--seed-contracts",
+  is_flag=True,
+  help=click.style("Writes into the configured DB.", fg="bright_red") + " Stores a current contract for each known ticker"
+)
+@click.argument("output-file", required=True, type=click.Path(dir_okay=False))
+@click.pass_context
+def generate_movements(
+    ctx: click.Context,
+    rows: int,
+    duplicates: float,
+    unknown: float,
+    seed: int,
+    seed_contracts: bool,
+    output_file: str) -> None:
+  from salduba.corvino.io.synthetic import SyntheticUniverse
+
+  cfg: Cfg = ctx.obj['config']
+  try:
+    universe = SyntheticUniverse(rows, duplicates, unknown, seed)
+    universe.write(Path(output_file), cfg.input.sheet_name)
+  except ValueError as vError:
+    raise click.UsageError(str(vError))
+  click.echo(f"Wrote {rows} movements to {output_file}: {universe.known} known and {universe.unknown} unknown tickers")
+  if seed_contracts:
+    app: CorvinoApp = app_for(ctx)
+    click.echo(f"Stored {universe.seed_contracts(app.db)} contracts in {cfg.db.storage_path}")
+
+
 @cli.command()
 @click.argument(
   "input-movements-file",
@@ -99,7 +259,7 @@ def verify_contracts(ctx: click.Context, input_movements_file: str) -> None:
 
   This command works locally and does not need to have TWS running.
   """
-  app: CorvinoApp = ctx.obj['app']
+  app: CorvinoApp = app_for(ctx)
 
   cfg: Cfg = ctx.obj['config']
   cfg.input.file_name = input_movements_file
@@ -119,7 +279,7 @@ def verify_contracts(ctx: click.Context, input_movements_file: str) -> None:
       _logger.info(msg)
     else:
       click.echo("No missing contracts")
-    rs.write_xlsx()
+    rs.write()
 
 
 @cli.command()
@@ -133,11 +293,11 @@ def verify_contracts(ctx: click.Context, input_movements_file: str) -> None:
 def lookup_contracts(ctx: click.Context, input_movements_file: str) -> None:
   cfg: Cfg = ctx.obj['config']
   cfg.input.file_name = input_movements_file
-  app: CorvinoApp = ctx.obj['app']
+  app: CorvinoApp = app_for(ctx)
 
   with app.db.for_work() as uow:
-    rs = _do_lookup_contracts(ctx.obj['app'], cfg, uow)
-    rs.write_xlsx()
+    rs = _do_lookup_contracts(app, cfg, uow)
+    rs.write()
     if rs.unknown:
       if rs.errors:
         click.echo(rs.errors)
@@ -152,7 +312,8 @@ def batch_name(ctx: click.Context, param: click.Option | click.Parameter, value:
   assert isinstance(value, str) or value is None
   nowT = datetime.now()
   configured: Cfg = ctx.obj['config']
-  return value if value else f"{configured.cervino.batch_prefix}_{nowT.strftime('%Y%m%d%H%M%S')}"
+  ctx.obj['batch'] = value if value else f"{configured.cervino.batch_prefix}_{nowT.strftime('%Y%m%d%H%M%S')}"
+  return str(ctx.obj['batch'])
 
 
 def resolved_allocation(ctx: click.Context, param: click.Option | click.Parameter, value: Any) -> str:
@@ -185,6 +346,33 @@ def resolved_allocation(ctx: click.Context, param: click.Option | click.Paramete
     expected to execute them if appropriate using the TWS UI itself
   """
 )
+@click.option("--max-clip", type=click.IntRange(min=1), required=False, help="Slice orders in child orders of at most this size")
+@click.option("--slices", type=click.IntRange(min=1), required=False, help="Slice each order in at least this many child orders")
+@click.option(
+  "--max-adv-pct",
+  type=click.FloatRange(0, 100),
+  required=False,
+  help="Slice orders in child orders of at most this percentage of the average daily volume in --adv-file"
+)
+@click.option(
+  "--adv-file",
+  type=click.Path(exists=True, dir_okay=False),
+  required=False,
+  help="CSV file with the average daily volume of the securities, in columns 'Ticker' and 'ADV'"
+)
+@click.option(
+  "--slice-interval",
+  type=click.IntRange(min=1),
+  required=False,
+  help="Minutes between the activation of consecutive child orders. Default: all active at once"
+)
+@click.option(
+  "--prices-file",
+  type=click.Path(exists=True, dir_okay=False),
+  required=False,
+  help="CSV file with the prices of the securities, in columns 'Ticker' and 'Price', for the notional pre-trade checks. "
+  "Default: a market snapshot from TWS when the risk limits need prices"
+)
 @click.argument(
   "input-movements-file",
   required=True,
@@ -192,11 +380,31 @@ def resolved_allocation(ctx: click.Context, param: click.Option | click.Paramete
   callback=InputConfig.input_path
 )
 @click.pass_context
-def place_orders(ctx: click.Context, batch: str, allocation: str, execute_trades: bool, input_movements_file: str) -> None:
+def place_orders(
+    ctx: click.Context,
+    batch: str,
+    allocation: str,
+    execute_trades: bool,
+    max_clip: Optional[int],
+    slices: Optional[int],
+    max_adv_pct: Optional[float],
+    adv_file: Optional[str],
+    slice_interval: Optional[int],
+    prices_file: Optional[str],
+    input_movements_file: str) -> None:
+  """
+  Places an order for each movement in INPUT_MOVEMENTS_FILE. With any of `--max-clip`, `--slices` or `--max-adv-pct`,
+  orders are sliced in smaller child orders, optionally activated `--slice-interval` minutes apart.
+
+  The batch is first checked against the `risk` limits of the configuration file.
+  """
+  slicing = slicing_policy(max_clip, slices, max_adv_pct, adv_file, slice_interval)
+  adv = read_adv(adv_file) if adv_file else None
+  prices = read_prices(prices_file) if prices_file else None
   configured: Cfg = ctx.obj['config']
   configured.input.file_name = input_movements_file
   configured.cervino.allocation = allocation
-  app: CorvinoApp = ctx.obj['app']
+  app: CorvinoApp = app_for(ctx)
   with app.db.for_work() as uow:
     rs = _do_lookup_contracts(app, ctx.obj['config'], uow)
     if not rs.unknown:
@@ -214,10 +422,15 @@ def place_orders(ctx: click.Context, batch: str, allocation: str, execute_trades
 
       if confirmation:
         try:
-          order_rs = app.place_orders(rs.inputs, uow, batch, allocation, execute_trades)
-          order_rs.write_xlsx()
+          order_rs = app.place_orders(
+            rs.inputs, uow, batch, allocation, execute_trades, slicing, adv, configured.risk, prices)
+          order_rs.write()
           error_keys = [k.upper() for k in rs.errors.keys()]
-          if "ERRORS" in error_keys:
+          if order_rs.violations and not order_rs.movements:
+            _logger.error(order_rs.message)
+            click.echo("Please see the output file for the violations")
+            raise click.ClickException(order_rs.message)
+          elif "ERRORS" in error_keys:
             click.echo("Errors while placing Orders. Please look at the log files for information", err=True)
             click.echo(f"Current Active Logs: {[h.name for h in _logger.handlers]}", err=True)
             _logger.error(order_rs.message)
@@ -230,12 +443,466 @@ def place_orders(ctx: click.Context, batch: str, allocation: str, execute_trades
           raise click.ClickException(f"An error occurred: {str(exc)}")
       else:
         click.echo("User did not confirm: Abandoning Operation")
-        rs.write_xlsx()
+        rs.write()
     else:
-      rs.write_xlsx()
+      rs.write()
+
+
+@cli.command()
+@click.option(
+  "--allocation",
+  type=str,
+  required=False,
+  help="The Allocation of the batch of orders to a portfolio. Default from Configuration File",
+  callback=resolved_allocation
+)
+@click.argument(
+  "input-movements-file",
+  required=True,
+  type=click.Path(exists=True),
+  callback=InputConfig.input_path
+)
+@click.pass_context
+def preview_batch(ctx: click.Context, allocation: str, input_movements_file: str) -> None:
+  """
+  Previews the margin and commission impact of the orders for the movements in INPUT_MOVEMENTS_FILE, without placing
+  them. The impact of each order and the totals per currency are written to the output file.
+  """
+  configured: Cfg = ctx.obj['config']
+  configured.input.file_name = input_movements_file
+  configured.cervino.allocation = allocation
+  app: CorvinoApp = app_for(ctx)
+  with app.db.for_work() as uow:
+    rs = _do_lookup_contracts(app, configured, uow)
+    if rs.unknown:
+      rs.write()
+      return
+    try:
+      preview_rs = app.preview_orders(rs.inputs, uow, allocation)
+    except Exception as exc:
+      raise click.ClickException(f"An error occurred: {str(exc)}")
+  preview_rs.write()
+  margins = preview_rs.margins
+  if preview_rs.errors.get('error') or (margins and (margins[-1].projected_excess or 0.0) < 0):
+    _logger.error(preview_rs.message)
+    click.echo("Please see the output file for details")
+    raise click.ClickException(preview_rs.message)
+  click.echo(preview_rs.message)
+  _logger.info(preview_rs.message)
+
+
+@cli.command()
+@click.argument("batch", required=True, type=str)
+@click.pass_context
+def resume_batch(ctx: click.Context, batch: str) -> None:
+  """
+  Places the orders of BATCH that TWS does not know, after a `place-orders` that was interrupted. Safe to repeat.
+  """
+  ctx.obj['batch'] = batch
+  app: CorvinoApp = app_for(ctx)
+  with app.db.for_work() as uow:
+    _write_changes(app.resume_batch(batch, uow))
 
 
-def _do_lookup_contracts(app: CorvinoApp, cfg: Cfg, uow: UnitOfWork) -> ResultsBatch:
+@cli.command()
+@click.argument("batch", required=True, type=str)
+@click.pass_context
+def cancel_batch(ctx: click.Context, batch: str) -> None:
+  """
+  Cancels the orders of BATCH, as placed by `place-orders`, that are still open in TWS.
+  """
+  ctx.obj['batch'] = batch
+  app: CorvinoApp = app_for(ctx)
+  with app.db.for_work() as uow:
+    _write_changes(app.cancel_batch(batch, uow))
+
+
+@cli.command()
+@click.option(
+  "--limit-prices",
+  type=click.Path(exists=True, dir_okay=False),
+  required=False,
+  help="CSV file with columns 'Ticker' and 'LimitPrice'. The orders of these tickers become limit orders at that price"
+)
+@click.option(
+  "--limit-offset",
+  type=click.FloatRange(min=0),
+  required=False,
+  help="The orders become marketable limit orders at the ask for buys and the bid for sells, from a market snapshot, "
+  "this many basis points beyond"
+)
+@click.option("--market", is_flag=True, help="The orders become market orders again")
+@click.option(
+  "--transmit",
+  is_flag=True,
+  help=click.style("USE WITH CAUTION!!!!", fg="bright_red") + " Transmits the orders to be executed"
+)
+@click.argument("batch", required=True, type=str)
+@click.pass_context
+def modify_batch(
+    ctx: click.Context,
+    limit_prices: Optional[str],
+    limit_offset: Optional[float],
+    market: bool,
+    transmit: bool,
+    batch: str) -> None:
+  """
+  Modifies the orders of BATCH, as placed by `place-orders`, that are still open in TWS.
+  """
+  if [bool(market), bool(limit_prices), limit_offset is not None].count(True) > 1:
+    raise click.UsageError("Use only one of --market, --limit-prices or --limit-offset")
+  if not (market or limit_prices or limit_offset is not None or transmit):
+    raise click.UsageError("Nothing to modify, use --limit-prices, --limit-offset, --market and/or --transmit")
+  prices = read_limit_prices(limit_prices) if limit_prices else None
+  if transmit and not click.confirm(
+      f"Modifying Orders of {batch} " + click.style("WITH DIRECT EXECUTION!!", fg="bright_red") + "\n\tDo you want to continue?"):
+    click.echo("User did not confirm: Abandoning Operation")
+    return
+  ctx.obj['batch'] = batch
+  app: CorvinoApp = app_for(ctx)
+  with app.db.for_work() as uow:
+    if limit_offset is not None:
+      prices, errors = app.snapshot_limit_prices(batch, uow, limit_offset)
+      if errors.get('error'):
+        raise click.ClickException(
+          f"Errors[{len(errors['error'])}] taking a snapshot of the market prices. Please look at the log files for information")
+    _write_changes(app.modify_batch(batch, uow, prices, market, transmit))
+
+
+def read_limit_prices(prices_file: str) -> dict[str, float]:
+  return read_by_ticker(prices_file, 'LimitPrice', "limit prices")
+
+
+def _write_changes(changes_rs: 'ResultsBatch') -> None:
+  changes_rs.write()
+  if changes_rs.errors.get('error'):
+    _logger.error(changes_rs.message)
+    click.echo("Please see the output file for details")
+    raise click.ClickException(f"{changes_rs.message}, with {len(changes_rs.errors['error'])} errors")
+  click.echo(changes_rs.message)
+  _logger.info(changes_rs.message)
+
+
+@cli.command()
+@click.option(
+  "--batch",
+  type=str,
+  required=False,
+  help="Only the executions of the orders of this batch. Default: all the executions"
+)
+@click.option(
+  "--since",
+  type=str,
+  required=False,
+  help="Executions since this time, as 'YYYYMMDD HH:MM:SS' in the time zone of TWS. Default: since the last stored one"
+)
+@click.pass_context
+def capture_executions(ctx: click.Context, batch: Optional[str], since: Optional[str]) -> None:
+  """
+  Stores the executions reported by TWS, and their commissions.
+  """
+  if since and not re.fullmatch(r"\d{8} \d{2}:\d{2}:\d{2}", since):
+    raise click.UsageError(f"--since must be 'YYYYMMDD HH:MM:SS', not '{since}'")
+  if batch:
+    ctx.obj['batch'] = batch
+  app: CorvinoApp = app_for(ctx)
+  with app.db.for_work() as uow:
+    executions, commissions, errors = app.capture_executions(uow, batch, since)
+  if errors.get('error'):
+    raise click.ClickException(
+      f"Errors[{len(errors['error'])}] capturing executions. Please look at the log files for information")
+  info_msg = f"{executions} Executions and {commissions} Commissions stored"
+  _logger.info(info_msg)
+  click.echo(info_msg)
+
+
+@cli.command()
+@click.option(
+  "--allocation",
+  type=str,
+  required=False,
+  help="The account of the positions. Default from Configuration File, all the accounts when not configured",
+  callback=resolved_allocation
+)
+@click.option(
+  "--ttl",
+  type=click.IntRange(min=0),
+  default=300,
+  help="Seconds that a snapshot of the positions is reused before requesting a new one from TWS. Default: 300"
+)
+@click.option("--refresh", is_flag=True, help="Requests a new snapshot of the positions even if the stored one is valid")
+@click.argument("batch", required=True, type=str)
+@click.pass_context
+def check_positions(ctx: click.Context, allocation: str, ttl: int, refresh: bool, batch: str) -> None:
+  """
+  Reconciles the movements of BATCH with the positions of the account: the sells that would leave a position short
+  and the trades already executed, as stored by `capture-executions`. Fails if any sell would leave a position short.
+  """
+  from salduba.corvino.services.positions import PositionIssue
+
+  ctx.obj['batch'] = batch
+  app: CorvinoApp = app_for(ctx)
+  with app.db.for_work() as uow:
+    positions_rs = app.check_positions(batch, uow, allocation, ttl * 1000, refresh)
+  positions_rs.write()
+  if positions_rs.errors.get('error'):
+    raise click.ClickException(
+      f"Errors[{len(positions_rs.errors['error'])}] requesting the positions. Please look at the output file for details")
+  if any(c.issue in (PositionIssue.OVER_SELL, PositionIssue.SHORT) for c in positions_rs.positions):
+    _logger.error(positions_rs.message)
+    click.echo("Please see the output file for details")
+    raise click.ClickException(positions_rs.message)
+  click.echo(positions_rs.message)
+  _logger.info(positions_rs.message)
+
+
+@cli.command()
+@click.option(
+  "--allocation",
+  type=str,
+  required=False,
+  help="The account of the positions. Default from Configuration File, all the accounts when not configured",
+  callback=resolved_allocation
+)
+@click.option(
+  "--prices-file",
+  type=click.Path(exists=True, dir_okay=False),
+  required=True,
+  help="CSV file with the prices of the securities, in columns 'Ticker' and 'Price'"
+)
+@click.option(
+  "--lots-file",
+  type=click.Path(exists=True, dir_okay=False),
+  required=False,
+  help="CSV file with the lot sizes of the securities, in columns 'Ticker' and 'Lot'. Default: lots of 1"
+)
+@click.option(
+  "--nav",
+  type=click.FloatRange(min=0),
+  required=False,
+  help="Net asset value to rebalance, in the base currency. Default: the value of the positions in the target names"
+)
+@click.option(
+  "--min-notional",
+  type=click.FloatRange(min=0),
+  default=0.0,
+  help="Trades below this value in the base currency are not made. Default: 0"
+)
+@click.option(
+  "--min-weight-change",
+  type=click.FloatRange(min=0, max=1),
+  default=0.0,
+  help="Names closer than this fraction of the net asset value to their target are not traded. Default: 0"
+)
+@click.option("--refresh", is_flag=True, help="Requests a new snapshot of the positions even if the stored one is valid")
+@click.argument("targets-file", required=True, type=click.Path(exists=True, dir_okay=False))
+@click.argument("output-file", required=True, type=click.Path(dir_okay=False))
+@click.pass_context
+def rebalance(
+    ctx: click.Context,
+    allocation: str,
+    prices_file: str,
+    lots_file: Optional[str],
+    nav: Optional[float],
+    min_notional: float,
+    min_weight_change: float,
+    refresh: bool,
+    targets_file: str,
+    output_file: str) -> None:
+  """
+  Computes the trades that take the positions of the account to the target weights of TARGETS_FILE, a CSV file with
+  columns 'Ticker' and 'Weight', and writes them to OUTPUT_FILE as a movements file for `place-orders`. Prices are
+  converted to the base currency with the `fx_rates` of the `risk` section of the configuration file.
+
+  Positions in names that are not in TARGETS_FILE are neither valued nor traded, give them a weight of 0 to close them.
+  They are reported and, for an `.xlsx` OUTPUT_FILE, listed in its `Untargeted` sheet.
+  """
+  import pandas as pd
+
+  from salduba.corvino.services.rebalance import RebalancePolicy
+
+  configured: Cfg = ctx.obj['config']
+  weights = pd.Series(read_by_ticker(targets_file, 'Weight', "target weights"), dtype=float)
+  prices = read_prices(prices_file)
+  lots = {t: int(v) for t, v in read_by_ticker(lots_file, 'Lot', "lot sizes").items()} if lots_file else None
+  rates = {**configured.risk.fx_rates, configured.risk.base_currency: 1.0}
+  app: CorvinoApp = app_for(ctx)
+  with app.db.for_work() as uow:
+    try:
+      trades, outside, errors = app.rebalance(
+        weights, uow, prices, rates, lots, allocation, RebalancePolicy(nav, min_notional, min_weight_change), refresh)
+    except ValueError as error:
+      raise click.ClickException(str(error))
+  if errors.get('error'):
+    raise click.ClickException(
+      f"Errors[{len(errors['error'])}] requesting the positions. Please look at the log files for information")
+  movements = trades.loc[trades['Trade'] != 0, ['Trade'] + [c for c in trades.columns if c != 'Trade']]
+  if output_file.endswith('.xlsx'):
+    with pd.ExcelWriter(output_file) as writer:
+      movements.to_excel(writer, sheet_name=configured.input.sheet_name)
+      if len(outside):
+        outside.to_frame().to_excel(writer, sheet_name='Untargeted')
+  else:
+    movements.to_csv(output_file)
+  info_msg = f"{len(movements)} of {len(trades)} names to trade written to {output_file}"
+  _logger.info(info_msg)
+  click.echo(info_msg)
+  if len(outside):
+    click.echo(
+      f"Positions in {len(outside)} names without a target weight are not traded: "
+      f"{', '.join(f'{symbol} ({currency})' for symbol, currency in outside.index)}")
+
+
+@cli.command()
+@click.option(
+  "--bar-size",
+  type=str,
+  default="1 day",
+  help="The size of the bars: '1 min', '5 mins', '15 mins', '30 mins', '1 hour' or '1 day'. Default: '1 day'"
+)
+@click.option(
+  "--since",
+  type=click.DateTime(formats=["%Y-%m-%d"]),
+  required=False,
+  help="The bars since this date, as 'YYYY-MM-DD'. Default: one year ago"
+)
+@click.option(
+  "--con-id",
+  type=int,
+  multiple=True,
+  help="Only the bars of the contract with this conId, can be repeated. Default: all the known contracts"
+)
+@click.pass_context
+def top_up_bars(ctx: click.Context, bar_size: str, since: Optional[datetime], con_id: tuple[int, ...]) -> None:
+  """
+  Stores the historical bars from TWS of the known contracts, as found by `lookup-contracts`, that are not stored yet,
+  for rebalancing and analytics to read without requesting them again.
+  """
+  from datetime import timedelta
+
+  from salduba.ib_tws_proxy.historical.bar_store import bar_seconds
+
+  try:
+    bar_seconds(bar_size)
+  except ValueError as error:
+    raise click.UsageError(str(error))
+  app: CorvinoApp = app_for(ctx)
+  with app.db.for_work() as uow:
+    counts, errors = app.top_up_bars(
+      uow, bar_size, since if since else datetime.now() - timedelta(days=365), set(con_id) if con_id else None)
+  if errors.get('error'):
+    raise click.ClickException(
+      f"Errors[{len(errors['error'])}] requesting historical bars. Please look at the log files for information")
+  info_msg = f"{sum(counts.values())} bars of {bar_size} stored for {len(counts)} contracts"
+  _logger.info(info_msg)
+  click.echo(info_msg)
+
+
+def socket_path(ctx: click.Context, param: click.Option | click.Parameter, value: Any) -> str:
+  assert isinstance(value, str) or value is None
+  configured: Cfg = ctx.obj['config']
+  return value if value else str(configured.cervino.data_dir.joinpath(f"{configured.meta.app_id}.sock"))
+
+
+@cli.command()
+@click.option(
+  "--socket",
+  "socket",
+  type=str,
+  required=False,
+  help="Path of the Unix domain socket to listen on. Default: `<data_dir>/<app_id>.sock`",
+  callback=socket_path
+)
+@click.pass_context
+def serve(ctx: click.Context, socket: str) -> None:
+  """
+  Keeps the application, its configuration and database warm and serves the `remote` command
+  through a Unix domain socket until it receives a `shutdown` request or is interrupted.
+  """
+  from salduba.corvino.services.daemon import CorvinoDaemon
+
+  cfg: Cfg = ctx.obj['config']
+  app: CorvinoApp = app_for(ctx)
+  Path(socket).parent.mkdir(parents=True, exist_ok=True)
+  with CorvinoDaemon(app, cfg, Path(socket)) as daemon:
+    info_msg = f"Serving on {socket}"
+    _logger.info(info_msg)
+    click.echo(info_msg)
+    try:
+      daemon.serve_forever()
+    except KeyboardInterrupt:
+      click.echo("Interrupted, shutting down")
+
+
+@cli.command()
+@click.option(
+  "--socket",
+  "socket",
+  type=str,
+  required=False,
+  help="Path of the Unix domain socket of the `serve` daemon. Default: `<data_dir>/<app_id>.sock`",
+  callback=socket_path
+)
+@click.option(
+  "--batch",
+  type=str,
+  required=False,
+  help="The name of the batch to use for `place-orders`, default: Date with seconds (Year-Month-Day:Hour:min:secs)",
+  callback=batch_name
+)
+@click.option(
+  "--allocation",
+  type=str,
+  required=False,
+  help="The Allocation of the batch of orders to a portfolio. Default from Configuration File",
+  callback=resolved_allocation
+)
+@click.option(
+  "--execute-trades",
+  is_flag=True,
+  help=click.style("USE WITH CAUTION!!!!", fg="bright_red") + " Same as for `place-orders`"
+)
+@click.argument("command", type=click.Choice(client.commands))
+@click.argument("input-movements-file", required=False, type=click.Path(exists=True))
+@click.pass_context
+def remote(
+    ctx: click.Context,
+    socket: str,
+    batch: str,
+    allocation: str,
+    execute_trades: bool,
+    command: str,
+    input_movements_file: Optional[str]) -> None:
+  """
+  Runs COMMAND in the daemon started with `serve`, without loading the application in this process.
+  """
+  cfg: Cfg = ctx.obj['config']
+  payload: dict[str, Any] = {'command': command}
+  if command in [client.VERIFY, client.LOOKUP, client.PLACE]:
+    if not input_movements_file:
+      raise click.UsageError(f"{command} requires an INPUT_MOVEMENTS_FILE")
+    payload['input_file'] = str(Path(input_movements_file).absolute())
+    payload['output_file'] = str(Path(cfg.output.file_name).absolute())
+  if command == client.PLACE:
+    warning = "Placing Orders " + click.style("WITH DIRECT EXECUTION!!", fg="bright_red")
+    if execute_trades and not click.confirm(warning + "\n\tDo you want to continue?"):
+      click.echo("User did not confirm: Abandoning Operation")
+      return
+    payload.update({'batch': batch, 'allocation': allocation, 'execute_trades': execute_trades})
+  try:
+    reply = client.request(Path(socket), payload)
+  except client.DaemonUnavailable as exc:
+    raise click.ClickException(f"{str(exc)}. Start it with `serve`")
+  for f in reply['files']:
+    click.echo(f"Output written to: {f}")
+  if not reply['ok']:
+    raise click.ClickException(reply['message'])
+  click.echo(reply['message'])
+
+
+def _do_lookup_contracts(app: 'CorvinoApp', cfg: Cfg, uow: 'UnitOfWork') -> 'ResultsBatch':
+  from salduba.corvino.io.results_out import ResultsBatch
+
   info_msg = f"Looking up Contracts from {cfg.input.file_name}, missing contracts will be written to: {cfg.output.file_name}"
   debug_msg = f"Using Database: {cfg.db.storage_path}"
   _logger.info(info_msg)
@@ -259,7 +926,54 @@ def _do_lookup_contracts(app: CorvinoApp, cfg: Cfg, uow: UnitOfWork) -> ResultsB
   )
 
 
-def read_input_rows(movements_file: str, sheet: str) -> list[InputRow]:
+def slicing_policy(
+    max_clip: Optional[int],
+    slices: Optional[int],
+    max_adv_pct: Optional[float],
+    adv_file: Optional[str],
+    slice_interval: Optional[int]) -> Optional['SlicingPolicy']:
+  from datetime import timedelta
+
+  from salduba.ib_tws_proxy.orders.slicing import SlicingPolicy
+
+  if max_adv_pct is not None and not adv_file:
+    raise click.UsageError("--max-adv-pct needs the average daily volumes from --adv-file")
+  if max_clip is None and slices is None and max_adv_pct is None:
+    if slice_interval is not None:
+      raise click.UsageError("--slice-interval needs one of --max-clip, --slices or --max-adv-pct")
+    return None
+  try:
+    return SlicingPolicy(
+      max_clip=max_clip,
+      max_adv_fraction=max_adv_pct / 100 if max_adv_pct is not None else None,
+      slices=slices,
+      interval=timedelta(minutes=slice_interval) if slice_interval else None)
+  except ValueError as vError:
+    raise click.UsageError(str(vError))
+
+
+def read_by_ticker(csv_file: str, column: str, what: str) -> dict[str, float]:
+  """The values of `column` by the `Ticker` column of `csv_file`, skipping the rows without one."""
+  import csv
+
+  try:
+    with open(csv_file, newline='') as f:
+      return {row['Ticker']: float(row[column]) for row in csv.DictReader(f) if row.get(column)}
+  except (KeyError, ValueError) as error:
+    raise click.ClickException(f"Could not read the {what} from {csv_file}: {str(error)}")
+
+
+def read_adv(adv_file: str) -> dict[str, float]:
+  return read_by_ticker(adv_file, 'ADV', "average daily volumes")
+
+
+def read_prices(prices_file: str) -> dict[str, float]:
+  return read_by_ticker(prices_file, 'Price', "prices")
+
+
+def read_input_rows(movements_file: str, sheet: str) -> list['InputRow']:
+  from salduba.corvino.io.parse_input import InputParser
+
   try:
     input_rows = InputParser.input_rows_from(movements_file, sheet)
     return input_rows
@@ -0,0 +1,40 @@
+import json
+import socket
+from pathlib import Path
+from typing import Any, Optional
+
+# Kept to the standard library so that talking to a running `serve` daemon does not pay for the application imports.
+
+VERIFY = 'verify-contracts'
+LOOKUP = 'lookup-contracts'
+PLACE = 'place-orders'
+PING = 'ping'
+SHUTDOWN = 'shutdown'
+
+commands = [VERIFY, LOOKUP, PLACE, PING, SHUTDOWN]
+
+
+class DaemonUnavailable(Exception):
+  pass
+
+
+def request(socket_path: Path, payload: dict[str, Any], timeout: Optional[float] = None) -> dict[str, Any]:
+  """
+  Sends one request to the daemon listening on `socket_path` and waits for its reply.
+
+  Requests and replies are single lines of JSON. Replies always carry `ok` and `message`, and `files` with the
+  output files written by the command.
+  """
+  try:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+      s.settimeout(timeout)
+      s.connect(str(socket_path))
+      s.sendall(json.dumps(payload).encode() + b'\n')
+      with s.makefile('rb') as f:
+        line = f.readline()
+  except (FileNotFoundError, ConnectionRefusedError) as exc:
+    raise DaemonUnavailable(f"No daemon listening on {socket_path}") from exc
+  if not line:
+    raise DaemonUnavailable(f"Daemon on {socket_path} closed the connection without replying")
+  reply: dict[str, Any] = json.loads(line)
+  return reply
@@ -0,0 +1,131 @@
+import re
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Optional
+
+CPROFILE = 'cprofile'
+TRACEMALLOC = 'tracemalloc'
+BOTH = 'both'
+
+modes = [CPROFILE, TRACEMALLOC, BOTH]
+
+
+def _function_label(func: tuple[str, int, str]) -> str:
+  file_name, line, name = func
+  return f"{name} ({Path(file_name).name}:{line})" if line else name
+
+
+class CommandProfiler:
+  """
+  Profiles a CLI command with `cProfile`, `tracemalloc` or both, writing the reports to `directory` as
+  `<stem>_<tag>_*` files:
+
+  - `.prof`: the `pstats` dump, for `snakeviz`, `pstats` or `gprof2dot`.
+  - `_cprofile.txt`: the functions with the highest cumulative time.
+  - `.collapsed`: caller;callee pairs weighted by the callee's own time in microseconds, in the collapsed stack format
+    read by flame graph tools. `cProfile` only records call edges, so the stacks are two frames deep, one for the
+    functions entered before profiling started.
+  - `_tracemalloc.txt`: the peak of traced memory and the source lines that allocated the most.
+
+  Before Python 3.12, `cProfile` only profiles the thread that enables it: the calling thread and every thread started
+  while profiling, such as those of the TWS sessions, get a profile each, merged into the same reports, and threads that
+  were already running are not profiled. From 3.12 on, a single profile records all the threads and only one can be
+  active at a time.
+  """
+
+  def __init__(self, mode: str, directory: Path, stem: str, top: int = 40) -> None:
+    if mode not in modes:
+      raise ValueError(f"Unknown profiling mode: {mode}, use one of {modes}")
+    self.mode = mode
+    self.directory = directory
+    self.stem = stem
+    self.top = top
+    self._profile: Optional[Any] = None
+    self._thread_profiles: list[Any] = []
+    self._lock = threading.Lock()
+
+  @property
+  def cprofile(self) -> bool:
+    return self.mode in [CPROFILE, BOTH]
+
+  @property
+  def tracemalloc(self) -> bool:
+    return self.mode in [TRACEMALLOC, BOTH]
+
+  def start(self) -> None:
+    if self.tracemalloc:
+      import tracemalloc
+      tracemalloc.start(25)
+    if self.cprofile:
+      import cProfile
+      self._profile = cProfile.Profile()
+      self._thread_profiles = []
+      if sys.version_info < (3, 12):
+        threading.setprofile(self._profile_thread)
+      self._profile.enable()
+
+  def _profile_thread(self, frame: Any, event: str, arg: Any) -> None:
+    """Called on the first event of each thread started while profiling, replaces itself by a profile of the thread."""
+    import cProfile
+
+    profile = cProfile.Profile()
+    with self._lock:
+      self._thread_profiles.append(profile)
+    profile.enable()
+
+  def stop(self, tag: str) -> list[Path]:
+    """Stops profiling and writes the reports, returning the files written."""
+    prefix = self.directory.joinpath(f"{self.stem}_{re.sub(r'[^A-Za-z0-9_.-]', '_', tag)}")
+    written: list[Path] = []
+    if self._profile is not None:
+      if sys.version_info < (3, 12):
+        threading.setprofile(None)
+      self._profile.disable()
+      written += self._write_cprofile(prefix)
+      self._profile = None
+      self._thread_profiles = []
+    if self.tracemalloc:
+      written.append(self._write_tracemalloc(prefix))
+    return written
+
+  def _write_cprofile(self, prefix: Path) -> list[Path]:
+    import pstats
+
+    dump = prefix.with_name(prefix.name + ".prof")
+    merged = pstats.Stats(self._profile)
+    with self._lock:
+      for profile in self._thread_profiles:
+        merged.add(profile)
+    merged.dump_stats(dump)
+    summary = prefix.with_name(prefix.name + "_cprofile.txt")
+    with open(summary, 'w') as f:
+      stats = pstats.Stats(str(dump), stream=f)
+      stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+    collapsed = prefix.with_name(prefix.name + ".collapsed")
+    with open(collapsed, 'w') as f:
+      # stats: callee -> (primitive calls, calls, own time, cumulative time, callers)
+      # callers: caller -> (primitive calls, calls, own time, cumulative time) spent in callee when called from caller
+      for callee, (_, _, callee_time, _, callers) in stats.stats.items():  # type: ignore
+        # Functions entered before profiling started have no callers, their own time is a stack of one frame.
+        if not callers and int(callee_time * 1e6) > 0:
+          f.write(f"{_function_label(callee)} {int(callee_time * 1e6)}\n")
+        for caller, (_, _, own_time, _) in callers.items():
+          micros = int(own_time * 1e6)
+          if micros > 0:
+            f.write(f"{_function_label(caller)};{_function_label(callee)} {micros}\n")
+    return [dump, summary, collapsed]
+
+  def _write_tracemalloc(self, prefix: Path) -> Path:
+    import tracemalloc
+
+    snapshot = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    report = prefix.with_name(prefix.name + "_tracemalloc.txt")
+    with open(report, 'w') as f:
+      f.write(f"Peak traced memory: {peak / 1e6:.2f} MB, still allocated at the end: {current / 1e6:.2f} MB\n\n")
+      f.write(f"Top {self.top} allocating lines still allocated at the end:\n")
+      for stat in snapshot.statistics('lineno')[:self.top]:
+        f.write(f"{stat}\n")
+    return report
@@ -0,0 +1,35 @@
+import csv
+import json
+from enum import Enum
+from pathlib import Path
+from typing import Any, Callable
+
+TableWriter = Callable[[Path, list[str], list[list[Any]]], None]
+
+
+def _plain(v: Any) -> Any:
+  return v.value if isinstance(v, Enum) else v
+
+
+def write_csv(path: Path, columns: list[str], arrays: list[list[Any]]) -> None:
+  with open(path, 'w', newline='') as f:
+    writer = csv.writer(f)
+    writer.writerow(columns)
+    writer.writerows(zip(*arrays))
+
+
+def write_jsonl(path: Path, columns: list[str], arrays: list[list[Any]]) -> None:
+  with open(path, 'w') as f:
+    for row in zip(*arrays):
+      f.write(json.dumps(dict(zip(columns, row)), default=str))
+      f.write('\n')
+
+
+def write_parquet(path: Path, columns: list[str], arrays: list[list[Any]]) -> None:
+  try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+  except ImportError as exc:
+    raise ImportError("Parquet output requires `pyarrow`, install it with the `parquet` extra") from exc
+  table = pa.table({c: pa.array([_plain(v) for v in arr]) for c, arr in zip(columns, arrays)})
+  pq.write_table(table, path)
@@ -1,10 +1,12 @@
 import logging
 from dataclasses import dataclass
-from typing import Optional
+from enum import StrEnum
+from typing import Any, Optional
 
 import pandas as pd
 
 from salduba.ib_tws_proxy.domain.enumerations import Country, Currency, Exchange, SecType
+from salduba.util import tracing
 
 _logger = logging.getLogger(__name__)
 
@@ -42,6 +44,20 @@ exchangeTable = {
 }
 
 
+countryByName = {c.value: c for c in Country}
+
+
+# Raw types (e.g. "Equity") and IB security type names both resolve to a `SecType`
+ibkTypeByRawType = {**{t.value: t for t in SecType}, **typeTable}
+
+
+exchange2Table = {ex: Exchange.NYSE if ex == Exchange.ISLAND else Exchange.NONE for ex in Exchange}
+
+
+def enum_dtype(enum_type: type[StrEnum]) -> pd.CategoricalDtype:
+  return pd.CategoricalDtype(list(enum_type))
+
+
 @dataclass
 class InputRow():
   ticker: str
@@ -72,6 +88,7 @@ class InputParser:
     self.sheet = sheet
 
   @staticmethod
+  @tracing.traced("parse input")
   def input_rows_from(movements_path: str, sheet: str = 'Movements') -> list[InputRow]:
     file_type = movements_path.split('.')[-1]
     df: Optional[pd.DataFrame] = None
@@ -86,40 +103,51 @@ class InputParser:
         raise Exception(f"No trades were read from file {movements_path}")
       if len(df[df['Trade'] == 0]) != 0:
         _logger.info(f"An input trade if for zero quantity, likely an error: {df[df['Trade'] == 0]}")
-      return [InputRow(
-        r['Ticker'],  # pyright: ignore
-        r['Trade'],  # pyright: ignore
-        r['Symbol'],  # pyright: ignore
-        r['Country'],  # pyright: ignore
-        r['RawType'],  # pyright: ignore
-        r['IbkType'],  # pyright: ignore
-        r['Currency'],  # pyright: ignore
-        r['Exchange'],  # pyright: ignore
-        r['Exchange2']  # pyright: ignore
-        ) for (_, r) in df.iterrows()]  # pyright: ignore
+      return InputParser._rows(df)
     else:
       raise Exception(f"The file {movements_path} could not be read")
 
+  @staticmethod
+  def input_rows_of(trades: "pd.Series[int]") -> list[InputRow]:
+    """The input rows for the `trades` indexed by ticker, as if they had been read from a movements file."""
+    frame = pd.DataFrame({'Trade': trades.astype(int)}, index=trades.index.astype(str))
+    return InputParser._rows(InputParser._fill_in(frame))
+
+  @staticmethod
+  def _rows(df: pd.DataFrame) -> list[InputRow]:
+    # Columnar construction, avoids building a Series per row as `iterrows` does.
+    return [InputRow(*values) for values in zip(*(df[c].tolist() for c in InputParser.all_columns))]
+
+  @staticmethod
+  def _unmapped(frame: pd.DataFrame, column: "pd.Series[Any]", what: str) -> None:
+    missing = column.isna()
+    if missing.any():
+      raise ValueError(f"Cannot Find {what} for:\n {frame.loc[missing.to_numpy(), ['Ticker']]}")
+
   @staticmethod
   def _fill_in(frame: pd.DataFrame) -> pd.DataFrame:
     frame.index.rename("TickerIndex", inplace=True)  # pyright: ignore
-    frame["Ticker"] = frame.index  # pyright: ignore
-    (
-      frame["Symbol"],
-      frame["Country"],
-      frame["RawType"],
-      frame["IbkType"],
-    ) = zip(*frame.index.map(split_ticker))  # pyright: ignore
-    frame.loc[:, "Country"] = frame["Country"].apply(lambda n: Country(n))  # pyright: ignore
-    frame.loc[:, "IbkType"] = frame["IbkType"].apply(lambda n: SecType(n))  # pyright: ignore
-    frame.loc[:, "Currency"] = frame["Country"].apply(lambda c: currencyTable.get(c, Currency.UNKNOWN))  # pyright: ignore
-    if len(frame[frame["Currency"] == Currency.UNKNOWN]) > 0:
-      raise Exception(f"Cannot Find Currencies for:\n {frame[frame['Currency'] is None]}")  # pyright: ignore
-    frame.loc[:, "Exchange"] = frame["Country"].apply(lambda c: exchangeTable.get(c, Exchange.UNKNOWN))  # pyright: ignore
-    if len(frame[frame["Exchange"] == Exchange.UNKNOWN]) > 0:
-      raise Exception(f"Cannot Find Exchanges for:\n {frame[frame['Exchange'] is None]}")  # pyright: ignore
-    frame.loc[:, "Exchange2"] = frame["Exchange"].apply(  # pyright: ignore
-        lambda ex: Exchange.NYSE if ex == Exchange.ISLAND else Exchange.NONE)  # pyright: ignore
+    tickers = frame.index.to_series()
+    frame["Ticker"] = tickers  # pyright: ignore
+    parts = tickers.str.split(" ", expand=True)
+    if len(parts.columns) != 3 or parts.isna().to_numpy().any():
+      raise ValueError(f"Tickers must be of the form 'SYMBOL COUNTRY TYPE', found:\n {tickers.to_list()}")
+    frame["Symbol"] = parts[0]
+    country = parts[1].map(countryByName)
+    InputParser._unmapped(frame, country, "Countries")
+    frame["Country"] = country.astype(enum_dtype(Country))
+    frame["RawType"] = parts[2]
+    ibk_type = parts[2].map(ibkTypeByRawType)
+    InputParser._unmapped(frame, ibk_type, "Security Types")
+    frame["IbkType"] = ibk_type.astype(enum_dtype(SecType))
+    # Mapping a categorical only maps its categories, not every row.
+    currency = frame["Country"].map(currencyTable)
+    InputParser._unmapped(frame, currency, "Currencies")
+    frame["Currency"] = currency.astype(enum_dtype(Currency))
+    exchange = frame["Country"].map(exchangeTable)
+    InputParser._unmapped(frame, exchange, "Exchanges")
+    frame["Exchange"] = exchange.astype(enum_dtype(Exchange))
+    frame["Exchange2"] = frame["Exchange"].map(exchange2Table).astype(enum_dtype(Exchange))
     return frame.sort_values("TickerIndex")  # pyright: ignore
 
   @staticmethod
@@ -183,8 +211,8 @@ class InputParser:
         dtype={"Ticker": str, "Trade": int},
         keep_default_na=False,
       )
-      return InputParser._fill_in(movementsPD)
     except ValueError as e:
       _logger.error(f"Trying to read {movements_path} with an error: {e}")
       _logger.error(f"The file requires the following columns: {InputParser.columns_from_file}")
       return None
+    return InputParser._fill_in(movementsPD)
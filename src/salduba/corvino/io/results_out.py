@@ -1,17 +1,23 @@
 import datetime
-from typing import Any, Optional
+from dataclasses import fields
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional, Sequence
 
-import pandas as pd
 from openpyxl.workbook.workbook import Workbook
-from openpyxl.worksheet.worksheet import Worksheet
+from openpyxl.worksheet._write_only import WriteOnlyWorksheet
 from sqlalchemy import inspect
 
-from salduba.common.configuration import Defaults
+from salduba.common.configuration import Defaults, OutputFormat
 from salduba.common.persistence.alchemy.repo import RecordBase
+from salduba.corvino.io.columnar_out import TableWriter, write_csv, write_jsonl, write_parquet
 from salduba.corvino.io.parse_input import InputRow
 from salduba.corvino.persistence.movement_record import MovementRecord2
+from salduba.corvino.services.positions import PositionCheck
+from salduba.corvino.services.pre_trade import Exposure, Violation
 from salduba.ib_tws_proxy.contracts.contract_repo import ContractRecord2
 from salduba.ib_tws_proxy.operations import ErrorResponse
+from salduba.ib_tws_proxy.orders.previewing_orders import MarginSummary, OrderPreview
+from salduba.util import tracing
 
 contract_columns = [c.key for c in inspect(ContractRecord2).columns
                     if not c.key.endswith('_fk')]
@@ -22,6 +28,16 @@ input_columns = ['ticker', 'trade', 'symbol', 'country', 'raw_type', 'ibk_type',
 error_columns = ['Error', 'opId', 'errorCode', 'errorString']
 
 
+error_table_columns = ['key', 'opId', 'errorCode', 'errorString']
+
+
+table_writers: dict[OutputFormat, TableWriter] = {
+  OutputFormat.CSV: write_csv,
+  OutputFormat.JSONL: write_jsonl,
+  OutputFormat.PARQUET: write_parquet
+}
+
+
 movement_columns = [
   "status",
   'batch',
@@ -40,6 +56,21 @@ movement_columns = [
 ]
 
 
+preview_columns = [f.name for f in fields(OrderPreview)]
+
+
+margin_columns = [f.name for f in fields(MarginSummary)]
+
+
+exposure_columns = [f.name for f in fields(Exposure)]
+
+
+violation_columns = [f.name for f in fields(Violation)]
+
+
+position_columns = [f.name for f in fields(PositionCheck)]
+
+
 class ResultsBatch:
   def __init__(self,
                atTime: datetime.datetime,
@@ -49,7 +80,12 @@ class ResultsBatch:
                updated: list[ContractRecord2],
                unknown: list[InputRow],
                movements_placed: list[MovementRecord2],
-               errors: dict[str, list[ErrorResponse]]) -> None:
+               errors: dict[str, list[ErrorResponse]],
+               previews: Optional[list[OrderPreview]] = None,
+               margins: Optional[list[MarginSummary]] = None,
+               exposures: Optional[list[Exposure]] = None,
+               violations: Optional[list[Violation]] = None,
+               positions: Optional[list[PositionCheck]] = None) -> None:
     self.atTime = atTime
     self.message = message
     self.errors: dict[str, list[ErrorResponse]] = errors
@@ -58,14 +94,25 @@ class ResultsBatch:
     self.movements = movements_placed
     self.updated = updated
     self.unknown = unknown
+    self.previews: list[OrderPreview] = previews if previews else []
+    self.margins: list[MarginSummary] = margins if margins else []
+    self.exposures: list[Exposure] = exposures if exposures else []
+    self.violations: list[Violation] = violations if violations else []
+    self.positions: list[PositionCheck] = positions if positions else []
     self.input_sheet: str = Defaults.output.inputs_sheet
     self.known_sheet: str = Defaults.output.known_sheet
     self.updated_sheet: str = Defaults.output.updated_sheet
     self.missing_sheet: str = Defaults.output.missing_sheet
     self.movement_sheet: str = Defaults.output.movement_sheet
     self.error_sheet: str = Defaults.output.error_sheet
+    self.preview_sheet: str = Defaults.output.preview_sheet
+    self.margin_sheet: str = Defaults.output.margin_sheet
+    self.exposure_sheet: str = Defaults.output.exposure_sheet
+    self.violation_sheet: str = Defaults.output.violation_sheet
+    self.position_sheet: str = Defaults.output.position_sheet
     self.file_prefix: str = Defaults.output.file_prefix
     self.filename = Defaults.output.file_name
+    self.format: OutputFormat = Defaults.output.format
 
   @staticmethod
   def _explode(r: RecordBase) -> dict[str, Any]:
@@ -73,91 +120,101 @@ class ResultsBatch:
     return r.__dict__
 
   @staticmethod
-  def _contracts_pd(contract_records: list[ContractRecord2]) -> pd.DataFrame:
-    return pd.DataFrame(
-      data=[
-        {
-          c:  datetime.datetime.fromtimestamp(float(cr.__dict__[c])/1e3).strftime("%Y-%m-%d %H:%M:%S")
-          if c in ['expires_on', 'at'] else cr.__dict__[c] for c in contract_columns
-        }
-        for cr in contract_records
-        ],
-      columns=contract_columns
-    )
-
-  @staticmethod
-  def _input_pd(input_rows: list[InputRow]) -> pd.DataFrame:
-    return pd.DataFrame(
-      columns=input_columns,
-      data=[{c: ir.__dict__[c] for c in input_columns} for ir in input_rows]
-    )
+  def _from_millis(v: Any) -> str:
+    return datetime.datetime.fromtimestamp(float(v)/1e3).strftime("%Y-%m-%d %H:%M:%S")
 
   @staticmethod
-  def _movements_pd(movements: list[MovementRecord2]) -> pd.DataFrame:
-    return pd.DataFrame(
-      columns=movement_columns,
-      data=[{c: m.__dict__[c] for c in movement_columns} for m in movements]
-    )
+  def _column_arrays(
+      items: Sequence[Any],
+      columns: list[str],
+      formats: Optional[dict[str, Callable[[Any], Any]]] = None) -> list[list[Any]]:
+    values = [item.__dict__ for item in items]
+    arrays = [[v[c] for v in values] for c in columns]
+    if formats:
+      for idx, c in enumerate(columns):
+        if c in formats:
+          arrays[idx] = [formats[c](v) for v in arrays[idx]]
+    return arrays
 
   @staticmethod
-  def _write_one(wb: Workbook, data: Optional[pd.DataFrame], columns: list[str], sheet_name: str) -> None:
-    if data is not None:
-      sheet: Worksheet = wb.create_sheet(sheet_name)
-      # Ensure the sheet is clean.
-      sheet.delete_rows(1, sheet.max_row)
-      # Ensure the df is well indexed
-      data.reset_index()
-      for idx, c_header in enumerate(columns):
-        sheet.cell(row=1, column=idx+1).value = c_header
-      for r_idx, r in data.iterrows():  # pyright: ignore
-        for c_idx, c_name in enumerate(columns):
-          sheet.cell(row=int(r_idx)+2, column=c_idx+1).value = r[c_name]  # type: ignore
-
-  def write_xlsx(self, override_filename: Optional[str] = None) -> None:
-    wb: Workbook = Workbook()
-
-    ResultsBatch._write_one(
-      wb,
-      ResultsBatch._input_pd(self.inputs) if self.inputs else None,
-      input_columns,
-      self.input_sheet)
-
-    ResultsBatch._write_one(
-      wb,
-      ResultsBatch._contracts_pd(self.known) if self.known else None,
-      contract_columns,
-      self.known_sheet)
-
-    ResultsBatch._write_one(
-      wb,
-      ResultsBatch._contracts_pd(self.updated) if self.updated else None,
+  def _contract_arrays(contract_records: list[ContractRecord2]) -> list[list[Any]]:
+    return ResultsBatch._column_arrays(
+      contract_records,
       contract_columns,
-      self.updated_sheet)
+      {'expires_on': ResultsBatch._from_millis, 'at': ResultsBatch._from_millis})
 
-    ResultsBatch._write_one(
-      wb,
-      ResultsBatch._input_pd(self.unknown) if self.unknown else None,
-      input_columns,
-      self.missing_sheet)
+  @staticmethod
+  def _write_one(wb: Workbook, arrays: list[list[Any]], columns: list[str], sheet_name: str) -> None:
+    sheet: WriteOnlyWorksheet = wb.create_sheet(sheet_name)
+    sheet.append(columns)
+    for row in zip(*arrays):
+      sheet.append(row)
+
+  def _write_errors(self, wb: Workbook) -> None:
+    error_sheet: WriteOnlyWorksheet = wb.create_sheet(self.error_sheet)
+    error_sheet.append(error_columns)
+    for k, l_err in self.errors.items():
+      for idx, err in enumerate(l_err):
+        error_sheet.append([k if idx == 0 else None, str(err.errorCode), str(err.errorString)])
+
+  def _tables(self, formatted: bool) -> Iterator[tuple[str, list[str], list[list[Any]]]]:
+    contract_arrays: Callable[[list[ContractRecord2]], list[list[Any]]] = \
+      ResultsBatch._contract_arrays if formatted else (lambda cs: ResultsBatch._column_arrays(cs, contract_columns))
+    if self.inputs:
+      yield self.input_sheet, input_columns, ResultsBatch._column_arrays(self.inputs, input_columns)
+    if self.known:
+      yield self.known_sheet, contract_columns, contract_arrays(self.known)
+    if self.updated:
+      yield self.updated_sheet, contract_columns, contract_arrays(self.updated)
+    tables: list[tuple[str, list[str], Sequence[Any]]] = [
+      (self.missing_sheet, input_columns, self.unknown),
+      (self.movement_sheet, movement_columns, self.movements),
+      (self.preview_sheet, preview_columns, self.previews),
+      (self.margin_sheet, margin_columns, self.margins),
+      (self.exposure_sheet, exposure_columns, self.exposures),
+      (self.violation_sheet, violation_columns, self.violations),
+      (self.position_sheet, position_columns, self.positions),
+    ]
+    for name, columns, items in tables:
+      if items:
+        yield name, columns, ResultsBatch._column_arrays(items, columns)
+
+  @tracing.traced("write output")
+  def write(self, override_filename: Optional[str] = None) -> list[Path]:
+    """
+    Writes the batch in the configured `Defaults.output.format`, returning the files written.
+
+    `xlsx` writes one workbook with a sheet per table. The columnar formats write one file per non-empty table,
+    named `<file_stem>_<sheet_name>.<format>` next to the output file name, and keep timestamps as epoch millis.
+    """
+    filename = Path(override_filename if override_filename else self.filename)
+    if self.format == OutputFormat.XLSX:
+      self.write_xlsx(str(filename))
+      return [filename]
+    writer = table_writers[self.format]
+    written: list[Path] = []
+    for name, columns, arrays in self._tables(formatted=False):
+      written.append(filename.with_name(f"{filename.stem}_{name}.{self.format}"))
+      writer(written[-1], columns, arrays)
+    if self.errors:
+      written.append(filename.with_name(f"{filename.stem}_{self.error_sheet}.{self.format}"))
+      writer(written[-1], error_table_columns, self._error_arrays())
+    return written
 
-    ResultsBatch._write_one(
-      wb,
-      ResultsBatch._movements_pd(self.movements) if self.movements else None,
-      movement_columns,
-      self.movement_sheet)
+  def _error_arrays(self) -> list[list[Any]]:
+    rows = [(k, err.opId, err.errorCode, err.errorString) for k, l_err in self.errors.items() for err in l_err]
+    return [list(c) for c in zip(*rows)] if rows else [[] for _ in error_table_columns]
 
+  def write_xlsx(self, override_filename: Optional[str] = None) -> None:
+    """
+    Streams the batch into a write-only workbook: rows are appended from column arrays and flushed to disk
+    as they are written, so memory does not grow with the number of cells.
+    """
+    wb: Workbook = Workbook(write_only=True)
+    for name, columns, arrays in self._tables(formatted=True):
+      ResultsBatch._write_one(wb, arrays, columns, name)
     if self.errors:
-      error_sheet: Worksheet = wb.create_sheet(self.error_sheet)
-      for c_idx, e_tag in enumerate(error_columns):
-        error_sheet.cell(1, c_idx+1).value = e_tag
-      current_row = 2
-      for k, l_err in self.errors.items():
-        error_sheet.cell(row=current_row, column=1).value = k
-        for err in l_err:
-          error_sheet.cell(row=current_row, column=2).value = str(err.errorCode)
-          error_sheet.cell(row=current_row, column=3).value = str(err.errorString)
-          current_row += 1
-    wb.remove(wb['Sheet'])
+      self._write_errors(wb)
     if override_filename:
       wb.save(override_filename)
     else:
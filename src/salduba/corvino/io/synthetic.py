@@ -0,0 +1,117 @@
+import csv
+import random
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator
+from uuid import uuid4
+
+from openpyxl.workbook.workbook import Workbook
+from sqlalchemy import insert
+
+from salduba.common.persistence.alchemy.db import Db
+from salduba.corvino.io.parse_input import currencyTable, exchangeTable
+from salduba.ib_tws_proxy.contracts.contract_repo import ContractRecord2
+from salduba.ib_tws_proxy.domain.enumerations import Exchange, SecType
+from salduba.util.time import millis_epoch, ninety_days
+
+countries = list(exchangeTable.keys())
+
+
+def ticker(idx: int, known: bool = True) -> tuple[str, str]:
+  """The ticker and country of the `idx`-th synthetic security. Unknown tickers never get a contract."""
+  country = countries[idx % len(countries)]
+  return f"{'S' if known else 'U'}{idx:07d} {country} Equity", country
+
+
+@dataclass
+class SyntheticUniverse:
+  """
+  A reproducible movements file of `rows` rows over the countries of `exchangeTable`, with trades between -5000 and
+  5000 shares, never zero.
+
+  `duplicate_ratio` of the rows repeat a ticker of an earlier row and `unknown_ratio` of them use a ticker with no
+  contract, so that verification reports it missing. The rest are distinct tickers whose contracts `seed_contracts`
+  stores. The same parameters always give the same rows.
+  """
+  rows: int
+  duplicate_ratio: float = 0.0
+  unknown_ratio: float = 0.0
+  seed: int = 7
+  known: int = field(default=0, init=False)
+  unknown: int = field(default=0, init=False)
+
+  def __post_init__(self) -> None:
+    if self.rows < 1:
+      raise ValueError(f"A synthetic universe needs at least one row, not {self.rows}")
+    if min(self.duplicate_ratio, self.unknown_ratio) < 0 or self.duplicate_ratio + self.unknown_ratio > 1:
+      raise ValueError(
+        f"Duplicate ({self.duplicate_ratio}) and unknown ({self.unknown_ratio}) ratios must be positive and add up to 1 at most")
+    self._movements = list(self._generate())
+
+  def _generate(self) -> Iterator[tuple[str, int]]:
+    rnd = random.Random(self.seed)
+    emitted: list[str] = []
+    for _ in range(self.rows):
+      draw = rnd.random()
+      if emitted and draw < self.duplicate_ratio:
+        t = rnd.choice(emitted)
+      elif draw < self.duplicate_ratio + self.unknown_ratio:
+        t = ticker(self.unknown, known=False)[0]
+        self.unknown += 1
+      else:
+        t = ticker(self.known)[0]
+        self.known += 1
+      emitted.append(t)
+      yield t, rnd.choice([-1, 1]) * rnd.randint(1, 5000)
+
+  def movements(self) -> list[tuple[str, int]]:
+    return self._movements
+
+  def write(self, path: Path, sheet: str = "Movements") -> Path:
+    """Writes the movements as `csv` or `xlsx`, depending on the suffix of `path`."""
+    match path.suffix:
+      case '.csv':
+        with open(path, 'w', newline='') as f:
+          writer = csv.writer(f)
+          writer.writerow(['Ticker', 'Trade'])
+          writer.writerows(self._movements)
+      case '.xlsx':
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(sheet)
+        ws.append(['Ticker', 'Trade'])
+        for row in self._movements:
+          ws.append(row)
+        wb.save(path)
+      case _:
+        raise ValueError(f"Synthetic movements can be written as 'csv' or 'xlsx' files, not {path.name}")
+    return path
+
+  def seed_contracts(self, db: Db, chunk: int = 10_000) -> int:
+    """Stores a current contract for each known ticker, returning how many were stored."""
+    now = millis_epoch()
+    with db.for_work() as uow:
+      with uow.in_unit() as s:
+        for start in range(0, self.known, chunk):
+          s.execute(insert(ContractRecord2), [self._contract(i, now) for i in range(start, min(start + chunk, self.known))])
+    return self.known
+
+  @staticmethod
+  def _contract(idx: int, now: int) -> dict[str, object]:
+    t, country = ticker(idx)
+    symbol = t.split(' ')[0]
+    exchange = exchangeTable[country]
+    return {
+      'rid': str(uuid4()),
+      'at': now,
+      'expires_on': now + ninety_days,
+      'con_id': idx + 1,
+      'symbol': symbol,
+      'sec_type': SecType.STK,
+      'strike': 0.0,
+      'lookup_exchange': exchange,
+      'exchange': exchange,
+      'primary_exchange': Exchange.NYSE if exchange == Exchange.ISLAND else exchange,
+      'currency': currencyTable[country],
+      'local_symbol': symbol,
+      'include_expired': False
+    }
@@ -35,7 +35,7 @@ class MovementStatus(StrEnum):
                 return MovementStatus.CONFIRMED
             case "Submitted":
                 return MovementStatus.CONFIRMED
-            case "Cancelled":
+            case "Cancelled" | "ApiCancelled":
                 return MovementStatus.CANCELLED
             case "Filled":
                 return MovementStatus.COMPLETED
@@ -73,7 +73,8 @@ class MovementRecordOps(RepoOps[MovementRecord2]):
     super().__init__(MovementRecord2)
 
   def find_for_batch(self, batch: str) -> Callable[[UnitOfWork], Iterable[MovementRecord2]]:
-    return self.find(lambda q: q.where(MovementRecord2.batch == batch))
+    # Status updates may have been written by other sessions (e.g. `OrderStatusWriter`), refresh loaded instances.
+    return self.find(lambda q: q.where(MovementRecord2.batch == batch).populate_existing())
 
   def does_batch_exists(self, batch: str) -> Callable[[UnitOfWork], bool]:
     return lambda uow: self.count(lambda q: q.where(MovementRecord2.batch == batch))(uow) > 0
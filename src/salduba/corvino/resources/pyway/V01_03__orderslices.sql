@@ -0,0 +1,4 @@
+-- Linking the child orders of a sliced order to their parent
+
+
+alter table ORDER_T add parent_order_fk varchar(255) references ORDER_T (rid)
@@ -0,0 +1,43 @@
+-- Executions and their commissions, as reported by TWS
+-- See https://interactivebrokers.github.io/tws-api/classIBApi_1_1Execution.html
+-- See https://interactivebrokers.github.io/tws-api/classIBApi_1_1CommissionReport.html
+
+CREATE TABLE EXECUTION (
+	exec_id VARCHAR(255) NOT NULL,
+	exec_time VARCHAR(255) NOT NULL,
+	account VARCHAR(255) NOT NULL,
+	order_id INTEGER NOT NULL,
+	perm_id INTEGER NOT NULL,
+	client_id INTEGER NOT NULL,
+	order_ref VARCHAR(255),
+	con_id INTEGER NOT NULL,
+	symbol VARCHAR(255) NOT NULL,
+	sec_type VARCHAR(255) NOT NULL,
+	currency VARCHAR(255) NOT NULL,
+	exchange VARCHAR(255) NOT NULL,
+	side VARCHAR(255) NOT NULL,
+	shares FLOAT NOT NULL,
+	price FLOAT NOT NULL,
+	cum_qty FLOAT NOT NULL,
+	avg_price FLOAT NOT NULL,
+	liquidation INTEGER NOT NULL,
+	last_liquidity INTEGER NOT NULL,
+	rid VARCHAR(255) NOT NULL,
+	at INTEGER NOT NULL,
+	PRIMARY KEY (rid),
+	UNIQUE (exec_id)
+);
+
+CREATE TABLE COMMISSION (
+	exec_id VARCHAR(255) NOT NULL,
+	commission FLOAT NOT NULL,
+	currency VARCHAR(255) NOT NULL,
+	realized_pnl FLOAT,
+	yield_value FLOAT,
+	yield_redemption_date INTEGER,
+	rid VARCHAR(255) NOT NULL,
+	at INTEGER NOT NULL,
+	PRIMARY KEY (rid),
+	UNIQUE (exec_id),
+	FOREIGN KEY(exec_id) REFERENCES EXECUTION (exec_id)
+);
@@ -0,0 +1,15 @@
+-- Write-ahead journal of the orders sent to TWS, to resume an interrupted placement
+
+CREATE TABLE PLACEMENT_INTENT (
+	batch VARCHAR(255) NOT NULL,
+	movement_fk VARCHAR(255) NOT NULL,
+	order_fk VARCHAR(255) NOT NULL,
+	order_id INTEGER NOT NULL,
+	order_ref VARCHAR(255),
+	client_id INTEGER NOT NULL,
+	rid VARCHAR(255) NOT NULL,
+	at INTEGER NOT NULL,
+	PRIMARY KEY (rid),
+	FOREIGN KEY(movement_fk) REFERENCES MOVEMENT (rid),
+	FOREIGN KEY(order_fk) REFERENCES ORDER_T (rid)
+)
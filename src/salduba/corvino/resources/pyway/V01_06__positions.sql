@@ -0,0 +1,16 @@
+-- The latest snapshot of the positions of the accounts, as reported by TWS
+-- See https://interactivebrokers.github.io/tws-api/positions.html
+
+CREATE TABLE POSITION (
+	expires_on INTEGER NOT NULL,
+	account VARCHAR(255) NOT NULL,
+	con_id INTEGER NOT NULL,
+	symbol VARCHAR(255) NOT NULL,
+	sec_type VARCHAR(255) NOT NULL,
+	currency VARCHAR(255) NOT NULL,
+	position FLOAT NOT NULL,
+	avg_cost FLOAT NOT NULL,
+	rid VARCHAR(255) NOT NULL,
+	at INTEGER NOT NULL,
+	PRIMARY KEY (rid)
+)
@@ -0,0 +1,15 @@
+-- The latest snapshot of the market prices of each contract, as reported by TWS
+-- See https://interactivebrokers.github.io/tws-api/md_request.html
+
+CREATE TABLE MARKET_PRICE (
+	con_id INTEGER NOT NULL,
+	symbol VARCHAR(255) NOT NULL,
+	bid FLOAT,
+	ask FLOAT,
+	last FLOAT,
+	close FLOAT,
+	rid VARCHAR(255) NOT NULL,
+	at INTEGER NOT NULL,
+	PRIMARY KEY (rid),
+	UNIQUE (con_id)
+)
@@ -1,15 +1,31 @@
 import datetime
 import logging
-from typing import Optional
+from collections import defaultdict
+from typing import Any, Optional
 from uuid import uuid4
 
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
 from ibapi.contract import Contract, ContractDetails, DeltaNeutralContract  # pyright: ignore
+from ibapi.execution import ExecutionFilter  # pyright: ignore
 from ibapi.order_state import OrderState  # pyright: ignore
 
+from salduba.common.configuration import Defaults, HistoricalConfig, MarketDataConfig, RiskConfig, RiskMode
 from salduba.common.persistence.alchemy.db import Db, UnitOfWork
 from salduba.corvino.io.parse_input import InputRow
 from salduba.corvino.io.results_out import ResultsBatch
 from salduba.corvino.persistence.movement_record import MovementRecord2, MovementRecordOps, MovementStatus
+from salduba.corvino.services.positions import PositionIssue, executed_by_order_ref, held, reconcile
+from salduba.corvino.services.pre_trade import PreTradeCheck, check_batch
+from salduba.corvino.services.rebalance import (
+    RebalancePolicy,
+    held_by_symbol,
+    rebalance_columns,
+    rebalance_trades,
+    rebalance_universe,
+    untargeted,
+)
 from salduba.ib_tws_proxy.contracts.contract_repo import (
     ContractRecord2,
     ContractRecordOps,
@@ -17,17 +33,52 @@ from salduba.ib_tws_proxy.contracts.contract_repo import (
     DeltaNeutralContractRecord2,
 )
 from salduba.ib_tws_proxy.contracts.lookup_contract_details import LookupContractDetails
-from salduba.ib_tws_proxy.domain.enumerations import Currency, Exchange, SecType
+from salduba.ib_tws_proxy.domain.enumerations import Currency, Exchange, IbOrderStatus, OrderType, SecType
+from salduba.ib_tws_proxy.executions.execution_repo import ExecutionRecordOps
+from salduba.ib_tws_proxy.executions.executions_proxy import ExecutionsProxy, filter_time
+from salduba.ib_tws_proxy.historical.bar_store import BarStore, chunks, duration_of
+from salduba.ib_tws_proxy.historical.historical_proxy import HistoricalBarsProxy
+from salduba.ib_tws_proxy.market_data.price_repo import MarketPriceOps, MarketPriceRecord2
+from salduba.ib_tws_proxy.market_data.price_table import PriceTable
+from salduba.ib_tws_proxy.market_data.snapshot_proxy import MarketSnapshotProxy
 from salduba.ib_tws_proxy.operations import ErrorResponse
+from salduba.ib_tws_proxy.orders.managing_orders import (
+    CancelOrders,
+    ChangeOrders,
+    ModifyOrders,
+    OrderChange,
+    open_orders_of,
+)
+from salduba.ib_tws_proxy.orders.order_status_writer import ib_order_status
 from salduba.ib_tws_proxy.orders.OrderRepo import OrderRecord2, OrderRecordOps, newOrderRecord
-from salduba.ib_tws_proxy.orders.placing_orders import OpenOrderResponse, OrderResponse, PlaceOrderPostProcessor, PlaceOrders
-from salduba.util.time import millis_epoch, ninety_days
+from salduba.ib_tws_proxy.orders.placement_journal import PlacementIntentOps, PlacementJournal
+from salduba.ib_tws_proxy.orders.placing_orders import OpenOrderResponse, OrderResponse, PlaceOrders
+from salduba.ib_tws_proxy.orders.previewing_orders import PreviewOrders, summarize
+from salduba.ib_tws_proxy.orders.reconciling_orders import KnownOrder, KnownOrders
+from salduba.ib_tws_proxy.orders.slicing import SlicingPolicy, slice_order
+from salduba.ib_tws_proxy.positions.position_repo import PositionRecord2, PositionRecordOps
+from salduba.ib_tws_proxy.positions.positions_proxy import PositionsProxy
+from salduba.util import tracing
+from salduba.util.time import five_minutes, millis_epoch, ninety_days
 
 _logger = logging.getLogger(__name__)
 _logger.info(f"Logging to: {__name__}")
 
 
 class CorvinoApp:
+  # The proxy used to place orders with TWS, replaceable to place them against a stubbed TWS.
+  placement_proxy: type[PlaceOrders] = PlaceOrders
+  # The proxies used to cancel and modify placed orders, replaceable in the same way.
+  cancel_proxy: type[CancelOrders] = CancelOrders
+  modify_proxy: type[ModifyOrders] = ModifyOrders
+  executions_proxy: type[ExecutionsProxy] = ExecutionsProxy
+  preview_proxy: type[PreviewOrders] = PreviewOrders
+  # The proxy that finds the orders of a batch known to TWS, to resume its placement.
+  known_orders_proxy: type[KnownOrders] = KnownOrders
+  positions_proxy: type[PositionsProxy] = PositionsProxy
+  snapshot_proxy: type[MarketSnapshotProxy] = MarketSnapshotProxy
+  historical_proxy: type[HistoricalBarsProxy] = HistoricalBarsProxy
+
   @staticmethod
   def batch_name(nowT: datetime.datetime) -> str:
     nowStr = nowT.strftime("%Y%m%d%H%M%S")
@@ -43,6 +94,13 @@ class CorvinoApp:
     appFamily: int,
     host: str = "localhost",
     port: int = 7497,
+    execution_repo: Optional[ExecutionRecordOps] = None,
+    intent_repo: Optional[PlacementIntentOps] = None,
+    position_repo: Optional[PositionRecordOps] = None,
+    price_repo: Optional[MarketPriceOps] = None,
+    market_data: Optional[MarketDataConfig] = None,
+    bar_store: Optional[BarStore] = None,
+    historical: Optional[HistoricalConfig] = None,
   ) -> None:
     """
 
@@ -54,6 +112,13 @@ class CorvinoApp:
       and use the range from 0 to 99 for clientId of this application
     :param host:
     :param port:
+    :param execution_repo:
+    :param intent_repo:
+    :param position_repo:
+    :param price_repo:
+    :param market_data: How to take snapshots of market prices
+    :param bar_store: Where to store historical bars
+    :param historical: How to request historical bars
     """
     self.db = db
     self.contract_repo = contract_repo
@@ -62,6 +127,13 @@ class CorvinoApp:
     self.host = host
     self.port = port
     self.order_repo = order_repo
+    self.execution_repo = execution_repo if execution_repo else ExecutionRecordOps()
+    self.intent_repo = intent_repo if intent_repo else PlacementIntentOps()
+    self.position_repo = position_repo if position_repo else PositionRecordOps()
+    self.price_repo = price_repo if price_repo else MarketPriceOps()
+    self.market_data = market_data if market_data else MarketDataConfig()
+    self.historical = historical if historical else HistoricalConfig()
+    self.bar_store = bar_store if bar_store else BarStore(Defaults.cervino.data_dir.joinpath(self.historical.storage_name))
     self.app_family = appFamily * 100
 
   def _findNominalContract(self, r: InputRow, at: int, uow: UnitOfWork) -> Optional[ContractRecord2]:
@@ -73,6 +145,7 @@ class CorvinoApp:
       at)(uow)
     return rs
 
+  @tracing.traced("verify contracts")
   def verify_contracts_for_input_rows(self, input_rows: list[InputRow], uow: UnitOfWork) -> ResultsBatch:
     nowT = datetime.datetime.now()
     input_dict = {r.ticker: r for r in input_rows}
@@ -92,6 +165,7 @@ class CorvinoApp:
       errors={}
     )
 
+  @tracing.traced("lookup contracts")
   def lookup_contracts_for_input_rows(self,
                                       input_rows: list[InputRow],
                                       uow: UnitOfWork,
@@ -154,6 +228,7 @@ class CorvinoApp:
       return rs, ir
     return {f"{c.symbol}::{c.exchange}": (c, r) for (c, r) in [populateContractForLookup(r) for r in missing]}
 
+  @tracing.traced("tws lookup session", "tws")
   def _doLookups(self, targets: dict[str, tuple[Contract, InputRow]], ttl: int, uow: UnitOfWork)\
       -> Optional[dict[str, list[ErrorResponse]]]:
     updater: LookupContractDetails = LookupContractDetails(
@@ -227,43 +302,40 @@ class CorvinoApp:
     else:
       _logger.warning(f"More than one ContractDetails obtained for {contract.symbol}")
 
-  def postPlaceOrderForBatch(self, batch: str) -> PlaceOrderPostProcessor:
-    return lambda orderId, contract, orderRecord, orderState: (
-      self.postPlaceOrder(batch, orderId, contract, orderRecord, orderState)
-    )
-
   def postPlaceOrder(
     self,
-    batch: str,
     orderId: int,
     contract: Contract,
-    orderRecord: OrderRecord2,
+    movementRecord: MovementRecord2,
     orderState: OrderState
   ) -> OrderResponse:
-    with self.db.for_work() as uow:
-      movementRecord = \
-        self.movements_repo.find_it(
-          batch,
-          contract.symbol,
-          SecType(contract.secType),
-          Exchange(contract.exchange))(uow)
-      if movementRecord is not None:
-        movementRecord.status = MovementStatus.fromIbk(orderState.status)
-        movementRecord.at = millis_epoch()
-        return OpenOrderResponse(orderId, contract, movementRecord.order.toOrder())
-      else:
-        msg = f"No movement found for {contract.symbol}, {contract.exchange} in {batch}"
-        _logger.error(msg)
-        raise Exception(msg)
+    """
+    Applies the status reported by TWS to the movement in memory. Persisting the change is left to the
+    placement's status writer and to the unit of work that placed the batch.
+    """
+    movementRecord.status = MovementStatus.fromIbk(orderState.status)
+    movementRecord.at = millis_epoch()
+    return OpenOrderResponse(orderId, contract, movementRecord.order.toOrder())
 
+  @tracing.traced("place orders")
   def place_orders(
     self,
     input_rows: list[InputRow],
     uow: UnitOfWork,
     batch: Optional[str] = None,
     allocation: Optional[str] = None,
-    execute_trades: bool = False
+    execute_trades: bool = False,
+    slicing: Optional[SlicingPolicy] = None,
+    adv: Optional[dict[str, float]] = None,
+    risk: Optional[RiskConfig] = None,
+    prices: Optional[dict[str, float]] = None
   ) -> ResultsBatch:
+    """
+    Places an order for each movement in `input_rows` or, with a `slicing` policy, the child orders it splits them in.
+    `adv` has the average daily volume by ticker, for policies that limit the slices to a fraction of it.
+    With `risk` limits, the batch is checked before placing it, with the `prices` by ticker or, without them, those of
+    a market snapshot, and nothing is stored nor placed when the checks block it.
+    """
     nowT = datetime.datetime.now()
 
     if batch is None:
@@ -283,7 +355,24 @@ class CorvinoApp:
     else:
       movements: list[MovementRecord2] = \
         self._prepare_movements(batch, allocation, nowT, input_rows, execute_trades, uow, override_exchange=Exchange.SMART)
-      self.order_repo.insert([m.order for m in movements])(uow)
+      check, price_errors = self._pre_trade_check(movements, uow, risk, prices)
+      if check.blocked:
+        return ResultsBatch(
+          nowT,
+          f"{check.message} in batch: {batch}",
+          input_rows,
+          missing.known,
+          missing.updated,
+          missing.unknown,
+          [],
+          CorvinoApp._merged_errors(missing.errors, price_errors),
+          exposures=check.exposures,
+          violations=check.violations
+        )
+      if slicing:
+        for m in movements:
+          slice_order(m.order, slicing, nowT, adv.get(m.ticker) if adv else None)
+      self.order_repo.insert([m.order for m in movements] + [s for m in movements for s in m.order.slices])(uow)
       self.movements_repo.insert(movements)(uow)
       errors: Optional[dict[str, list[ErrorResponse]]] = self._order_placement(batch, movements)
       movements_for_batch: list[MovementRecord2] = list(self.movements_repo.find_for_batch(batch)(uow))
@@ -296,19 +385,108 @@ class CorvinoApp:
           missing.updated,
           missing.unknown,
           movements_for_batch,
-          errors)
+          CorvinoApp._merged_errors(errors, price_errors),
+          exposures=check.exposures,
+          violations=check.violations)
       else:
         return ResultsBatch(
           nowT,
-          f"{len(movements_for_batch)} Movements Placed",
+          f"{len(movements_for_batch)} Movements Placed" + (f", {check.message}" if check.violations else ""),
           input_rows,
           missing.known,
           missing.updated,
           missing.unknown,
           movements_for_batch,
-          missing.errors
+          CorvinoApp._merged_errors(missing.errors, price_errors),
+          exposures=check.exposures,
+          violations=check.violations
         )
 
+  def _pre_trade_check(
+      self,
+      movements: list[MovementRecord2],
+      uow: UnitOfWork,
+      risk: Optional[RiskConfig],
+      prices: Optional[dict[str, float]]) -> tuple[PreTradeCheck, dict[str, list[ErrorResponse]]]:
+    """
+    The checks of `movements` against the `risk` limits, with the errors of the market snapshot taken without `prices`.
+    In `block` mode, a snapshot with errors blocks the batch, its prices cannot be relied on.
+    """
+    if not risk:
+      return PreTradeCheck([], [], False), {}
+    errors: dict[str, list[ErrorResponse]] = {}
+    if prices is None and risk.needs_prices and risk.mode != RiskMode.OFF:
+      # The names without a price in the snapshot are violations of the checks.
+      table, errors = self.market_prices({m.ticker: m.contract for m in movements}, uow)
+      prices = table.prices()
+    check = check_batch(movements, risk, prices)
+    if errors.get('error'):
+      _logger.error(f"Errors[{len(errors['error'])}] taking a snapshot of the market prices for the pre-trade checks")
+      if risk.mode == RiskMode.BLOCK:
+        return PreTradeCheck(check.exposures, check.violations, True, len(errors['error'])), errors
+    return check, errors
+
+  @staticmethod
+  def _merged_errors(*errors: Optional[dict[str, list[ErrorResponse]]]) -> dict[str, list[ErrorResponse]]:
+    merged: dict[str, list[ErrorResponse]] = {}
+    for e in errors:
+      for kind, responses in (e or {}).items():
+        merged.setdefault(kind, []).extend(responses)
+    return merged
+
+  @tracing.traced("preview orders")
+  def preview_orders(
+    self,
+    input_rows: list[InputRow],
+    uow: UnitOfWork,
+    allocation: Optional[str] = None
+  ) -> ResultsBatch:
+    """
+    Previews the margin and commission impact of the orders that `place_orders` would place for `input_rows`, with
+    what-if copies of them that TWS evaluates but never executes. Nothing is stored.
+    """
+    nowT = datetime.datetime.now()
+    missing = self.verify_contracts_for_input_rows(input_rows, uow)
+    if missing.unknown:
+      return ResultsBatch(
+        nowT,
+        "Not all contracts are available for the movements to preview.",
+        input_rows,
+        missing.known,
+        missing.updated,
+        missing.unknown,
+        [],
+        missing.errors
+      )
+    movements: list[MovementRecord2] = self._prepare_movements(
+      CorvinoApp.batch_name(nowT), allocation, nowT, input_rows, False, uow, override_exchange=Exchange.SMART)
+    previewing: PreviewOrders = self.preview_proxy(
+      targets=movements,
+      host=self.host,
+      port=self.port,
+      clientId=self.app_family + 1,
+    )
+    previewing.activate()
+    errors = previewing.wait_for_me()
+    margins = summarize(previewing.previews)
+    excess = margins[-1].projected_excess
+    message = f"{len(previewing.previews)} of {len(movements)} Orders previewed"
+    if excess is not None and excess < 0:
+      message = f"Margin breach, {message} with a projected excess liquidity of {excess:,.2f}"
+    return ResultsBatch(
+      nowT,
+      message,
+      input_rows,
+      missing.known,
+      missing.updated,
+      missing.unknown,
+      [],
+      errors if errors else {},
+      previews=previewing.previews,
+      margins=margins
+    )
+
+  @tracing.traced("prepare movements")
   def _prepare_movements(
       self,
       batch: str,
@@ -352,20 +530,434 @@ class CorvinoApp:
         raise Exception(f"No Contract found for {r.__dict__}")
     return movements
 
+  @tracing.traced("tws placement session", "tws")
   def _order_placement(
-      self, batch: str, movements: list[MovementRecord2]) -> Optional[dict[str, list[ErrorResponse]]]:
-    assert not [m for m in movements if m.order.transmit]
-    ordering: PlaceOrders = PlaceOrders(
+      self,
+      batch: str,
+      movements: list[MovementRecord2],
+      alreadyPlaced: Optional[set[str]] = None) -> Optional[dict[str, list[ErrorResponse]]]:
+    toPlace = [o for m in movements for o in m.order.slices or [m.order] if not alreadyPlaced or o.rid not in alreadyPlaced]
+    assert not [o for o in toPlace if o.transmit]
+    ordering: PlaceOrders = self.placement_proxy(
       db=self.db,
       targets=movements,
       orderRepo=self.order_repo,
       contractRepo=self.contract_repo,
-      postProcess=self.postPlaceOrderForBatch(batch),
+      postProcess=self.postPlaceOrder,
       host=self.host,
       port=self.port,
       clientId=self.app_family + 1,
-      timeout=len(movements) + 15,
+      timeout=len(toPlace) + 15,
       delay=None,
+      journal=PlacementJournal(self.db, self.app_family + 1),
+      alreadyPlaced=alreadyPlaced,
     )
     ordering.activate()
     return ordering.wait_for_me()
+
+  @tracing.traced("resume batch")
+  def resume_batch(self, batch: str, uow: UnitOfWork) -> ResultsBatch:
+    """
+    Places the orders of `batch` that TWS does not know, after a placement that was interrupted. The orders that TWS
+    knows, open or completed today, take the orderId and status it reports and are not placed again. Only orders that
+    TWS never reported on are placed, so resuming the batch again places nothing twice.
+    """
+    nowT = datetime.datetime.now()
+    movements: list[MovementRecord2] = list(self.movements_repo.find_for_batch(batch)(uow))
+    if not movements:
+      return ResultsBatch(nowT, f"No Movements found in batch: {batch}", [], [], [], [], [], {})
+    known, errors = self._known_orders(batch)
+    if errors.get('error'):
+      return ResultsBatch(
+        nowT, f"Errors[{len(errors['error'])}] finding the Orders of batch: {batch}", [], [], [], [], movements, errors)
+    journaled = {i.order_fk for i in self.intent_repo.for_batch(batch)(uow)}
+    missing, alreadyPlaced, unaccounted = CorvinoApp._reconcile(movements, known, journaled)
+    # The adopted orderIds and statuses are stored before the placement writes from its own threads.
+    uow.checkpoint()
+    placing = sum(1 for m in missing for o in m.order.slices or [m.order] if o.rid not in alreadyPlaced)
+    if missing:
+      placement_errors = self._order_placement(batch, missing, alreadyPlaced)
+      errors = placement_errors if placement_errors else {}
+    message = f"{placing} missing Orders placed, {len(alreadyPlaced) - unaccounted} already known to TWS in batch: {batch}"
+    if unaccounted:
+      message += f", {unaccounted} not known to TWS and not placed again"
+    if errors.get('error'):
+      message = f"Errors[{len(errors['error'])}] resuming: {message}"
+    return ResultsBatch(nowT, message, [], [], [], [], list(self.movements_repo.find_for_batch(batch)(uow)), errors)
+
+  @staticmethod
+  def _reconcile(
+      movements: list[MovementRecord2],
+      known: dict[str, KnownOrder],
+      journaled: set[str]) -> tuple[list[MovementRecord2], set[str], int]:
+    """
+    The movements with orders to place, the rids of the orders not to place again and how many of those are not known
+    to TWS although it reported on them before.
+    """
+    alreadyPlaced: set[str] = set()
+    unaccounted = 0
+    missing: list[MovementRecord2] = []
+    for m in movements:
+      # Loaded now, the placement reads them from its own threads.
+      m.contract.rid
+      for o in m.order.slices or [m.order]:
+        found = known.get(o.orderRef) if o.orderRef else None
+        if found:
+          CorvinoApp._adopt(m, o, found)
+          alreadyPlaced.add(o.rid)
+        elif o.order_status.status != IbOrderStatus.NEW:
+          # TWS reported on it in an earlier session but no longer lists it, placing it again could duplicate it.
+          _logger.warning(f"Order {o.orderRef}[{o.orderId}] in status {o.order_status.status} is not known to TWS")
+          alreadyPlaced.add(o.rid)
+          unaccounted += 1
+        elif o.rid in journaled:
+          _logger.info(f"Order {o.orderRef}[{o.orderId}] was journaled but never reached TWS, placing it again")
+      if [o for o in m.order.slices or [m.order] if o.rid not in alreadyPlaced]:
+        missing.append(m)
+    return missing, alreadyPlaced, unaccounted
+
+  @staticmethod
+  def _adopt(movement: MovementRecord2, order: OrderRecord2, found: KnownOrder) -> None:
+    """Takes the orderId and status that TWS reports for an order of an interrupted placement."""
+    if found.orderId:
+      order.orderId = found.orderId
+      order.order_status.order_id = found.orderId
+    order.permId = found.permId
+    order.order_status.perm_id = found.permId
+    order.order_status.status = ib_order_status(found.status)
+    if found.filled:
+      order.order_status.filled = found.filled
+      order.order_status.remaining = max(0.0, (order.totalQuantity or 0.0) - found.filled)
+    if not movement.order.slices:
+      movement.status = MovementStatus.fromIbk(found.status)
+      movement.at = millis_epoch()
+
+  @tracing.traced("tws known orders session", "tws")
+  def _known_orders(self, batch: str) -> tuple[dict[str, KnownOrder], dict[str, list[ErrorResponse]]]:
+    finding: KnownOrders = self.known_orders_proxy(
+      orderRefPrefix=f"{batch}::",
+      host=self.host,
+      port=self.port,
+      clientId=self.app_family + 1,
+    )
+    finding.activate()
+    errors = finding.wait_for_me()
+    return finding.known, errors if errors else {}
+
+  @tracing.traced("cancel batch")
+  def cancel_batch(self, batch: str, uow: UnitOfWork) -> ResultsBatch:
+    """Cancels the orders of `batch` that are still open in TWS."""
+    nowT = datetime.datetime.now()
+    movements: list[MovementRecord2] = list(self.movements_repo.find_for_batch(batch)(uow))
+    targets = [OrderChange.of(m, o) for m in movements for o in open_orders_of(m)]
+    confirmed, errors = self._order_changes(self.cancel_proxy, targets)
+    return ResultsBatch(
+      nowT, f"{len(confirmed)} of {len(targets)} open Orders Cancelled in batch: {batch}", [], [], [], [], movements, errors
+    )
+
+  @tracing.traced("modify batch")
+  def modify_batch(
+      self,
+      batch: str,
+      uow: UnitOfWork,
+      limit_prices: Optional[dict[str, float]] = None,
+      market: bool = False,
+      transmit: bool = False
+  ) -> ResultsBatch:
+    """
+    Modifies the orders of `batch` that are still open in TWS: to limit orders at the price of their ticker in
+    `limit_prices`, back to market orders with `market` and/or transmitting them for execution with `transmit`.
+    The changes confirmed by TWS are also applied to the stored orders.
+    """
+    nowT = datetime.datetime.now()
+    movements: list[MovementRecord2] = list(self.movements_repo.find_for_batch(batch)(uow))
+    targets: list[OrderChange] = []
+    for m in movements:
+      changes: dict[str, Any] = {'transmit': True} if transmit else {}
+      if market:
+        changes.update(orderType=OrderType.MKT, lmtPrice=None)
+      elif limit_prices and m.ticker in limit_prices:
+        changes.update(orderType=OrderType.LMT, lmtPrice=limit_prices[m.ticker])
+      if changes:
+        targets.extend(OrderChange.of(m, o, changes) for o in open_orders_of(m))
+    confirmed, errors = self._order_changes(self.modify_proxy, targets)
+    for change in confirmed:
+      for k, v in change.changes.items():
+        setattr(change.order, k, v)
+      change.order.at = millis_epoch(nowT)
+    return ResultsBatch(
+      nowT, f"{len(confirmed)} of {len(targets)} open Orders Modified in batch: {batch}", [], [], [], [], movements, errors
+    )
+
+  @tracing.traced("tws order changes session", "tws")
+  def _order_changes(
+      self,
+      proxy: type[ChangeOrders],
+      targets: list[OrderChange]) -> tuple[list[OrderChange], dict[str, list[ErrorResponse]]]:
+    if not targets:
+      return [], {}
+    changing: ChangeOrders = proxy(
+      db=self.db,
+      targets=targets,
+      host=self.host,
+      port=self.port,
+      # Only the client that placed the orders can change them.
+      clientId=self.app_family + 1,
+    )
+    changing.activate()
+    errors = changing.wait_for_me()
+    return changing.confirmed, errors if errors else {}
+
+  @tracing.traced("capture executions")
+  def capture_executions(
+      self,
+      uow: UnitOfWork,
+      batch: Optional[str] = None,
+      since: Optional[str] = None
+  ) -> tuple[int, int, dict[str, list[ErrorResponse]]]:
+    """
+    Stores the executions, and their commissions, reported by TWS since `since` (`yyyymmdd hh:mm:ss`), by default since
+    the last stored execution, only for the orders of `batch` when given. Returns how many executions and commissions
+    were stored, with the errors of the session.
+    """
+    repo = self.execution_repo
+    if since is None:
+      last = repo.last_exec_time()(uow)
+      since = filter_time(last) if last else ""
+    execFilter = ExecutionFilter()
+    execFilter.time = since
+    capturing: ExecutionsProxy = self.executions_proxy(
+      db=self.db,
+      execFilter=execFilter,
+      host=self.host,
+      port=self.port,
+      # Only the client that placed the orders is sure to receive their executions.
+      clientId=self.app_family + 1,
+      orderRefPrefix=f"{batch}::" if batch else None,
+      known=repo.exec_ids_since(since)(uow),
+      commissioned=repo.exec_ids_since(since, commissioned=True)(uow),
+    )
+    capturing.activate()
+    errors = capturing.wait_for_me()
+    return capturing.executions, capturing.commissions, errors if errors else {}
+
+  @tracing.traced("check positions")
+  def check_positions(
+      self,
+      batch: str,
+      uow: UnitOfWork,
+      allocation: Optional[str] = None,
+      ttl: int = five_minutes,
+      refresh: bool = False
+  ) -> ResultsBatch:
+    """
+    Reconciles the movements of `batch` with the positions of the `allocation` account, or of all the accounts without
+    one, and with their stored executions: the sells that would leave a position short and the trades already executed.
+    """
+    nowT = datetime.datetime.now()
+    movements: list[MovementRecord2] = list(self.movements_repo.find_for_batch(batch)(uow))
+    positions, errors = self.positions(uow, ttl, refresh)
+    checks = reconcile(
+      movements, held(positions, allocation), executed_by_order_ref(self.execution_repo.for_batch(batch)(uow)))
+    shorts = sum(1 for c in checks if c.issue in (PositionIssue.OVER_SELL, PositionIssue.SHORT))
+    executed = sum(1 for c in checks if c.issue == PositionIssue.EXECUTED)
+    return ResultsBatch(
+      nowT,
+      f"{shorts} of {len(movements)} Movements would leave a short position, {executed} already executed in batch: {batch}",
+      [], [], [], [], movements, errors, positions=checks
+    )
+
+  @tracing.traced("rebalance")
+  def rebalance(
+      self,
+      weights: "pd.Series[float]",
+      uow: UnitOfWork,
+      prices: dict[str, float],
+      rates: dict[str, float],
+      lots: Optional[dict[str, int]] = None,
+      allocation: Optional[str] = None,
+      policy: Optional[RebalancePolicy] = None,
+      refresh: bool = False
+  ) -> tuple[pd.DataFrame, "pd.Series[float]", dict[str, list[ErrorResponse]]]:
+    """
+    The trades that take the positions of the `allocation` account, or of all the accounts without one, to the target
+    `weights` by ticker, see `rebalance_trades`. `rebalance_rows` turns them into the input rows of `place_orders`.
+    Also the positions held in names without a target weight, which are neither valued nor traded, see `untargeted`.
+    """
+    positions, errors = self.positions(uow, refresh=refresh)
+    if errors.get('error'):
+      return pd.DataFrame(columns=rebalance_columns), pd.Series(dtype=float, name='Position'), errors
+    holdings = held_by_symbol(positions, allocation)
+    outside = untargeted(weights, holdings)
+    if len(outside):
+      _logger.warning(
+        f"Positions in {len(outside)} names without a target weight are neither valued nor traded: {outside.index.to_list()}")
+    universe = rebalance_universe(weights, holdings, prices, rates, lots)
+    return rebalance_trades(universe, policy if policy else RebalancePolicy()), outside, errors
+
+  def positions(
+      self,
+      uow: UnitOfWork,
+      ttl: int = five_minutes,
+      refresh: bool = False) -> tuple[list[PositionRecord2], dict[str, list[ErrorResponse]]]:
+    """
+    The stored snapshot of the positions while it is valid, otherwise a new one from TWS that is valid for `ttl`
+    milliseconds. With `refresh` the stored snapshot is ignored. A snapshot with errors is not stored.
+    """
+    now = millis_epoch(datetime.datetime.now())
+    if not refresh:
+      cached = list(self.position_repo.current(now)(uow))
+      if cached:
+        _logger.info(f"Using the snapshot of {len(cached)} positions taken at {cached[0].at}")
+        return cached, {}
+    rows, errors = self._positions_snapshot(now + ttl)
+    if errors.get('error'):
+      return [], errors
+    self.position_repo.replace(rows)(uow)
+    return list(self.position_repo.current(now)(uow)), errors
+
+  @tracing.traced("tws positions session", "tws")
+  def _positions_snapshot(self, expires_on: int) -> tuple[list[dict[str, Any]], dict[str, list[ErrorResponse]]]:
+    snapshot: PositionsProxy = self.positions_proxy(
+      expires_on=expires_on,
+      host=self.host,
+      port=self.port,
+      clientId=self.app_family + 1,
+    )
+    snapshot.activate()
+    errors = snapshot.wait_for_me()
+    return snapshot.positions, errors if errors else {}
+
+  @tracing.traced("market prices")
+  def market_prices(
+      self,
+      contracts: dict[str, ContractRecord2],
+      uow: UnitOfWork,
+      refresh: bool = False) -> tuple[PriceTable, dict[str, list[ErrorResponse]]]:
+    """
+    The prices of `contracts` by key: those stored within the `staleness` of the market data configuration and, for the
+    rest, a snapshot from TWS that is stored for the next time. With `refresh` the stored prices are ignored.
+    """
+    keys = list(contracts)
+    table = PriceTable(keys, [contracts[k].con_id for k in keys])
+    if not refresh:
+      since = millis_epoch(datetime.datetime.now()) - self.market_data.staleness * 1000
+      table.load(self.price_repo.fresh(set(table.con_id.tolist()), since)(uow))
+    missing = [k for k in keys if not table.at[table.index[k]]]
+    if not missing:
+      return table, {}
+    _logger.info(f"Taking a snapshot of the prices of {len(missing)} of {len(keys)} contracts")
+    snapshot, errors = self._market_snapshot([(k, contracts[k].to_contract()) for k in missing])
+    self.price_repo.replace(MarketPriceRecord2.rows_of(snapshot, [contracts[k].symbol for k in missing]))(uow)
+    table.update(snapshot)
+    return table, errors
+
+  @tracing.traced("tws market snapshot session", "tws")
+  def _market_snapshot(self, targets: list[tuple[str, Contract]]) -> tuple[PriceTable, dict[str, list[ErrorResponse]]]:
+    snapshot: MarketSnapshotProxy = self.snapshot_proxy(
+      targets=targets,
+      host=self.host,
+      port=self.port,
+      clientId=self.app_family + 1,
+      market_data_type=self.market_data.market_data_type,
+      max_lines=self.market_data.max_lines,
+    )
+    snapshot.activate()
+    errors = snapshot.wait_for_me()
+    return snapshot.table, errors if errors else {}
+
+  def snapshot_limit_prices(
+      self,
+      batch: str,
+      uow: UnitOfWork,
+      offset_bps: float = 0.0) -> tuple[dict[str, float], dict[str, list[ErrorResponse]]]:
+    """
+    Marketable limit prices by ticker for the movements of `batch` with open orders, from the market prices: buys at the
+    ask and sells at the bid, `offset_bps` basis points beyond. See `PriceTable.limit_prices`.
+    """
+    movements = [m for m in self.movements_repo.find_for_batch(batch)(uow) if open_orders_of(m)]
+    table, errors = self.market_prices({m.ticker: m.contract for m in movements}, uow)
+    return table.limit_prices({m.ticker: m.trade for m in movements}, offset_bps), errors
+
+  @tracing.traced("top up bars")
+  def top_up_bars(
+      self,
+      uow: UnitOfWork,
+      bar_size: str,
+      since: datetime.datetime,
+      con_ids: Optional[set[int]] = None) -> tuple[dict[int, int], dict[str, list[ErrorResponse]]]:
+    """
+    Requests the bars of `bar_size` since `since` that are missing from the bar store for the known contracts, or only
+    those of `con_ids`, and stores them. Only the spans before the first and after the last stored bar of each contract
+    are requested, in as many requests as TWS needs for `bar_size`. Returns the number of bars received by conId.
+
+    The bars of a span are stored from where it joins the stored bars up to the first request that failed, the rest
+    would leave a gap that is never requested again and is requested next time instead.
+    """
+    nowT = datetime.datetime.now()
+    until = int(nowT.timestamp())
+    contracts: dict[int, ContractRecord2] = {}
+    for c in self.contract_repo.find(lambda q: q.where(ContractRecord2.expires_on > millis_epoch(nowT)))(uow):
+      if con_ids is None or c.con_id in con_ids:
+        contracts.setdefault(c.con_id, c)
+    targets, spans = self._bar_requests(list(contracts.values()), bar_size, int(since.timestamp()), until)
+    if not targets:
+      _logger.info(f"The bars of {bar_size} of {len(contracts)} contracts are up to date")
+      return {}, {}
+    _logger.info(f"Requesting {len(targets)} spans of bars of {bar_size} for {len(contracts)} contracts")
+    received, errors = self._historical_bars([t for _, t in targets], bar_size)
+    by_contract: dict[int, list[npt.NDArray[np.float64]]] = defaultdict(list)
+    for rows in spans:
+      for row in rows:
+        if row not in received:
+          _logger.warning(f"Not storing the bars of {targets[row][0]} past a failed request, they are requested again later")
+          break
+        by_contract[targets[row][0]].append(received[row])
+    counts: dict[int, int] = {}
+    for con_id, parts in by_contract.items():
+      bars = np.concatenate(parts, axis=1)
+      self.bar_store.append(con_id, bar_size, bars)
+      counts[con_id] = bars.shape[1]
+    return counts, errors
+
+  def _bar_requests(
+      self,
+      contracts: list[ContractRecord2],
+      bar_size: str,
+      since: int,
+      until: int) -> tuple[list[tuple[int, tuple[Contract, Optional[int], str]]], list[list[int]]]:
+    """
+    The requests of the bars missing from the bar store by conId and the rows of the requests of each missing span,
+    from the one next to the stored bars.
+    """
+    targets: list[tuple[int, tuple[Contract, Optional[int], str]]] = []
+    spans: list[list[int]] = []
+    for c in contracts:
+      stored = self.bar_store.span(c.con_id, bar_size)
+      for missing_from, missing_to in self.bar_store.missing(c.con_id, bar_size, since, until):
+        rows: list[int] = []
+        for start, end in chunks(missing_from, missing_to, bar_size):
+          rows.append(len(targets))
+          targets.append((c.con_id, (c.to_contract(), end if end < until else None, duration_of(end - start, bar_size))))
+        # The chunks go from the latest back, the span after the last stored bar joins it with its earliest chunk.
+        spans.append(rows[::-1] if stored and missing_from == stored[1] else rows)
+    return targets, spans
+
+  @tracing.traced("tws historical bars session", "tws")
+  def _historical_bars(
+      self,
+      targets: list[tuple[Contract, Optional[int], str]],
+      bar_size: str) -> tuple[dict[int, npt.NDArray[np.float64]], dict[str, list[ErrorResponse]]]:
+    historical: HistoricalBarsProxy = self.historical_proxy(
+      targets=targets,
+      bar_size=bar_size,
+      host=self.host,
+      port=self.port,
+      clientId=self.app_family + 1,
+      what_to_show=self.historical.what_to_show,
+      use_rth=self.historical.use_rth,
+      max_open=self.historical.max_open,
+    )
+    historical.activate()
+    errors = historical.wait_for_me()
+    return historical.bars, errors if errors else {}
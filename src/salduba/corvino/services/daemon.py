@@ -0,0 +1,103 @@
+import json
+import logging
+import os
+import socketserver
+import threading
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from salduba.common.configuration import Cfg
+from salduba.corvino.commands.client import LOOKUP, PING, PLACE, SHUTDOWN, VERIFY
+from salduba.corvino.io.parse_input import InputParser
+from salduba.corvino.io.results_out import ResultsBatch
+from salduba.corvino.services.app import CorvinoApp
+
+_logger = logging.getLogger(__name__)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+  server: 'CorvinoDaemon'
+
+  def handle(self) -> None:
+    line = self.rfile.readline()
+    if not line:
+      return
+    try:
+      reply = self.server.dispatch(json.loads(line))
+    except Exception as exc:
+      _logger.error(f"Request failed: {exc}", exc_info=True)
+      reply = {'ok': False, 'message': f"An error occurred: {str(exc)}", 'files': []}
+    self.wfile.write(json.dumps(reply).encode() + b'\n')
+
+
+class CorvinoDaemon(socketserver.UnixStreamServer):
+  """
+  Serves verify/lookup/place requests over a Unix domain socket with an application built once.
+
+  The configuration, the migrated DB and its engine, and the imported application modules stay warm between
+  requests. Requests are handled one at a time, as the application shares a single DB session. TWS connections are
+  still opened per request by the contract lookup and order placement proxies.
+  """
+
+  def __init__(self, app: CorvinoApp, cfg: Cfg, socket_path: Path) -> None:
+    self.app = app
+    self.cfg = cfg
+    self.socket_path = socket_path
+    if socket_path.exists():
+      socket_path.unlink()
+    super().__init__(str(socket_path), _RequestHandler)
+    os.chmod(socket_path, 0o600)
+    self._handlers: dict[str, Callable[[dict[str, Any]], dict[str, Any]]] = {
+      PING: lambda _: {'ok': True, 'message': 'pong', 'files': []},
+      SHUTDOWN: self._shutdown,
+      VERIFY: self._verify,
+      LOOKUP: self._lookup,
+      PLACE: self._place
+    }
+
+  def server_close(self) -> None:
+    super().server_close()
+    if self.socket_path.exists():
+      self.socket_path.unlink()
+
+  def dispatch(self, payload: dict[str, Any]) -> dict[str, Any]:
+    command = payload.get('command')
+    handler = self._handlers.get(command) if isinstance(command, str) else None
+    if handler is None:
+      return {'ok': False, 'message': f"Unknown command: {command}", 'files': []}
+    _logger.info(f"Serving {command}: {payload}")
+    return handler(payload)
+
+  def _shutdown(self, payload: dict[str, Any]) -> dict[str, Any]:
+    # `shutdown` waits for `serve_forever` to return, which only happens once this request completes.
+    threading.Thread(target=self.shutdown, name="CorvinoDaemon::Shutdown").start()
+    return {'ok': True, 'message': 'Shutting down', 'files': []}
+
+  def _reply(self, rs: ResultsBatch, ok: bool, output_file: Optional[str]) -> dict[str, Any]:
+    files = rs.write(output_file)
+    return {'ok': ok, 'message': rs.message, 'files': [str(f) for f in files]}
+
+  def _verify(self, payload: dict[str, Any]) -> dict[str, Any]:
+    rows = InputParser.input_rows_from(payload['input_file'], self.cfg.input.sheet_name)
+    with self.app.db.for_work() as uow:
+      rs = self.app.verify_contracts_for_input_rows(rows, uow)
+      return self._reply(rs, True, payload.get('output_file'))
+
+  def _lookup(self, payload: dict[str, Any]) -> dict[str, Any]:
+    rows = InputParser.input_rows_from(payload['input_file'], self.cfg.input.sheet_name)
+    with self.app.db.for_work() as uow:
+      rs = self.app.lookup_contracts_for_input_rows(rows, uow)
+      return self._reply(rs, not rs.unknown, payload.get('output_file'))
+
+  def _place(self, payload: dict[str, Any]) -> dict[str, Any]:
+    rows = InputParser.input_rows_from(payload['input_file'], self.cfg.input.sheet_name)
+    allocation = payload.get('allocation') or self.cfg.cervino.allocation
+    with self.app.db.for_work() as uow:
+      rs = self.app.lookup_contracts_for_input_rows(rows, uow)
+      if rs.unknown:
+        return self._reply(rs, False, payload.get('output_file'))
+      rs = self.app.place_orders(
+        rs.inputs, uow, payload.get('batch'), allocation, bool(payload.get('execute_trades')), risk=self.cfg.risk)
+      error_keys = [k.upper() for k in rs.errors.keys()]
+      blocked = bool(rs.violations) and not rs.movements
+      return self._reply(rs, "ERRORS" not in error_keys and not blocked, payload.get('output_file'))
@@ -0,0 +1,86 @@
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from enum import StrEnum
+from typing import Iterable, Optional
+
+from salduba.corvino.persistence.movement_record import MovementRecord2
+from salduba.ib_tws_proxy.executions.execution_repo import ExecutionRecord2
+from salduba.ib_tws_proxy.positions.position_repo import PositionRecord2
+
+_logger = logging.getLogger(__name__)
+
+
+class PositionIssue(StrEnum):
+  OVER_SELL = "over_sell"  # Sells more than the long position held, leaving it short
+  SHORT = "short"  # Sells with no long position, opening or increasing a short one
+  EXECUTED = "executed"
+  PARTIALLY_EXECUTED = "partially_executed"
+
+
+@dataclass
+class PositionCheck:
+  """
+  A movement of a batch against the position held in its contract. `executed` is the signed quantity already filled for
+  its orders, which the position already includes, so only the `remaining` quantity changes it to `resulting`.
+  """
+  ticker: str
+  symbol: str
+  con_id: int
+  trade: int
+  executed: float
+  remaining: float
+  position: float
+  resulting: float
+  issue: Optional[PositionIssue]
+
+
+def held(positions: Iterable[PositionRecord2], account: Optional[str] = None) -> dict[int, float]:
+  """The positions by conId of `account`, or of all the accounts together without one."""
+  by_contract: dict[int, float] = defaultdict(float)
+  for p in positions:
+    if not account or p.account == account:
+      by_contract[p.con_id] += p.position
+  return by_contract
+
+
+def executed_by_order_ref(executions: Iterable[ExecutionRecord2]) -> dict[str, float]:
+  """
+  The signed quantity executed for each order reference, with the executions of the child orders of a sliced order,
+  `<orderRef>#<i>/<n>`, added to their parent.
+  """
+  by_ref: dict[str, float] = defaultdict(float)
+  for e in executions:
+    if e.order_ref:
+      by_ref[e.order_ref.split('#', 1)[0]] += e.shares if e.side == "BOT" else -e.shares
+  return by_ref
+
+
+def _issue(executed: float, remaining: float, position: float, resulting: float) -> Optional[PositionIssue]:
+  if remaining < 0 and resulting < 0:
+    return PositionIssue.OVER_SELL if position > 0 else PositionIssue.SHORT
+  if executed and not remaining:
+    return PositionIssue.EXECUTED
+  if executed:
+    return PositionIssue.PARTIALLY_EXECUTED
+  return None
+
+
+def reconcile(
+    movements: list[MovementRecord2],
+    positions: dict[int, float],
+    executed: dict[str, float]) -> list[PositionCheck]:
+  """Checks each of `movements` against the `positions` by conId and the quantities `executed` by order reference."""
+  checks: list[PositionCheck] = []
+  for m in movements:
+    done = executed.get(m.order.orderRef, 0.0) if m.order.orderRef else 0.0
+    remaining = m.trade - done
+    position = positions.get(m.contract.con_id, 0.0)
+    resulting = position + remaining
+    checks.append(PositionCheck(
+      m.ticker, m.symbol, m.contract.con_id, m.trade, done, remaining, position, resulting,
+      _issue(done, remaining, position, resulting)))
+  issues = sum(1 for c in checks if c.issue in (PositionIssue.OVER_SELL, PositionIssue.SHORT))
+  if issues:
+    _logger.warning(f"{issues} of {len(checks)} movements would leave a short position")
+  return checks
@@ -0,0 +1,154 @@
+import logging
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from salduba.common.configuration import RiskConfig, RiskMode
+from salduba.corvino.persistence.movement_record import MovementRecord2
+from salduba.util import tracing
+
+_logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Exposure:
+  """
+  The notional of the orders of a batch with the same `key` of a `dimension` (`currency`, `country`, `exchange`), of the
+  single name with the largest one (`name`) or of all of them (`batch`), in the base currency. `weight` is the fraction
+  of the turnover of the batch.
+  """
+  dimension: str
+  key: str
+  orders: int
+  net: float
+  gross: float
+  weight: float
+  limit: Optional[float] = None
+
+
+@dataclass
+class Violation:
+  """A limit exceeded by an order (`order_quantity`, `order_notional`), a group of them or the batch."""
+  check: str
+  key: str
+  value: float
+  limit: float
+
+
+@dataclass
+class PreTradeCheck:
+  """`snapshot_errors` counts the errors of the market snapshot that priced the batch, if one was taken."""
+  exposures: list[Exposure]
+  violations: list[Violation]
+  blocked: bool
+  snapshot_errors: int = 0
+
+  @property
+  def message(self) -> str:
+    if self.blocked and self.snapshot_errors:
+      return f"Pre-trade checks blocked the batch with Errors[{self.snapshot_errors}] taking a snapshot of the market prices"
+    if not self.violations:
+      return "Pre-trade checks passed"
+    return f"Pre-trade checks {'blocked the batch' if self.blocked else 'flagged'} with {len(self.violations)} violations"
+
+
+def _groups(
+    keys: list[str],
+    net: npt.NDArray[np.float64],
+    gross: npt.NDArray[np.float64]) -> tuple[npt.NDArray[Any], npt.NDArray[Any], npt.NDArray[Any], npt.NDArray[Any]]:
+  """The distinct `keys` with their counts and the sums of `net` and `gross` over the rows of each one."""
+  uniques, inverse = np.unique(np.asarray(keys), return_inverse=True)
+  return (
+    uniques,
+    np.bincount(inverse, minlength=len(uniques)),
+    np.bincount(inverse, weights=net, minlength=len(uniques)),
+    np.bincount(inverse, weights=gross, minlength=len(uniques)))
+
+
+def _exceeding(values: npt.NDArray[np.float64], limit: Optional[float]) -> npt.NDArray[np.intp]:
+  return np.flatnonzero(values > limit) if limit is not None else np.empty(0, dtype=np.intp)
+
+
+def _batch_exposures(
+    tickers: list[str],
+    net: npt.NDArray[np.float64],
+    gross: npt.NDArray[np.float64],
+    limits: RiskConfig,
+    exposures: list[Exposure],
+    violations: list[Violation]) -> None:
+  """Adds the exposure of the largest single name and of the whole batch, and their violations."""
+  turnover = float(gross.sum())
+  names, name_counts, name_nets, name_grosses = _groups(tickers, net, gross)
+  if len(names) and turnover:
+    top = int(np.argmax(name_grosses))
+    weight = float(name_grosses[top] / turnover)
+    exposures.append(Exposure(
+      "name", str(names[top]), int(name_counts[top]), float(name_nets[top]), float(name_grosses[top]), weight,
+      limits.max_name_weight))
+    if limits.max_name_weight is not None and weight > limits.max_name_weight:
+      violations.append(Violation("name_weight", str(names[top]), weight, limits.max_name_weight))
+  exposures.append(Exposure("batch", "ALL", len(tickers), float(net.sum()), turnover, 1.0, limits.max_turnover))
+  if limits.max_turnover is not None and turnover > limits.max_turnover:
+    violations.append(Violation("turnover", "ALL", turnover, limits.max_turnover))
+
+
+@tracing.traced("pre-trade checks")
+def check_batch(
+    movements: list[MovementRecord2],
+    limits: RiskConfig,
+    prices: Optional[dict[str, float]] = None) -> PreTradeCheck:
+  """
+  Checks the orders of `movements` against `limits`, with the `prices` by ticker in the currency of each security.
+
+  The exposures are computed over columns of the whole batch, with one pass per dimension, so that the checks can run
+  before every placement. Orders without a price, or in a currency without an fx rate, have no notional and are
+  violations whenever a notional limit is configured.
+  """
+  if limits.mode == RiskMode.OFF or not movements:
+    return PreTradeCheck([], [], False)
+  prices = prices if prices else {}
+  tickers = [m.ticker for m in movements]
+  currencies = [str(m.currency) for m in movements]
+  quantity = np.fromiter((m.trade for m in movements), dtype=np.float64, count=len(movements))
+  price = np.fromiter((prices.get(t, np.nan) for t in tickers), dtype=np.float64, count=len(movements))
+  rates = {**limits.fx_rates, limits.base_currency: 1.0}
+  currency_keys, currency_rows = np.unique(np.asarray(currencies), return_inverse=True)
+  rate = np.array([rates.get(str(c), np.nan) for c in currency_keys], dtype=np.float64)[currency_rows]
+  net = np.nan_to_num(quantity * price * rate, nan=0.0)
+  gross = np.abs(net)
+  turnover = float(gross.sum())
+
+  violations: list[Violation] = [
+    Violation("order_quantity", tickers[idx], float(abs(quantity[idx])), float(limits.max_order_quantity or 0))
+    for idx in _exceeding(np.abs(quantity), limits.max_order_quantity)
+  ] + [
+    Violation("order_notional", tickers[idx], float(gross[idx]), float(limits.max_order_notional or 0))
+    for idx in _exceeding(gross, limits.max_order_notional)
+  ]
+  if limits.needs_prices:
+    violations.extend(Violation("price", tickers[idx], float("nan"), 0.0) for idx in np.flatnonzero(np.isnan(price)))
+    violations.extend(Violation("fx_rate", str(c), float("nan"), 0.0) for c in currency_keys if str(c) not in rates)
+
+  exposures: list[Exposure] = []
+  dimensions: list[tuple[str, list[str], dict[str, float]]] = [
+    ("currency", currencies, limits.max_notional_by_currency),
+    ("country", [str(m.country) for m in movements], limits.max_notional_by_country),
+    ("exchange", [str(m.contract.primary_exchange) for m in movements], limits.max_notional_by_exchange),
+  ]
+  for dimension, keys, by_key in dimensions:
+    uniques, counts, nets, grosses = _groups(keys, net, gross)
+    group_limits = np.array([by_key.get(str(k), np.inf) for k in uniques], dtype=np.float64)
+    for idx in np.flatnonzero(grosses > group_limits):
+      violations.append(Violation(f"{dimension}_notional", str(uniques[idx]), float(grosses[idx]), float(group_limits[idx])))
+    exposures.extend(
+      Exposure(dimension, str(k), int(n), float(nt), float(g), float(g / turnover) if turnover else 0.0, by_key.get(str(k)))
+      for k, n, nt, g in zip(uniques, counts, nets, grosses))
+
+  _batch_exposures(tickers, net, gross, limits, exposures, violations)
+
+  blocked = bool(violations) and limits.mode == RiskMode.BLOCK
+  if violations:
+    _logger.warning(f"{len(violations)} pre-trade violations, {'blocking' if blocked else 'flagging'} the batch")
+  return PreTradeCheck(exposures, violations, blocked)
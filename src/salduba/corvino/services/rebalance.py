@@ -0,0 +1,122 @@
+import logging
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from salduba.corvino.io.parse_input import InputParser, InputRow
+from salduba.ib_tws_proxy.positions.position_repo import PositionRecord2
+from salduba.util import tracing
+
+_logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RebalancePolicy:
+  """
+  How target weights become trades. Without a `nav` the portfolio is valued at the positions held in the names of the
+  targets. Trades smaller than `min_notional`, in the base currency, or than `min_weight_change` of the `nav` are not
+  made, except to close a position with a target weight of 0.
+  """
+  nav: Optional[float] = None
+  min_notional: float = 0.0
+  min_weight_change: float = 0.0
+
+
+rebalance_columns = ['Weight', 'Position', 'Price', 'Rate', 'Lot', 'Current', 'Target', 'Trade']
+
+
+def held_by_symbol(positions: Iterable[PositionRecord2], account: Optional[str] = None) -> "pd.Series[float]":
+  """
+  The positions of `account`, or of all the accounts together without one, by symbol and currency, as TWS reports
+  positions by contract and not by ticker.
+  """
+  rows = [(p.symbol, p.currency, p.position) for p in positions if not account or p.account == account]
+  frame = pd.DataFrame(rows, columns=['Symbol', 'Currency', 'Position'])
+  return frame.groupby(['Symbol', 'Currency'])['Position'].sum()
+
+
+@tracing.traced("rebalance trades")
+def rebalance_trades(universe: pd.DataFrame, policy: RebalancePolicy) -> pd.DataFrame:
+  """
+  The trades, in whole lots, that take the positions of `universe` to their target weights.
+
+  `universe` is indexed by ticker with the columns `Weight`, `Position`, `Price` (in the currency of the security), `Rate`
+  (units of the base currency per unit of that currency) and `Lot`. The result adds the `Current` and `Target` values,
+  in the base currency, and the `Trade` of each name, 0 for the names that do not trade.
+  """
+  weight = universe['Weight'].to_numpy(dtype=np.float64)
+  position = universe['Position'].to_numpy(dtype=np.float64)
+  unit = universe['Price'].to_numpy(dtype=np.float64) * universe['Rate'].to_numpy(dtype=np.float64)
+  lot = universe['Lot'].to_numpy(dtype=np.float64)
+  unvalued = ~(unit > 0)
+  if unvalued.any():
+    raise ValueError(f"Cannot Find Prices or Fx Rates for:\n {universe.index[unvalued].to_list()}")
+  if not (lot > 0).all():
+    raise ValueError(f"Lot sizes must be positive, found:\n {universe.index[~(lot > 0)].to_list()}")
+  if weight.sum() > 1.0:
+    _logger.warning(f"The target weights add up to {weight.sum():.4f}, the rebalanced portfolio is leveraged")
+
+  current = position * unit
+  nav = policy.nav if policy.nav is not None else float(current.sum())
+  if nav <= 0:
+    raise ValueError(f"Cannot rebalance a portfolio valued at {nav}, provide its net asset value")
+  target = weight * nav
+  trade = np.rint((target - current) / unit / lot) * lot
+  exits = (weight == 0) & (position != 0)
+  small = (np.abs(trade * unit) < policy.min_notional) | (np.abs(target - current) < policy.min_weight_change * nav)
+  trade = np.where(exits, -position, np.where(small, 0.0, trade))
+
+  result = universe.copy()
+  result['Current'] = current
+  result['Target'] = target
+  result['Trade'] = trade.astype(np.int64)
+  return result[rebalance_columns]
+
+
+def rebalance_universe(
+    weights: "pd.Series[float]",
+    held: "pd.Series[float]",
+    prices: dict[str, float],
+    rates: dict[str, float],
+    lots: Optional[dict[str, int]] = None) -> pd.DataFrame:
+  """
+  The universe of `rebalance_trades` for the target `weights` by ticker, with the positions `held` by symbol and currency,
+  the `prices` by ticker and the fx `rates` by currency. Names without a lot size in `lots` trade in lots of 1.
+  """
+  if weights.index.has_duplicates:
+    raise ValueError(f"Tickers with more than one target weight:\n {weights.index[weights.index.duplicated()].to_list()}")
+  tickers = weights.index.astype(str)
+  keys = _held_keys(weights)
+  return pd.DataFrame({
+    'Weight': weights.to_numpy(dtype=np.float64),
+    'Position': held.reindex(keys, fill_value=0.0).to_numpy(dtype=np.float64),
+    'Price': pd.Series(prices, dtype=np.float64).reindex(tickers).to_numpy(),
+    'Rate': pd.Series(rates, dtype=np.float64).reindex(keys.get_level_values('Currency')).to_numpy(),
+    'Lot': pd.Series(lots if lots else {}, dtype=np.float64).reindex(tickers, fill_value=1.0).to_numpy(),
+  }, index=pd.Index(tickers, name='Ticker'))
+
+
+def _held_keys(weights: "pd.Series[float]") -> pd.MultiIndex:
+  """The symbol and currency, as in `held_by_symbol`, of each ticker of `weights`."""
+  rows = InputParser.input_rows_of(pd.Series(0, index=weights.index))
+  by_ticker = {r.ticker: r for r in rows}
+  tickers = weights.index.astype(str)
+  return pd.MultiIndex.from_arrays(
+    [[by_ticker[t].symbol for t in tickers], [str(by_ticker[t].currency) for t in tickers]], names=['Symbol', 'Currency'])
+
+
+def untargeted(weights: "pd.Series[float]", held: "pd.Series[float]") -> "pd.Series[float]":
+  """
+  The positions `held`, by symbol and currency, in names without a target in `weights`. The rebalance neither values
+  nor trades them, a target weight of 0 closes a position.
+  """
+  outside = held[(held != 0) & ~held.index.isin(_held_keys(weights))]
+  outside.name = 'Position'
+  return outside
+
+
+def rebalance_rows(trades: pd.DataFrame) -> list[InputRow]:
+  """The input rows of `place_orders` for the names of `trades` that trade."""
+  return InputParser.input_rows_of(trades.loc[trades['Trade'] != 0, 'Trade'])
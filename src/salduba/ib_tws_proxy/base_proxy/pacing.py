@@ -0,0 +1,25 @@
+import time
+from typing import Optional
+
+# TWS disconnects clients that send more than 50 messages per second.
+tws_max_rate = 50.0
+
+
+class Pacer:
+  """
+  Spaces consecutive requests at least `1/rate` seconds apart, without waiting for their responses. The schedule
+  is kept from the first request so that the time spent sending does not add to the spacing.
+  """
+  def __init__(self, rate: float = 45.0) -> None:
+    if not 0 < rate <= tws_max_rate:
+      raise ValueError(f"The rate must be in (0, {tws_max_rate}] messages per second, not {rate}")
+    self.interval = 1.0 / rate
+    self._next_at: Optional[float] = None
+
+  def wait(self) -> None:
+    now = time.monotonic()
+    if self._next_at is None:
+      self._next_at = now
+    elif self._next_at > now:
+      time.sleep(self._next_at - now)
+    self._next_at += self.interval
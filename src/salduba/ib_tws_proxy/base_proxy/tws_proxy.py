@@ -8,6 +8,7 @@ from ibapi.utils import current_fn_name
 from ibapi.wrapper import EWrapper
 
 from salduba.ib_tws_proxy.operations import ErrorResponse, OperationsTracker, SuccessResponse
+from salduba.util import tracing
 
 _logger = logging.getLogger(__name__)
 
@@ -161,7 +162,7 @@ class BaseProxy(ClientStub, Listener):
     self._lock = threading.Lock()
     self._lock_counter: int = 0
     self._listener: threading.Thread = threading.Thread(
-     target=self.run, name=f"{self.__class__.__name__}::Listener::{clientId}"
+     target=self._listen, name=f"{self.__class__.__name__}::Listener::{clientId}"
     )
     self._commander: threading.Thread = threading.Thread(
       target=self._commandActivator, name=f"{self.__class__.__name__}::Commander::{clientId}",
@@ -181,19 +182,24 @@ class BaseProxy(ClientStub, Listener):
 
   def activate(self) -> None:
     _logger.info(f"Connecting to {self._host}:{self._port} with ClientId: {self.clientId}")
-    self.connect(self._host, self._port, self.clientId)  # pyright: ignore
+    with tracing.span("tws connect", "tws", host=self._host, port=self._port, clientId=self.clientId):
+      self.connect(self._host, self._port, self.clientId)  # pyright: ignore
     _logger.info("serverVersion: %s connectionTime: %s" % (self.serverVersion(), self.twsConnectionTime()))
     self._listener.start()
     self._max_time_cleanup.start()
     # if self.terminate:
     #   self._console_watcher.start()
 
+  def _listen(self) -> None:
+    with tracing.span("listen", "tws"):
+      self.run()
+
   def wait_for_me(self) -> Optional[dict[str, list[ErrorResponse]]]:
-    if not self.isActive():
-      self._listener.join()
-      self._max_time_cleanup.join()
-      return self.responseTracker.errorResults()
-    return None
+    # The listener runs until the proxy stops, either because all responses arrived or because of the timeout.
+    # Checking `isActive` first raced with the listener starting the tracker and could return before any response.
+    self._listener.join()
+    self._max_time_cleanup.join()
+    return self.responseTracker.errorResults()
 
   def stop(self, reason: str = "") -> None:
     _logger.info(f"Stopping because of {reason}")
@@ -214,8 +220,8 @@ class BaseProxy(ClientStub, Listener):
 
   def startIfPossible(self) -> None:
     _logger.debug(
-       f"StartIfPossible() called: {self.responseTracker.isStarted()},"
-       f" {self.responseTracker.isInitialized()}, {self.accounts}"
+       "StartIfPossible() called: %s, %s, %s",
+       self.responseTracker.isStarted(), self.responseTracker.isInitialized(), self.accounts
     )
     if not self.responseTracker.isStarted() and self.responseTracker.isInitialized() and self.accounts:
       self.responseTracker.start()
@@ -223,7 +229,8 @@ class BaseProxy(ClientStub, Listener):
 
   def _commandActivator(self) -> None:
     try:
-      self.runCommands()
+      with tracing.span("run commands", "tws"):
+        self.runCommands()
       with self._lock:
         _logger.debug("Run Commands is Complete")
         self.responseTracker.requestsComplete()
@@ -251,7 +258,8 @@ class BaseProxy(ClientStub, Listener):
       self.responseTracker.complete(SuccessResponse(reqId))
       result = self._in_progress.pop(reqId, [])
     if self.responseTracker.isIdle():
-      _logger.debug(f"Tracker found idle at end of response: {reqId}: {current_fn_name(2)}::{current_fn_name(1)}")
+      if _logger.isEnabledFor(logging.DEBUG):
+        _logger.debug("Tracker found idle at end of response: %s: %s::%s", reqId, current_fn_name(2), current_fn_name(1))
       self.stop("Tracker is Idle")
     else:
       _logger.debug("Tracker not Idle")
@@ -47,15 +47,15 @@ class LookupContractDetails(BaseProxy):
     return
 
   def contractDetails(self, reqId: int, contractDetails: ContractDetails) -> None:
-    _logger.debug(f"Received ContractDetails for {reqId}: {contractDetails}")
+    _logger.debug("Received ContractDetails for %s: %s", reqId, contractDetails)
     self.partialResponse(reqId, {"contractDetails": contractDetails})
 
   def contractDetailsEnd(self, reqId: int) -> None:
-    _logger.debug(f"Received ContractDetailsEnd for {reqId}")
+    _logger.debug("Received ContractDetailsEnd for %s", reqId)
     with self._lock:
       contract = self.requestedContracts.get(reqId)
       receivedDetails = self.responsesFor(reqId)
-    _logger.debug(f"Found: {receivedDetails} for {contract}")
+    _logger.debug("Found: %s for %s", receivedDetails, contract)
     if not contract:
       msg = f"Received ContractDetailsEnd for not requested contract with reqId: {reqId}"
       _logger.error(msg)
@@ -66,7 +66,7 @@ class LookupContractDetails(BaseProxy):
       self.responseTracker.error(ErrorResponse(reqId, 8888, msg, ""))
       raise Exception(msg)
     else:
-      _logger.debug(f"Post Processing Contract: {contract.symbol}")
+      _logger.debug("Post Processing Contract: %s", contract.symbol)
       try:
         self.postProcess(contract, receivedDetails)
         self.completeResponse(reqId)
@@ -0,0 +1,147 @@
+import logging
+from typing import Any, Callable, Iterable, Optional
+from uuid import uuid4
+
+from ibapi.commission_report import CommissionReport  # pyright: ignore
+from ibapi.common import UNSET_DOUBLE  # pyright: ignore
+from ibapi.contract import Contract  # pyright: ignore
+from ibapi.execution import Execution  # pyright: ignore
+from sqlalchemy import Float, ForeignKey, Integer, String, func, insert, select
+from sqlalchemy.orm import Mapped, mapped_column
+
+from salduba.common.persistence.alchemy.db import UnitOfWork
+from salduba.common.persistence.alchemy.repo import RecordBase, RepoOps
+
+_logger = logging.getLogger(__name__)
+
+
+class ExecutionRecord2(RecordBase):
+  """
+  A fill reported by TWS through `execDetails`.
+  See: https://interactivebrokers.github.io/tws-api/classIBApi_1_1Execution.html
+  """
+  __tablename__: str = 'EXECUTION'
+  exec_id: Mapped[str] = mapped_column(String(255), nullable=False, unique=True)
+  # `yyyymmdd hh:mm:ss`, optionally followed by the time zone, as reported by TWS with the blanks collapsed so that
+  # it compares as text with the time of an `ExecutionFilter`.
+  exec_time: Mapped[str] = mapped_column(String(255), nullable=False)
+  account: Mapped[str] = mapped_column(String(255), nullable=False)
+  order_id: Mapped[int] = mapped_column(Integer, nullable=False)
+  perm_id: Mapped[int] = mapped_column(Integer, nullable=False)
+  client_id: Mapped[int] = mapped_column(Integer, nullable=False)
+  order_ref: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+  con_id: Mapped[int] = mapped_column(Integer, nullable=False)
+  symbol: Mapped[str] = mapped_column(String(255), nullable=False)
+  sec_type: Mapped[str] = mapped_column(String(255), nullable=False)
+  currency: Mapped[str] = mapped_column(String(255), nullable=False)
+  exchange: Mapped[str] = mapped_column(String(255), nullable=False)
+  side: Mapped[str] = mapped_column(String(255), nullable=False)
+  shares: Mapped[float] = mapped_column(Float, nullable=False)
+  price: Mapped[float] = mapped_column(Float, nullable=False)
+  cum_qty: Mapped[float] = mapped_column(Float, nullable=False)
+  avg_price: Mapped[float] = mapped_column(Float, nullable=False)
+  liquidation: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+  last_liquidity: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+  @staticmethod
+  def row_of(contract: Contract, execution: Execution, at: int) -> dict[str, Any]:
+    return {
+      'rid': str(uuid4()),
+      'at': at,
+      'exec_id': execution.execId,
+      'exec_time': " ".join(execution.time.split()),
+      'account': execution.acctNumber,
+      'order_id': execution.orderId,
+      'perm_id': execution.permId,
+      'client_id': execution.clientId,
+      'order_ref': execution.orderRef if execution.orderRef else None,
+      'con_id': contract.conId,
+      'symbol': contract.symbol,
+      'sec_type': contract.secType,
+      'currency': contract.currency,
+      'exchange': execution.exchange,
+      'side': execution.side,
+      'shares': float(execution.shares),
+      'price': execution.price,
+      'cum_qty': float(execution.cumQty),
+      'avg_price': execution.avgPrice,
+      'liquidation': execution.liquidation,
+      'last_liquidity': execution.lastLiquidity
+    }
+
+
+class CommissionRecord2(RecordBase):
+  """
+  The commission of an execution, reported by TWS through `commissionReport`.
+  See: https://interactivebrokers.github.io/tws-api/classIBApi_1_1CommissionReport.html
+  """
+  __tablename__: str = 'COMMISSION'
+  exec_id: Mapped[str] = mapped_column(String(255), ForeignKey(ExecutionRecord2.exec_id), nullable=False, unique=True)
+  commission: Mapped[float] = mapped_column(Float, nullable=False)
+  currency: Mapped[str] = mapped_column(String(255), nullable=False)
+  realized_pnl: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+  yield_value: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+  yield_redemption_date: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+
+  @staticmethod
+  def row_of(report: CommissionReport, at: int) -> dict[str, Any]:
+    # TWS leaves the values that do not apply, like the realized P&L of an opening trade, as UNSET_DOUBLE.
+    def unset_as_none(v: float) -> Optional[float]:
+      return None if v == UNSET_DOUBLE else v
+    return {
+      'rid': str(uuid4()),
+      'at': at,
+      'exec_id': report.execId,
+      'commission': report.commission,
+      'currency': report.currency,
+      'realized_pnl': unset_as_none(report.realizedPNL),
+      'yield_value': unset_as_none(report.yield_),
+      'yield_redemption_date': report.yieldRedemptionDate if report.yieldRedemptionDate else None
+    }
+
+
+class ExecutionRecordOps(RepoOps[ExecutionRecord2]):
+  def __init__(self) -> None:
+    super().__init__(ExecutionRecord2)
+
+  def for_batch(self, batch: str) -> Callable[[UnitOfWork], Iterable[ExecutionRecord2]]:
+    return self.find(
+      lambda q: q.where(ExecutionRecord2.order_ref.startswith(f"{batch}::")).order_by(ExecutionRecord2.exec_time)
+    )
+
+  def last_exec_time(self) -> Callable[[UnitOfWork], Optional[str]]:
+    def rs(uow: UnitOfWork) -> Optional[str]:
+      with uow.in_unit() as s:
+        return s.execute(select(func.max(ExecutionRecord2.exec_time))).scalar_one_or_none()
+    return rs
+
+  def exec_ids_since(self, exec_time: str, commissioned: bool = False) -> Callable[[UnitOfWork], set[str]]:
+    """
+    The ids of the executions stored at or after `exec_time`, or only of those with a commission, to skip them when TWS
+    reports them again.
+    """
+    def rs(uow: UnitOfWork) -> set[str]:
+      query = select(ExecutionRecord2.exec_id).where(ExecutionRecord2.exec_time >= exec_time)
+      if commissioned:
+        query = query.join(CommissionRecord2, CommissionRecord2.exec_id == ExecutionRecord2.exec_id)
+      with uow.in_unit() as s:
+        return set(s.execute(query).scalars())
+    return rs
+
+  def insert_rows(self, executions: list[dict[str, Any]], commissions: list[dict[str, Any]]) -> Callable[[UnitOfWork], None]:
+    """Bulk inserts executions and commissions given as rows, the executions first so that the commissions can refer to them."""
+    def rs(uow: UnitOfWork) -> None:
+      with uow.in_unit() as s:
+        if executions:
+          s.execute(insert(ExecutionRecord2), executions)
+        if commissions:
+          s.execute(insert(CommissionRecord2), commissions)
+    return rs
+
+
+class CommissionRecordOps(RepoOps[CommissionRecord2]):
+  def __init__(self) -> None:
+    super().__init__(CommissionRecord2)
+
+  def for_executions(self, exec_ids: Iterable[str]) -> Callable[[UnitOfWork], Iterable[CommissionRecord2]]:
+    return self.find(lambda q: q.where(CommissionRecord2.exec_id.in_(list(exec_ids))))
@@ -0,0 +1,139 @@
+import logging
+import threading
+from typing import Any, Optional
+
+from ibapi.commission_report import CommissionReport  # pyright: ignore
+from ibapi.contract import Contract  # pyright: ignore
+from ibapi.execution import Execution, ExecutionFilter  # pyright: ignore
+
+from salduba.common.persistence.alchemy.db import Db
+from salduba.ib_tws_proxy.base_proxy.tws_proxy import BaseProxy
+from salduba.ib_tws_proxy.executions.execution_repo import CommissionRecord2, ExecutionRecord2, ExecutionRecordOps
+from salduba.util.time import millis_epoch
+
+_logger = logging.getLogger(__name__)
+
+
+def filter_time(exec_time: str) -> str:
+  """The `yyyymmdd hh:mm:ss` that `ExecutionFilter.time` expects, from the time of a stored execution."""
+  return " ".join(exec_time.split()[:2])
+
+
+class ExecutionsProxy(BaseProxy):
+  """
+  Requests the executions matching `execFilter` and stores their `execDetails` and `commissionReport` callbacks as rows
+  of `EXECUTION` and `COMMISSION`, inserted in bulk every `chunk` rows and when the session ends.
+
+  TWS can only filter by time, client, account, contract and side, so the executions of one batch are selected here by
+  the `orderRef` prefix `<batch>::`. The executions in `known`, and the commissions in `commissioned`, were stored by an
+  earlier session and are skipped, which makes polling with the time of the last stored execution incremental.
+
+  Commission reports may arrive after `execDetailsEnd`. The session waits for them up to `commission_wait` seconds.
+  """
+  def __init__(
+      self,
+      db: Db,
+      execFilter: ExecutionFilter,
+      host: str,
+      port: int,
+      clientId: int,
+      orderRefPrefix: Optional[str] = None,
+      known: Optional[set[str]] = None,
+      commissioned: Optional[set[str]] = None,
+      commission_wait: float = 5.0,
+      chunk: int = 1000,
+      timeout: float = 5 * 60,
+  ) -> None:
+    super().__init__(host, port, clientId, timeout=timeout)
+    # Its own session, the rows are written from the listener thread.
+    self.db = Db(db.engine)
+    self.repo = ExecutionRecordOps()
+    self.execFilter = execFilter
+    self.orderRefPrefix = orderRefPrefix
+    self.known: set[str] = set(known) if known else set()
+    self.commissioned: set[str] = set(commissioned) if commissioned else set()
+    self.commission_wait = commission_wait
+    self.chunk = chunk
+    self.received: set[str] = set()
+    self.executions = 0
+    self.commissions = 0
+    self._executionRows: list[dict[str, Any]] = []
+    self._commissionRows: list[dict[str, Any]] = []
+    self._writeLock = threading.Lock()
+    self._reqId: Optional[int] = None
+    self._grace: Optional[threading.Timer] = None
+    self._finished = False
+
+  def runCommands(self) -> None:
+    with self._lock:
+      self._reqId = self.responseTracker.nextOpId()
+      _logger.info(f"Requesting executions[{self._reqId}] since '{self.execFilter.time}' for '{self.orderRefPrefix}'")
+      self.reqExecutions(self._reqId, self.execFilter)
+
+  def execDetails(self, reqId: int, contract: Contract, execution: Execution) -> None:
+    _logger.debug("Received execDetails[%s]: %s %s %s@%s", reqId, execution.execId, contract.symbol, execution.shares,
+                  execution.price)
+    if self.orderRefPrefix and not (execution.orderRef or "").startswith(self.orderRefPrefix):
+      return
+    with self._writeLock:
+      if execution.execId in self.known or execution.execId in self.received:
+        return
+      self.received.add(execution.execId)
+      self._executionRows.append(ExecutionRecord2.row_of(contract, execution, millis_epoch()))
+    self._flushIfFull()
+
+  def commissionReport(self, commissionReport: CommissionReport) -> None:
+    _logger.debug("Received commissionReport: %s %s", commissionReport.execId, commissionReport.commission)
+    execId = commissionReport.execId
+    with self._writeLock:
+      if execId in self.commissioned or not (execId in self.received or execId in self.known):
+        return
+      self.commissioned.add(execId)
+      self._commissionRows.append(CommissionRecord2.row_of(commissionReport, millis_epoch()))
+      complete = self._grace is not None and self.received <= self.commissioned
+    self._flushIfFull()
+    if complete:
+      self._finish()
+
+  def execDetailsEnd(self, reqId: int) -> None:
+    _logger.info("Received execDetailsEnd[%s] with %s new executions", reqId, len(self.received))
+    with self._writeLock:
+      missing = len(self.received - self.commissioned)
+    if missing:
+      _logger.debug(f"Waiting up to {self.commission_wait} seconds for {missing} commission reports")
+      self._grace = threading.Timer(self.commission_wait, self._finish)
+      self._grace.start()
+    else:
+      self._finish()
+
+  def _finish(self) -> None:
+    with self._writeLock:
+      if self._finished:
+        return
+      self._finished = True
+    if self._grace:
+      self._grace.cancel()
+    self.flush()
+    if self._reqId is not None:
+      self.completeResponse(self._reqId)
+
+  def _flushIfFull(self) -> None:
+    if len(self._executionRows) + len(self._commissionRows) >= self.chunk:
+      self.flush()
+
+  def flush(self) -> None:
+    with self._writeLock:
+      executions, self._executionRows = self._executionRows, []
+      commissions, self._commissionRows = self._commissionRows, []
+      if executions or commissions:
+        with self.db.for_work() as uow:
+          self.repo.insert_rows(executions, commissions)(uow)
+        self.executions += len(executions)
+        self.commissions += len(commissions)
+        _logger.debug(f"Stored {len(executions)} executions and {len(commissions)} commissions")
+
+  def stop(self, reason: str = "") -> None:
+    if self._grace:
+      self._grace.cancel()
+    super().stop(reason)
+    self.flush()
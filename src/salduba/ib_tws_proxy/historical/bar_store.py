@@ -0,0 +1,143 @@
+import logging
+import math
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+_logger = logging.getLogger(__name__)
+
+
+# The columns of the stored bars, `time` in epoch seconds and the rest as reported by TWS.
+bar_columns = ['time', 'open', 'high', 'low', 'close', 'volume', 'wap', 'count']
+
+# The seconds of each supported bar size and the longest span that TWS answers in a single request for it.
+# See: https://interactivebrokers.github.io/tws-api/historical_limitations.html
+bar_sizes: dict[str, tuple[int, int]] = {
+  "1 min": (60, 86400),
+  "5 mins": (300, 7 * 86400),
+  "15 mins": (900, 7 * 86400),
+  "30 mins": (1800, 30 * 86400),
+  "1 hour": (3600, 30 * 86400),
+  "1 day": (86400, 365 * 86400),
+}
+
+
+def bar_seconds(bar_size: str) -> int:
+  if bar_size not in bar_sizes:
+    raise ValueError(f"Unsupported bar size '{bar_size}', use one of: {', '.join(bar_sizes)}")
+  return bar_sizes[bar_size][0]
+
+
+def duration_of(seconds: int, bar_size: str) -> str:
+  """The TWS duration of a request that covers `seconds` of bars of `bar_size`."""
+  size = bar_seconds(bar_size)
+  if size < 86400 and seconds <= 86400:
+    return f"{max(seconds, size)} S"
+  days = max(math.ceil(seconds / 86400), 1)
+  return f"{days} D" if days <= 365 else f"{math.ceil(days / 365)} Y"
+
+
+def chunks(start: int, end: int, bar_size: str) -> list[tuple[int, int]]:
+  """The spans, from the latest one back, in which to request the bars of `bar_size` from `start` to `end`."""
+  bar_seconds(bar_size)
+  span = bar_sizes[bar_size][1]
+  rs: list[tuple[int, int]] = []
+  while end > start:
+    rs.append((max(start, end - span), end))
+    end -= span
+  return rs
+
+
+class BarStore:
+  """
+  Historical bars on disk under `root`, one file per bar size and contract: `<root>/<bar size>/<conId>.npy`.
+
+  Each file holds a 2-D float64 array with one row per column of `bar_columns` and the bars sorted by time, so that a
+  column of years of bars is contiguous and is read through a memory map without loading the rest of the file.
+  """
+  def __init__(self, root: Path) -> None:
+    self.root = root
+
+  def path(self, con_id: int, bar_size: str) -> Path:
+    bar_seconds(bar_size)
+    return self.root.joinpath(bar_size.replace(' ', ''), f"{con_id}.npy")
+
+  def read(
+      self,
+      con_id: int,
+      bar_size: str,
+      start: Optional[int] = None,
+      end: Optional[int] = None) -> npt.NDArray[np.float64]:
+    """
+    The stored bars of `con_id` from `start` and before `end`, in epoch seconds, as a read-only memory map of shape
+    `(len(bar_columns), bars)`. Empty when there are none.
+    """
+    file = self.path(con_id, bar_size)
+    if not file.exists():
+      return np.empty((len(bar_columns), 0), dtype=np.float64)
+    bars: npt.NDArray[np.float64] = np.load(file, mmap_mode='r')
+    times = bars[0]
+    lo = int(np.searchsorted(times, start, side='left')) if start is not None else 0
+    hi = int(np.searchsorted(times, end, side='left')) if end is not None else len(times)
+    return bars[:, lo:hi]
+
+  def frame(self, con_id: int, bar_size: str, start: Optional[int] = None, end: Optional[int] = None) -> pd.DataFrame:
+    """The stored bars as a DataFrame indexed by their UTC time."""
+    bars = self.read(con_id, bar_size, start, end)
+    frame = pd.DataFrame({c: np.asarray(bars[idx]) for idx, c in enumerate(bar_columns[1:], start=1)})
+    frame.index = pd.to_datetime(np.asarray(bars[0], dtype=np.int64), unit='s', utc=True)
+    frame.index.name = 'time'
+    return frame
+
+  def span(self, con_id: int, bar_size: str) -> Optional[tuple[int, int]]:
+    """The times of the first and last stored bars of `con_id`, None without any."""
+    bars = self.read(con_id, bar_size)
+    return (int(bars[0, 0]), int(bars[0, -1])) if bars.shape[1] else None
+
+  def missing(self, con_id: int, bar_size: str, since: int, until: int) -> list[tuple[int, int]]:
+    """
+    The spans of time from `since` to `until` that are not stored for `con_id`: before the first bar and after the last.
+    The last stored bar is requested again, it may have been stored before it ended. Gaps between the stored bars, such
+    as holidays or halts, are not looked for.
+    """
+    stored = self.span(con_id, bar_size)
+    if not stored:
+      return [(since, until)] if until > since else []
+    first, last = stored
+    rs: list[tuple[int, int]] = []
+    if since < first:
+      rs.append((since, first))
+    if until - last >= bar_seconds(bar_size):
+      rs.append((last, until))
+    return rs
+
+  def append(self, con_id: int, bar_size: str, bars: npt.NDArray[np.float64]) -> int:
+    """
+    Merges `bars`, of shape `(len(bar_columns), n)`, with the stored ones of `con_id`, the new bar replacing a stored one
+    with the same time, and returns the number of bars stored. The file is replaced at once, so that readers never
+    see a partially written one.
+    """
+    if bars.shape[0] != len(bar_columns):
+      raise ValueError(f"Bars must have the {len(bar_columns)} columns {bar_columns}, found {bars.shape[0]}")
+    file = self.path(con_id, bar_size)
+    stored = np.array(self.read(con_id, bar_size))
+    merged = np.concatenate([bars, stored], axis=1)
+    # `np.unique` keeps the first of each time, the new bars come first.
+    _, first = np.unique(merged[0], return_index=True)
+    merged = np.ascontiguousarray(merged[:, first])
+    file.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp = tempfile.mkstemp(dir=file.parent, suffix=".tmp")
+    try:
+      with os.fdopen(fd, 'wb') as f:
+        np.save(f, merged)
+      os.replace(temp, file)
+    except BaseException:
+      os.unlink(temp)
+      raise
+    _logger.debug(f"Stored {merged.shape[1]} bars of {bar_size} for {con_id}, {bars.shape[1]} received")
+    return int(merged.shape[1])
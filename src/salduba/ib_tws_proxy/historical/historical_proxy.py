@@ -0,0 +1,130 @@
+import calendar
+import datetime
+import logging
+import threading
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+from ibapi.common import BarData  # pyright: ignore
+from ibapi.contract import Contract  # pyright: ignore
+
+from salduba.ib_tws_proxy.base_proxy.pacing import Pacer
+from salduba.ib_tws_proxy.base_proxy.tws_proxy import BaseProxy
+from salduba.ib_tws_proxy.historical.bar_store import bar_columns
+
+_logger = logging.getLogger(__name__)
+
+
+def bar_time(date: str) -> int:
+  """
+  The epoch seconds of the `date` of a bar: `yyyymmdd`, for daily bars, at midnight UTC, or epoch seconds for intraday
+  bars as requested with `formatDate=2`.
+  """
+  date = date.strip()
+  if len(date) == 8:
+    return calendar.timegm(datetime.datetime.strptime(date, "%Y%m%d").timetuple())
+  return int(date.split(' ')[0])
+
+
+def end_date_time(at: Optional[int]) -> str:
+  """The `endDateTime` of a request for the bars before `at`, in epoch seconds, or up to now without it."""
+  return f"{datetime.datetime.fromtimestamp(at, datetime.timezone.utc):%Y%m%d %H:%M:%S} GMT" if at else ""
+
+
+class HistoricalBarsProxy(BaseProxy):
+  """
+  Requests the historical bars of each target, a contract with the `end` of the bars, in epoch seconds or None for
+  now, and the TWS `duration` before it, into `bars` by the position of the target, with the columns of `bar_columns`.
+
+  The requests do not wait for each other, at no more than `rate` messages per second and with no more than `max_open`
+  of them open at once, the limit of TWS for historical data. A request for a span without bars, e.g. a holiday, is
+  answered with an empty array.
+  """
+  # HMDS query returned no data
+  no_data: int = 162
+
+  def __init__(
+      self,
+      targets: list[tuple[Contract, Optional[int], str]],
+      bar_size: str,
+      host: str,
+      port: int,
+      clientId: int,
+      what_to_show: str = "TRADES",
+      use_rth: bool = True,
+      max_open: int = 50,
+      rate: float = 45.0,
+      timeout: Optional[float] = None,
+  ) -> None:
+    super().__init__(host, port, clientId, timeout=timeout if timeout else 60 + 2 * len(targets))
+    self.targets = targets
+    self.bar_size = bar_size
+    self.what_to_show = what_to_show
+    self.use_rth = use_rth
+    self.pacer = Pacer(rate)
+    self.requested: dict[int, int] = {}
+    self.bars: dict[int, npt.NDArray[np.float64]] = {}
+    self._open_requests = threading.BoundedSemaphore(max_open)
+    self._open: set[int] = set()
+
+  def runCommands(self) -> None:
+    if not self.targets:
+      _logger.error("No contracts to request bars for")
+      self.stop("No Contracts")
+      return
+    for row, (contract, end, duration) in enumerate(self.targets):
+      while not self._open_requests.acquire(timeout=1.0):
+        if self.done:
+          return
+      self.pacer.wait()
+      with self._lock:
+        reqId = self.responseTracker.nextOpId()
+        _logger.debug("Requesting bars[%s] of %s for %s before %s", reqId, self.bar_size, contract.conId, end)
+        self.requested[reqId] = row
+        self._open.add(reqId)
+        self.reqHistoricalData(
+          reqId, contract, end_date_time(end), duration, self.bar_size, self.what_to_show, int(self.use_rth), 2, False, [])
+
+  def historicalData(self, reqId: int, bar: BarData) -> None:
+    self.partialResponse(reqId, {
+      'time': bar_time(bar.date),
+      'open': bar.open,
+      'high': bar.high,
+      'low': bar.low,
+      'close': bar.close,
+      'volume': float(bar.volume),
+      'wap': float(bar.average),
+      'count': float(bar.barCount),
+    })
+
+  def historicalDataEnd(self, reqId: int, start: str, end: str) -> None:
+    _logger.debug("Received historicalDataEnd[%s] from %s to %s", reqId, start, end)
+    self._complete(reqId)
+
+  def error(self, reqId: int, errorCode: int, errorString: str, advancedOrderRejectJson: str = "") -> None:
+    if errorCode == HistoricalBarsProxy.no_data and "no data" in errorString.lower():
+      _logger.info(f"Bars[{reqId}]: {errorString}")
+      self._complete(reqId)
+      return
+    super().error(reqId, errorCode, errorString, advancedOrderRejectJson)
+    self._release(reqId)
+
+  def _complete(self, reqId: int) -> None:
+    self._release(reqId)
+    with self._lock:
+      pending = reqId in self.responseTracker.pending
+      row = self.requested.get(reqId)
+    if not pending or row is None:
+      return
+    received = self.responsesFor(reqId)
+    self.bars[row] = np.array(
+      [[b[c] for b in received] for c in bar_columns], dtype=np.float64).reshape(len(bar_columns), len(received))
+    self.completeResponse(reqId)
+
+  def _release(self, reqId: int) -> None:
+    with self._lock:
+      released = reqId in self._open
+      self._open.discard(reqId)
+    if released:
+      self._open_requests.release()
@@ -0,0 +1,65 @@
+import logging
+import math
+from typing import Any, Callable, Iterable, Optional
+from uuid import uuid4
+
+from sqlalchemy import Float, Integer, String, delete, insert
+from sqlalchemy.orm import Mapped, mapped_column
+
+from salduba.common.persistence.alchemy.db import UnitOfWork
+from salduba.common.persistence.alchemy.repo import RecordBase, RepoOps
+from salduba.ib_tws_proxy.market_data.price_table import PriceTable, price_fields
+
+_logger = logging.getLogger(__name__)
+
+
+class MarketPriceRecord2(RecordBase):
+  """
+  The latest snapshot of the prices of a contract, taken at `at`. Each snapshot of a contract replaces the previous one.
+  See: https://interactivebrokers.github.io/tws-api/md_request.html
+  """
+  __tablename__: str = 'MARKET_PRICE'
+  con_id: Mapped[int] = mapped_column(Integer, nullable=False, unique=True)
+  symbol: Mapped[str] = mapped_column(String(255), nullable=False)
+  bid: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+  ask: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+  last: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+  close: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+
+  @staticmethod
+  def rows_of(table: PriceTable, symbols: list[str]) -> list[dict[str, Any]]:
+    """The rows of the prices in `table`, with the `symbols` of its contracts, once per contract with a price."""
+    def nan_as_none(v: float) -> Optional[float]:
+      return None if math.isnan(v) else v
+    rows: dict[int, dict[str, Any]] = {}
+    for idx in range(len(table)):
+      con_id = int(table.con_id[idx])
+      if table.at[idx] and con_id not in rows:
+        rows[con_id] = {
+          'rid': str(uuid4()),
+          'at': int(table.at[idx]),
+          'con_id': con_id,
+          'symbol': symbols[idx],
+          **{field: nan_as_none(float(getattr(table, field)[idx])) for field in price_fields}
+        }
+    return list(rows.values())
+
+
+class MarketPriceOps(RepoOps[MarketPriceRecord2]):
+  def __init__(self) -> None:
+    super().__init__(MarketPriceRecord2)
+
+  def fresh(self, con_ids: Iterable[int], since: int) -> Callable[[UnitOfWork], Iterable[MarketPriceRecord2]]:
+    """The stored prices of the contracts `con_ids` taken at or after `since`."""
+    return self.find(lambda q: q.where(MarketPriceRecord2.con_id.in_(list(con_ids)), MarketPriceRecord2.at >= since))
+
+  def replace(self, rows: list[dict[str, Any]]) -> Callable[[UnitOfWork], None]:
+    """Replaces the stored prices of the contracts of `rows` with them."""
+    def rs(uow: UnitOfWork) -> None:
+      if not rows:
+        return
+      with uow.in_unit() as s:
+        s.execute(delete(MarketPriceRecord2).where(MarketPriceRecord2.con_id.in_([r['con_id'] for r in rows])))
+        s.execute(insert(MarketPriceRecord2), rows)
+      _logger.debug(f"Stored the prices of {len(rows)} contracts")
+    return rs
@@ -0,0 +1,88 @@
+import logging
+from typing import TYPE_CHECKING, Iterable, Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+if TYPE_CHECKING:
+  from salduba.ib_tws_proxy.market_data.price_repo import MarketPriceRecord2
+
+_logger = logging.getLogger(__name__)
+
+
+price_fields = ['bid', 'ask', 'last', 'close']
+
+
+class PriceTable:
+  """
+  The bid, ask, last and close prices of the securities `keys`, with the `con_id` of their contracts, as columns indexed
+  by the position of each key. A price that TWS did not report is NaN. `at` is the time, in epoch millis, of the last
+  price of each row, 0 for none.
+  """
+  def __init__(self, keys: Sequence[str], con_ids: Sequence[int]) -> None:
+    if len(keys) != len(con_ids):
+      raise ValueError(f"{len(keys)} keys for {len(con_ids)} contracts")
+    self.keys = list(keys)
+    self.index = {k: idx for idx, k in enumerate(self.keys)}
+    self.con_id: npt.NDArray[np.int64] = np.asarray(con_ids, dtype=np.int64)
+    self.bid: npt.NDArray[np.float64] = np.full(len(self.keys), np.nan)
+    self.ask: npt.NDArray[np.float64] = np.full(len(self.keys), np.nan)
+    self.last: npt.NDArray[np.float64] = np.full(len(self.keys), np.nan)
+    self.close: npt.NDArray[np.float64] = np.full(len(self.keys), np.nan)
+    self.at: npt.NDArray[np.int64] = np.zeros(len(self.keys), dtype=np.int64)
+
+  def __len__(self) -> int:
+    return len(self.keys)
+
+  def set(self, row: int, field: str, price: float, at: int) -> None:
+    getattr(self, field)[row] = price
+    self.at[row] = at
+
+  def update(self, other: 'PriceTable') -> None:
+    """Copies the prices of the keys of `other` that are also in this table."""
+    pairs = [(self.index[k], idx) for idx, k in enumerate(other.keys) if k in self.index]
+    if pairs:
+      mine, theirs = (np.array(c, dtype=np.intp) for c in zip(*pairs))
+      for field in price_fields + ['at']:
+        getattr(self, field)[mine] = getattr(other, field)[theirs]
+
+  def load(self, records: Iterable['MarketPriceRecord2']) -> None:
+    """Copies the stored prices of `records` to the rows with the same contract."""
+    rows: dict[int, list[int]] = {}
+    for idx, con_id in enumerate(self.con_id.tolist()):
+      rows.setdefault(con_id, []).append(idx)
+    for r in records:
+      for idx in rows.get(r.con_id, []):
+        for field in price_fields:
+          value = getattr(r, field)
+          getattr(self, field)[idx] = np.nan if value is None else value
+        self.at[idx] = r.at
+
+  @property
+  def price(self) -> npt.NDArray[np.float64]:
+    """The last price of each row, otherwise the midpoint of its bid and ask, otherwise its close. NaN without any."""
+    with np.errstate(invalid='ignore'):
+      mid = (self.bid + self.ask) / 2
+    return np.where(self.last > 0, self.last, np.where(mid > 0, mid, self.close))
+
+  def prices(self) -> dict[str, float]:
+    """The prices by key of the rows that have one."""
+    price = self.price
+    return {k: float(p) for k, p in zip(self.keys, price) if p > 0}
+
+  def limit_prices(self, trades: dict[str, int], offset_bps: float = 0.0, decimals: int = 2) -> dict[str, float]:
+    """
+    Marketable limit prices for `trades` by key: buys at the ask and sells at the bid, `offset_bps` basis points beyond,
+    or around the `price` of a row without them. Buys are rounded up and sells down to `decimals`, so that rounding
+    never takes a limit back inside the spread. Keys without a price are left out.
+    """
+    quantity = np.array([trades.get(k, 0) for k in self.keys], dtype=np.float64)
+    offset = offset_bps / 10000.0
+    price = self.price
+    buy = np.where(self.ask > 0, self.ask, price) * (1 + offset)
+    sell = np.where(self.bid > 0, self.bid, price) * (1 - offset)
+    scale = 10.0 ** decimals
+    # Rounded to a millionth of a tick first, so that the error of the float products does not move a price a whole tick.
+    limit = np.where(
+      quantity > 0, np.ceil(np.round(buy * scale, 6)) / scale, np.floor(np.round(sell * scale, 6)) / scale)
+    return {k: float(p) for k, q, p in zip(self.keys, quantity, limit) if q != 0 and p > 0}
@@ -0,0 +1,117 @@
+import datetime
+import logging
+import threading
+from typing import Optional
+
+from ibapi.common import TickAttrib, TickerId  # pyright: ignore
+from ibapi.contract import Contract  # pyright: ignore
+from ibapi.ticktype import TickType, TickTypeEnum  # pyright: ignore
+
+from salduba.ib_tws_proxy.base_proxy.pacing import Pacer
+from salduba.ib_tws_proxy.base_proxy.tws_proxy import BaseProxy
+from salduba.ib_tws_proxy.market_data.price_table import PriceTable
+from salduba.util.time import millis_epoch
+
+_logger = logging.getLogger(__name__)
+
+
+# The ticks of the prices of a snapshot, live or delayed.
+price_ticks: dict[int, str] = {
+  TickTypeEnum.BID: 'bid',
+  TickTypeEnum.ASK: 'ask',
+  TickTypeEnum.LAST: 'last',
+  TickTypeEnum.CLOSE: 'close',
+  TickTypeEnum.DELAYED_BID: 'bid',
+  TickTypeEnum.DELAYED_ASK: 'ask',
+  TickTypeEnum.DELAYED_LAST: 'last',
+  TickTypeEnum.DELAYED_CLOSE: 'close',
+}
+
+
+class MarketSnapshotProxy(BaseProxy):
+  """
+  Takes a snapshot of the prices of each target contract with `reqMktData(snapshot=True)` into a `PriceTable`, without
+  waiting for one before requesting the next, at no more than `rate` messages per second and with no more than
+  `max_lines` of them open at once, within the market data lines of the account. Each snapshot ends with
+  `tickSnapshotEnd`, TWS ends them after 11 seconds at most.
+  """
+  # TWS answers the requests with these warnings anyway, with delayed or partial prices.
+  warnings: list[int] = [10090, 10167]
+
+  def __init__(
+      self,
+      targets: list[tuple[str, Contract]],
+      host: str,
+      port: int,
+      clientId: int,
+      market_data_type: int = 1,
+      max_lines: int = 90,
+      rate: float = 45.0,
+      timeout: Optional[float] = None,
+  ) -> None:
+    super().__init__(host, port, clientId, timeout=timeout if timeout else len(targets) / min(rate, max_lines / 11) + 30)
+    self.targets = targets
+    self.table = PriceTable([k for k, _ in targets], [c.conId for _, c in targets])
+    self.market_data_type = market_data_type
+    self.pacer = Pacer(rate)
+    self.requested: dict[int, int] = {}
+    self._lines = threading.BoundedSemaphore(max_lines)
+    self._open: set[int] = set()
+    self._untracked = False
+
+  def runCommands(self) -> None:
+    if not self.targets:
+      _logger.error("No contracts to take a snapshot of")
+      self.stop("No Contracts")
+      return
+    # It has no reqId, nor response, to track.
+    self._untracked = True
+    try:
+      self.reqMarketDataType(self.market_data_type)
+    finally:
+      self._untracked = False
+    for row, (key, contract) in enumerate(self.targets):
+      while not self._lines.acquire(timeout=1.0):
+        if self.done:
+          return
+      self.pacer.wait()
+      with self._lock:
+        reqId = self.responseTracker.nextOpId()
+        _logger.debug("Requesting snapshot[%s] for %s", reqId, key)
+        self.requested[reqId] = row
+        self._open.add(reqId)
+        self.reqMktData(reqId, contract, "", True, False, [])
+
+  def sendMsg(self, msg: str) -> None:
+    if self._untracked:
+      super(BaseProxy, self).sendMsg(msg)
+    else:
+      super().sendMsg(msg)
+
+  def tickPrice(self, reqId: TickerId, tickType: TickType, price: float, attrib: TickAttrib) -> None:
+    field = price_ticks.get(tickType)
+    row = self.requested.get(reqId)
+    if field and row is not None and price > 0:
+      self.table.set(row, field, price, millis_epoch(datetime.datetime.now()))
+
+  def tickSnapshotEnd(self, reqId: int) -> None:
+    _logger.debug("Received tickSnapshotEnd[%s]", reqId)
+    self._release(reqId)
+    with self._lock:
+      pending = reqId in self.responseTracker.pending
+    if pending:
+      self.completeResponse(reqId)
+
+  def error(self, reqId: int, errorCode: int, errorString: str, advancedOrderRejectJson: str = "") -> None:
+    if errorCode in MarketSnapshotProxy.warnings:
+      _logger.warning(f"Snapshot[{reqId}]: {errorString}")
+      return
+    super().error(reqId, errorCode, errorString, advancedOrderRejectJson)
+    self._release(reqId)
+
+  def _release(self, reqId: int) -> None:
+    with self._lock:
+      released = reqId in self._open
+      self._open.discard(reqId)
+    if released:
+      self._lines.release()
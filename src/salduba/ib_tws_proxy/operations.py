@@ -5,6 +5,8 @@ from typing import Callable, Optional
 
 from ibapi.utils import current_fn_name  # pyright: ignore
 
+from salduba.util import tracing
+
 _logger = logging.getLogger(__name__)
 
 
@@ -139,13 +141,15 @@ class OperationsTracker:
     #  _logger.debug("Released Lock")
     return oid
 
-  def request(self, fromCaller: str, msg: str) -> None:
+  def request(self, fromCaller: str, msg: str, opId: Optional[int] = None) -> None:
     #  with self._lock:
     #    _logger.debug(f"Acquired Lock from {current_fn_name(1)}::{current_fn_name(0)}")
-    rId = self._opId - 1  # last one used
+    # The last one used, unless the request refers to an existing operation, like the orderId of an order to cancel.
+    rId = self._opId - 1 if opId is None else opId
     _logger.debug(f"REQUEST: {rId} from {current_fn_name(2)}::{current_fn_name(1)}")
     if rId not in self.pending.keys():
       self.pending[rId] = Operation(rId, Request(fromCaller, msg))
+      tracing.begin(fromCaller, rId, "tws")
     else:
       _logger.warning(f"Duplicate request Id: {rId} from {fromCaller} with {msg}")
     #  _logger.debug("Released Lock")
@@ -167,6 +171,7 @@ class OperationsTracker:
     #  _logger.debug(f"Acquired Lock from {current_fn_name(1)}::{current_fn_name(0)}")
     self.response(rs)
     self.success.append(self.pending[rs.opId])
+    tracing.end(self.pending[rs.opId].request.fromCaller, rs.opId, "tws", responses=len(self.pending[rs.opId].responses))
     _logger.debug(f"COMPLETE {rs.opId} from {current_fn_name(2)}::{current_fn_name(1)}")
     del self.pending[rs.opId]
     # _logger.debug("Released Lock")
@@ -177,6 +182,7 @@ class OperationsTracker:
     if error.opId in self.pending.keys():
       op = self.pending[error.opId]
       op.error = error
+      tracing.end(op.request.fromCaller, error.opId, "tws", errorCode=error.errorCode)
       if error.errorCode in OperationsTracker.info_only:
         self.info.append(op)
         _logger.info(f"{error.opId}")
@@ -1,9 +1,11 @@
 import logging
 from datetime import datetime
-from typing import Callable, Iterable, Optional
+from operator import itemgetter
+from typing import Any, Callable, Iterable, Optional
 from uuid import uuid4
 
 from ibapi.order import Order  # pyright: ignore
+from ibapi.tag_value import TagValue  # pyright: ignore
 from sqlalchemy import Boolean, Enum, Float, ForeignKey, Integer, String, inspect
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -315,36 +317,66 @@ class OrderRecord2(RecordBase):
       single_parent=True,
       cascade="all, delete-orphan",
       lazy=True)
+  # Child orders when the order is sliced, see `salduba.ib_tws_proxy.orders.slicing`. Only the children are placed.
+  parent_order_fk: Mapped[Optional[str]] = mapped_column(String(255), ForeignKey('ORDER_T.rid'), nullable=True)
+  slices: Mapped[list['OrderRecord2']] = relationship(
+      'OrderRecord2',
+      foreign_keys=[parent_order_fk],
+      order_by='OrderRecord2.orderRef',
+      lazy=True)
 
   def toOrder(self) -> Order:
+    return order_converter.to_order(self)
+
+  @classmethod
+  def newFromOrder(cls, rid: str, at: int, order: Order) -> 'OrderRecord2':
+    return order_converter.from_order(cls, rid, at, order)
+
+
+class OrderConverter:
+  """
+  Maps `OrderRecord2` <-> `ibapi.order.Order`.
+
+  The domain keys, the getter over them and the Adaptive algo parameters are computed once,
+  when the converter is created, instead of inspecting the mapper on every conversion.
+  """
+
+  def __init__(self, record_type: type[OrderRecord2], adaptive_priority: str = "Patient") -> None:
+    self.domain_keys: tuple[str, ...] = tuple(
+      c.key for c in inspect(record_type).columns
+      if c.key not in ['rid', 'at']
+      and not c.key.startswith('_')
+      and not c.key.endswith('_fk'))
+    self._values_of: Callable[[dict[str, Any]], tuple[Any, ...]] = itemgetter(*self.domain_keys)
+    algo_template = Order()
+    AvailableAlgoParams.FillAdaptiveParams(baseOrder=algo_template, priority=adaptive_priority)
+    self._algo_strategy: str = algo_template.algoStrategy
+    self._algo_params: tuple[TagValue, ...] = tuple(algo_template.algoParams)
+
+  def to_order(self, record: OrderRecord2) -> Order:
     result = Order()
-    domain_keys = (f.key for f in inspect(OrderRecord2).columns
-                   if f.key not in ['rid', 'at']
-                   and not f.key.startswith('_')
-                   and not f.key.endswith('_fk'))
-    for k in domain_keys:
-      v = self.__dict__[k]
+    rd = result.__dict__
+    for k, v in zip(self.domain_keys, self._values_of(record.__dict__)):
       if v is not None:
-        result.__setattr__(k, v)
+        rd[k] = v
     # Required b/c the interface does not support == True (Weird)
-    result.eTradeOnly = False
-    result.firmQuoteOnly = False
-    AvailableAlgoParams.FillAdaptiveParams(baseOrder=result, priority="Patient")
+    rd['eTradeOnly'] = False
+    rd['firmQuoteOnly'] = False
+    rd['algoStrategy'] = self._algo_strategy
+    rd['algoParams'] = list(self._algo_params)
     return result
 
-  @classmethod
-  def newFromOrder(cls, rid: str, at: int, order: Order) -> 'OrderRecord2':
-    domain_fields = (c.key for c in inspect(OrderRecord2).columns
-                     if c.key not in ['rid', 'at']
-                     and not c.key.startswith('_')
-                     and not c.key.endswith('_fk'))
-    return cls(
+  def from_order(self, record_type: type[OrderRecord2], rid: str, at: int, order: Order) -> OrderRecord2:
+    return record_type(
       rid=rid,
       at=at,
-      **{k: order.__dict__[k] for k in domain_fields}
+      **dict(zip(self.domain_keys, self._values_of(order.__dict__)))
     )
 
 
+order_converter = OrderConverter(OrderRecord2)
+
+
 def newOrderRecord(
   trade: int,
   conId: int,
@@ -526,6 +558,9 @@ class OrderRecordOps(RepoOps[OrderRecord2]):
   def __init__(self) -> None:
     super().__init__(OrderRecord2)
 
+  def slices_of(self, parent_rid: str) -> Callable[[UnitOfWork], Iterable[OrderRecord2]]:
+    return self.find(lambda q: q.where(OrderRecord2.parent_order_fk == parent_rid).order_by(OrderRecord2.orderRef))
+
   def findByPermId(self, permId: int) -> Callable[[UnitOfWork], Optional[OrderRecord2]]:
     return self.find_one(
       lambda q: q.where(OrderRecord2.permId == permId)
@@ -0,0 +1,213 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from ibapi.common import OrderId  # pyright: ignore
+from ibapi.contract import Contract  # pyright: ignore
+from ibapi.order import Order  # pyright: ignore
+from ibapi.order_state import OrderState  # pyright: ignore
+from ibapi.utils import current_fn_name  # pyright: ignore
+
+from salduba.common.persistence.alchemy.db import Db
+from salduba.corvino.persistence.movement_record import MovementRecord2, MovementStatus
+from salduba.ib_tws_proxy.base_proxy.pacing import Pacer
+from salduba.ib_tws_proxy.base_proxy.tws_proxy import BaseProxy
+from salduba.ib_tws_proxy.domain.enumerations import IbOrderStatus
+from salduba.ib_tws_proxy.orders.order_status_writer import OrderStatusResponse, OrderStatusWriter
+from salduba.ib_tws_proxy.orders.OrderRepo import OrderRecord2
+from salduba.ib_tws_proxy.orders.slicing import SliceFills
+from salduba.util.time import millis_epoch
+
+_logger = logging.getLogger(__name__)
+
+# Orders in these states can no longer be cancelled or modified.
+closed_statuses = [IbOrderStatus.FILLED, IbOrderStatus.CANCELED, IbOrderStatus.INACTIVE]
+
+
+@dataclass
+class OrderChange:
+  """
+  A change to an order that was already placed, resolved before the TWS session so that the proxy threads never touch
+  the session of the records. `changes` are the fields of the order to update, empty for a cancellation.
+  """
+  orderId: int
+  movement: MovementRecord2
+  order: OrderRecord2
+  contract: Contract
+  ibOrder: Order
+  changes: dict[str, Any] = field(default_factory=dict)
+
+  @classmethod
+  def of(cls, movement: MovementRecord2, order: OrderRecord2, changes: Optional[dict[str, Any]] = None) -> 'OrderChange':
+    # Loaded now, the status writer reads it from its own thread.
+    order.order_status.rid
+    ibOrder: Order = order.toOrder()
+    unset = Order()
+    for k, v in (changes or {}).items():
+      setattr(ibOrder, k, getattr(unset, k) if v is None else v)
+    return cls(order.orderId, movement, order, movement.contract.to_contract(), ibOrder, changes or {})
+
+
+def open_orders_of(movement: MovementRecord2) -> list[OrderRecord2]:
+  """The orders of a movement that TWS may still cancel or modify: the children of a sliced order or the order itself."""
+  return [
+    o for o in (movement.order.slices or [movement.order])
+    if o.orderId and o.order_status.status not in closed_statuses
+  ]
+
+
+class ChangeOrders(BaseProxy):
+  """
+  Sends the changes to orders placed in an earlier session without waiting for the confirmation of each one before
+  sending the next, at no more than `rate` messages per second to stay within the TWS pacing limit of 50.
+
+  Each change is tracked under the orderId of the order it changes, so the session ends when all of them are confirmed
+  or rejected. The session must use the clientId that placed the orders, TWS only accepts changes from it.
+
+  The status of a sliced movement is the aggregate of the stored statuses of its children and the `orderStatus` of the
+  changed ones, as when it was placed.
+  """
+  def __init__(
+      self,
+      db: Db,
+      targets: list[OrderChange],
+      host: str,
+      port: int,
+      clientId: int,
+      rate: float = 45.0,
+      timeout: Optional[float] = None,
+      status_flush_interval: float = 1.0,
+  ) -> None:
+    super().__init__(host, port, clientId, timeout=timeout if timeout else len(targets) / rate + 15)
+    self.targets = targets
+    self.pacer = Pacer(rate)
+    self.byOrderId: dict[int, OrderChange] = {t.orderId: t for t in targets}
+    self.sliceFills: dict[str, SliceFills] = {}
+    for t in targets:
+      if t.movement.order.slices and t.movement.rid not in self.sliceFills:
+        fills = SliceFills(t.movement.order)
+        for child in t.movement.order.slices:
+          fills.seed(child)
+        self.sliceFills[t.movement.rid] = fills
+    self.confirmed: list[OrderChange] = []
+    self._sending: Optional[int] = None
+    self.statusWriter = OrderStatusWriter(
+      db, self._changedOrder, flush_interval=status_flush_interval, name=f"{self.__class__.__name__}::{clientId}"
+    )
+
+  def activate(self) -> None:
+    super().activate()
+    self.statusWriter.start()
+
+  def stop(self, reason: str = "") -> None:
+    super().stop(reason)
+    self.statusWriter.close()
+
+  def _changedOrder(self, orderId: int) -> Optional[OrderRecord2]:
+    target = self.byOrderId.get(orderId)
+    return target.order if target else None
+
+  def runCommands(self) -> None:
+    if not self.targets:
+      _logger.error("No orders to change")
+      self.stop("No Orders to Change")
+      return
+    _logger.debug(f"Will change {len(self.targets)} orders")
+    for target in self.targets:
+      self.pacer.wait()
+      with self._lock:
+        self._sending = target.orderId
+        try:
+          self.sendChange(target)
+        finally:
+          self._sending = None
+
+  def sendChange(self, target: OrderChange) -> None:
+    raise Exception("The Method sendChange() must be implemented")
+
+  def sendMsg(self, msg: str) -> None:
+    # Changes reuse the orderId of the order instead of a new request id.
+    if self._sending is None:
+      super().sendMsg(msg)
+    else:
+      self.responseTracker.request(current_fn_name(1), msg, self._sending)
+      super(BaseProxy, self).sendMsg(msg)
+
+  def confirm(self, orderId: int) -> None:
+    with self._lock:
+      pending = orderId in self.responseTracker.pending
+      if pending:
+        self.confirmed.append(self.byOrderId[orderId])
+    if pending:
+      self.completeResponse(orderId)
+
+  def error(self, reqId: int, errorCode: int, errorString: str, advancedOrderRejectJson: str = "") -> None:
+    if reqId in self.byOrderId and reqId not in self.responseTracker.pending:
+      _logger.warning(f"Late message ({errorCode}) for order {reqId} already confirmed: {errorString}")
+    else:
+      super().error(reqId, errorCode, errorString, advancedOrderRejectJson)
+
+  def orderStatus(
+      self,
+      orderId: OrderId,
+      status: str,
+      filled: float,
+      remaining: float,
+      avgFillPrice: float,
+      permId: int,
+      parentId: int,
+      lastFillPrice: float,
+      clientId: int,
+      whyHeld: str,
+      mktCapPrice: float,
+  ) -> None:
+    _logger.info("Receiving: orderStatus[%s] %s, filled: %s, remaining: %s", orderId, status, filled, remaining)
+    target = self.byOrderId.get(orderId)
+    if target:
+      fills = self.sliceFills.get(target.movement.rid)
+      if fills:
+        fills.update(orderId, status, float(filled), avgFillPrice)
+        self.statusWriter.offer(fills.apply(target.movement))
+      else:
+        target.movement.status = MovementStatus.fromIbk(status)
+        target.movement.at = millis_epoch()
+      self.statusWriter.offer_transition(target.movement)
+      self.statusWriter.offer(OrderStatusResponse(
+        orderId, status, filled, remaining, avgFillPrice, permId, parentId, lastFillPrice, clientId, whyHeld, mktCapPrice
+      ))
+      self.statusConfirms(orderId, status)
+
+  def statusConfirms(self, orderId: int, status: str) -> None:
+    pass
+
+
+class CancelOrders(ChangeOrders):
+  """Cancels the target orders. A cancellation is confirmed by an `orderStatus` of `Cancelled` or by TWS error 202."""
+  cancelled = ["Cancelled", "ApiCancelled"]
+
+  def sendChange(self, target: OrderChange) -> None:
+    _logger.info("Cancelling order[%s] for %s", target.orderId, target.contract.symbol)
+    self.cancelOrder(target.orderId)
+
+  def statusConfirms(self, orderId: int, status: str) -> None:
+    if status in self.cancelled:
+      self.confirm(orderId)
+
+  def error(self, reqId: int, errorCode: int, errorString: str, advancedOrderRejectJson: str = "") -> None:
+    # 202: "Order Canceled - reason: ..." is the acknowledgement of the cancellation, not an error.
+    if errorCode == 202 and reqId in self.byOrderId:
+      self.confirm(reqId)
+    else:
+      super().error(reqId, errorCode, errorString, advancedOrderRejectJson)
+
+
+class ModifyOrders(ChangeOrders):
+  """Places the target orders again under the same orderId with their changes. The `openOrder` callback confirms them."""
+
+  def sendChange(self, target: OrderChange) -> None:
+    _logger.info("Modifying order[%s] for %s with %s", target.orderId, target.contract.symbol, target.changes)
+    self.placeOrder(target.orderId, target.contract, target.ibOrder)
+
+  def openOrder(self, orderId: OrderId, contract: Contract, order: Order, orderState: OrderState) -> None:
+    _logger.info("Receiving: openOrder[%s] for %s", orderId, contract.symbol)
+    self.confirm(orderId)
@@ -0,0 +1,192 @@
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Callable, Optional, Union
+
+from sqlalchemy import update
+
+from salduba.common.persistence.alchemy.db import Db
+from salduba.corvino.persistence.movement_record import MovementRecord2, MovementStatus
+from salduba.ib_tws_proxy.domain.enumerations import IbOrderStatus
+from salduba.ib_tws_proxy.orders.OrderRepo import OrderRecord2, OrderStatusRecord2
+from salduba.util.time import millis_epoch
+
+_logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OrderStatusResponse:
+    orderId: int
+    status: str
+    filled: Decimal | float
+    remaining: Decimal | float
+    avgFillPrice: float
+    permId: int
+    parentId: int
+    lastFillPrice: float
+    clientId: int
+    whyHeld: str
+    mktCapPrice: float
+
+
+@dataclass
+class MovementTransition:
+  rid: str
+  status: MovementStatus
+  at: int
+
+  @classmethod
+  def of(cls, movement: MovementRecord2) -> 'MovementTransition':
+    return cls(movement.rid, movement.status, movement.at)
+
+
+@dataclass
+class SliceProgress:
+  """The aggregate progress of the children of a sliced order, written to the status of the parent order."""
+  rid: str
+  status: str
+  filled: float
+  remaining: float
+  avgFillPrice: float
+
+
+StatusEvent = Union[OrderStatusResponse, MovementTransition, SliceProgress]
+
+
+def ib_order_status(status: str) -> IbOrderStatus:
+  # TWS reports cancellations as `Cancelled` or `ApiCancelled`, both stored as `IbOrderStatus.CANCELED`.
+  if status in ("Cancelled", "ApiCancelled"):
+    return IbOrderStatus.CANCELED
+  try:
+    return IbOrderStatus(status)
+  except ValueError:
+    return IbOrderStatus.UNKNOWN
+
+
+class OrderStatusWriter:
+  """
+  Write-behind persistence of `orderStatus` callbacks and movement status transitions.
+
+  The listener thread only enqueues the notifications. A background thread coalesces them, keeping the latest
+  one received per orderId (or movement) within `flush_interval` seconds, and writes them to `ORDER_STATUS`
+  and `MOVEMENT` with one transaction per flush.
+
+  Movement transitions carry the status already applied in memory by the listener, so the rows written here
+  always match the in-memory movements. Slice progress events carry the aggregate of the children of a sliced order
+  and update the status of the parent, which is never placed itself.
+
+  The writer uses its own `Db` (and therefore its own session) over the engine it is given so that it never
+  shares a session with the thread that placed the orders.
+  """
+
+  def __init__(
+    self,
+    db: Db,
+    orderFor: Callable[[int], Optional[OrderRecord2]],
+    flush_interval: float = 1.0,
+    name: str = "OrderStatusWriter"
+  ) -> None:
+    self.db = Db(db.engine)
+    self.orderFor = orderFor
+    self.flush_interval = flush_interval
+    self._queue: queue.Queue[Optional[StatusEvent]] = queue.Queue()
+    self._writer = threading.Thread(target=self._run, name=f"{name}::Writer", daemon=True)
+    self._closed = False
+    self._close_lock = threading.Lock()
+
+  def start(self) -> None:
+    self._writer.start()
+
+  def offer(self, event: StatusEvent) -> None:
+    self._queue.put_nowait(event)
+
+  def offer_transition(self, movement: MovementRecord2) -> None:
+    self._queue.put_nowait(MovementTransition.of(movement))
+
+  def close(self) -> None:
+    """Flushes everything offered so far and stops the writer thread."""
+    with self._close_lock:
+      if self._closed:
+        return
+      self._closed = True
+    self._queue.put_nowait(None)
+    if self._writer.is_alive() and self._writer is not threading.current_thread():
+      self._writer.join()
+
+  def _run(self) -> None:
+    pending: dict[int | str, StatusEvent] = {}
+    deadline: Optional[float] = None
+    stopping = False
+    while not stopping:
+      timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+      try:
+        event = self._queue.get(timeout=timeout)
+        if event is None:
+          stopping = True
+        else:
+          pending[event.orderId if isinstance(event, OrderStatusResponse) else event.rid] = event
+          if deadline is None:
+            deadline = time.monotonic() + self.flush_interval
+      except queue.Empty:
+        pass
+      if pending and (stopping or (deadline is not None and time.monotonic() >= deadline)):
+        try:
+          self.flush(list(pending.values()))
+          pending = {}
+        except Exception as exc:
+          _logger.error(f"Could not persist {len(pending)} order status updates: {exc}", exc_info=True)
+        deadline = None if not pending else time.monotonic() + self.flush_interval
+
+  def flush(self, events: list[StatusEvent]) -> None:
+    now = millis_epoch()
+    status_rows: list[dict[str, Any]] = []
+    movement_rows: list[dict[str, Any]] = []
+    progress_rows: list[dict[str, Any]] = []
+    for ev in events:
+      if isinstance(ev, MovementTransition):
+        movement_rows.append({'rid': ev.rid, 'at': ev.at, 'status': ev.status})
+        continue
+      if isinstance(ev, SliceProgress):
+        progress_rows.append({
+          'rid': ev.rid,
+          'at': now,
+          'status': ib_order_status(ev.status),
+          'filled': ev.filled,
+          'remaining': ev.remaining,
+          'avg_fill_price': ev.avgFillPrice
+        })
+        continue
+      order = self.orderFor(ev.orderId)
+      if order is None:
+        _logger.debug(f"Not persisting orderStatus for orderId {ev.orderId}, not placed in this session")
+        continue
+      status_rows.append({
+        'rid': order.order_status.rid,
+        'at': now,
+        'order_id': ev.orderId,
+        'status': ib_order_status(ev.status),
+        'filled': float(ev.filled),
+        'remaining': float(ev.remaining),
+        'avg_fill_price': ev.avgFillPrice,
+        'perm_id': ev.permId,
+        'parent_id': ev.parentId,
+        'last_fill_price': ev.lastFillPrice,
+        'client_id': ev.clientId,
+        'why_held': ev.whyHeld,
+        'mkt_cap_price': ev.mktCapPrice
+      })
+    if status_rows or movement_rows or progress_rows:
+      with self.db.for_work() as uow:
+        with uow.in_unit() as s:
+          if status_rows:
+            s.execute(update(OrderStatusRecord2), status_rows)
+          if progress_rows:
+            s.execute(update(OrderStatusRecord2), progress_rows)
+          if movement_rows:
+            s.execute(update(MovementRecord2), movement_rows)
+      _logger.debug(
+        "Persisted %s order status, %s slice progress and %s movement updates",
+        len(status_rows), len(progress_rows), len(movement_rows))
@@ -0,0 +1,72 @@
+import logging
+from typing import Callable, Iterable, Optional
+from uuid import uuid4
+
+from sqlalchemy import ForeignKey, Integer, String, insert, update
+from sqlalchemy.orm import Mapped, mapped_column
+
+from salduba.common.persistence.alchemy.db import Db, UnitOfWork
+from salduba.common.persistence.alchemy.repo import RecordBase, RepoOps
+from salduba.corvino.persistence.movement_record import MovementRecord2
+from salduba.ib_tws_proxy.orders.OrderRepo import OrderRecord2
+from salduba.util.time import millis_epoch
+
+_logger = logging.getLogger(__name__)
+
+
+class PlacementIntentRecord2(RecordBase):
+  """
+  The intent to place an order with TWS under `order_id`, stored before sending it. An intent does not mean that TWS
+  received the order, only that it may have.
+  """
+  __tablename__: str = 'PLACEMENT_INTENT'
+  batch: Mapped[str] = mapped_column(String(255), nullable=False)
+  movement_fk: Mapped[str] = mapped_column(String(255), ForeignKey(MovementRecord2.rid), nullable=False)
+  order_fk: Mapped[str] = mapped_column(String(255), ForeignKey(OrderRecord2.rid), nullable=False)
+  order_id: Mapped[int] = mapped_column(Integer, nullable=False)
+  order_ref: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+  client_id: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class PlacementIntentOps(RepoOps[PlacementIntentRecord2]):
+  def __init__(self) -> None:
+    super().__init__(PlacementIntentRecord2)
+
+  def for_batch(self, batch: str) -> Callable[[UnitOfWork], Iterable[PlacementIntentRecord2]]:
+    return self.find(lambda q: q.where(PlacementIntentRecord2.batch == batch).order_by(PlacementIntentRecord2.at))
+
+
+class PlacementJournal:
+  """
+  Write-ahead journal of order placements: the intents of a group of orders, and their orderIds in `ORDER_T`, are
+  committed together before the first of them is sent to TWS, so that a placement interrupted at any point can be
+  reconciled with the orders that TWS knows.
+
+  Like the `OrderStatusWriter`, it uses its own `Db` over the engine it is given so that it never shares a session with
+  the thread that placed the orders.
+  """
+
+  def __init__(self, db: Db, clientId: int) -> None:
+    self.db = Db(db.engine)
+    self.clientId = clientId
+
+  def record(self, intents: list[tuple[MovementRecord2, OrderRecord2, int]]) -> None:
+    if not intents:
+      return
+    now = millis_epoch()
+    with self.db.for_work() as uow:
+      with uow.in_unit() as s:
+        s.execute(insert(PlacementIntentRecord2), [
+          {
+            'rid': str(uuid4()),
+            'at': now,
+            'batch': movement.batch,
+            'movement_fk': movement.rid,
+            'order_fk': order.rid,
+            'order_id': orderId,
+            'order_ref': order.orderRef,
+            'client_id': self.clientId
+          } for movement, order, orderId in intents
+        ])
+        s.execute(update(OrderRecord2), [{'rid': order.rid, 'orderId': orderId} for _, order, orderId in intents])
+    _logger.debug(f"Journaled the intent to place {len(intents)} orders")
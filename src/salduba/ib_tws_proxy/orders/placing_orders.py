@@ -1,38 +1,27 @@
 import logging
 import time
 from dataclasses import dataclass
-from decimal import Decimal
 from typing import Callable, Optional, Union
 
 from ibapi.common import OrderId  # pyright: ignore
 from ibapi.contract import Contract  # pyright: ignore
 from ibapi.order import Order  # pyright: ignore
 from ibapi.order_state import OrderState  # pyright: ignore
+from ibapi.utils import current_fn_name  # pyright: ignore
 
 from salduba.common.persistence.alchemy.db import Db
-from salduba.corvino.persistence.movement_record import MovementRecord2
+from salduba.corvino.persistence.movement_record import MovementRecord2, MovementStatus
 from salduba.ib_tws_proxy.base_proxy.tws_proxy import BaseProxy
 from salduba.ib_tws_proxy.contracts.contract_repo import ContractRecordOps
+from salduba.ib_tws_proxy.orders.order_status_writer import OrderStatusResponse, OrderStatusWriter
 from salduba.ib_tws_proxy.orders.OrderRepo import OrderRecord2, OrderRecordOps
+from salduba.ib_tws_proxy.orders.placement_journal import PlacementJournal
+from salduba.ib_tws_proxy.orders.slicing import SliceFills
+from salduba.util.time import millis_epoch
 
 _logger = logging.getLogger(__name__)
 
 
-@dataclass
-class OrderStatusResponse:
-    orderId: int
-    status: str
-    filled: Decimal
-    remaining: Decimal
-    avgFillPrice: float
-    permId: int
-    parentId: int
-    lastFillPrice: float
-    clientId: int
-    whyHeld: str
-    mktCapPrice: float
-
-
 @dataclass
 class OpenOrderResponse:
     orderId: int
@@ -43,7 +32,7 @@ class OpenOrderResponse:
 OrderResponse = Union[OpenOrderResponse, OrderStatusResponse]
 
 
-PlaceOrderPostProcessor = Callable[[int, Contract, OrderRecord2, OrderState], OrderResponse]
+PlaceOrderPostProcessor = Callable[[int, Contract, MovementRecord2, OrderState], OrderResponse]
 
 """markdown
 See:
@@ -62,6 +51,14 @@ class OrderNotification:
 
 
 class PlaceOrders(BaseProxy):
+  """
+  Places the order of each target movement or, when it was sliced, each of its child orders. The status of a sliced
+  movement and of its parent order follows the aggregate of the fills of the children.
+
+  With a `journal`, the intents of each group of `journal_chunk` orders are committed before sending the first of them.
+  The orders in `alreadyPlaced`, by rid, are known to TWS from an earlier session and are not placed again. The children
+  of a sliced movement among them count towards its aggregate with their stored fills and their `orderStatus` updates.
+  """
   def __init__(
       self,
       db: Db,
@@ -74,6 +71,10 @@ class PlaceOrders(BaseProxy):
       clientId: int,
       timeout: float = 15 * 60,
       delay: Optional[float] = None,
+      status_flush_interval: float = 1.0,
+      journal: Optional[PlacementJournal] = None,
+      journal_chunk: int = 100,
+      alreadyPlaced: Optional[set[str]] = None,
   ) -> None:
       super().__init__(host, port, clientId, timeout=timeout)
       self.db = db
@@ -82,37 +83,99 @@ class PlaceOrders(BaseProxy):
       self.targets: list[MovementRecord2] = targets
       self.postProcess = postProcess
       self.delay = delay
+      self.journal = journal
+      self.journal_chunk = journal_chunk
+      self.alreadyPlaced: set[str] = alreadyPlaced if alreadyPlaced else set()
+      self._sending: Optional[int] = None
       self.newlyOrdered: dict[int, MovementRecord2] = {}
+      self.placedOrders: dict[int, OrderRecord2] = {}
+      self.adoptedOrders: dict[int, tuple[MovementRecord2, OrderRecord2]] = {}
+      self.sliceFills: dict[str, SliceFills] = {}
       self.previousOrderMessages: dict[int, list[OrderNotification]] = {}
+      self.statusWriter = OrderStatusWriter(
+        db, self._placedOrder, flush_interval=status_flush_interval, name=f"{self.__class__.__name__}::{clientId}"
+      )
+
+  def activate(self) -> None:
+    super().activate()
+    self.statusWriter.start()
+
+  def stop(self, reason: str = "") -> None:
+    super().stop(reason)
+    self.statusWriter.close()
+
+  def _placedMovement(self, orderId: int) -> Optional[MovementRecord2]:
+    with self._lock:
+      adopted = self.adoptedOrders.get(orderId)
+      return self.newlyOrdered.get(orderId, adopted[0] if adopted else None)
+
+  def _placedOrder(self, orderId: int) -> Optional[OrderRecord2]:
+    with self._lock:
+      adopted = self.adoptedOrders.get(orderId)
+      return self.placedOrders.get(orderId, adopted[1] if adopted else None)
+
+  def _sliceFills(self, movement: MovementRecord2) -> SliceFills:
+    """The fills of a sliced movement, starting from those of its children already placed in an earlier session."""
+    fills = SliceFills(movement.order)
+    for child in movement.order.slices:
+      if child.rid in self.alreadyPlaced:
+        fills.seed(child)
+        if child.orderId:
+          self.adoptedOrders[child.orderId] = (movement, child)
+    return fills
 
   def runCommands(self) -> None:
     if not self.targets or len(self.targets) == 0:
       _logger.error("No targets to place")
       self.stop("No Orders to Place")
     else:
-      _logger.debug(f"Will place {len(self.targets)} orders")
+      _logger.debug(f"Will place orders for {len(self.targets)} movements")
+      toPlace: list[tuple[MovementRecord2, OrderRecord2]] = []
       for movement in self.targets:
+        if movement.order.slices:
+          self.sliceFills[movement.rid] = self._sliceFills(movement)
+        toPlace.extend(
+          (movement, placed) for placed in movement.order.slices or [movement.order] if placed.rid not in self.alreadyPlaced
+        )
+      for start in range(0, len(toPlace), self.journal_chunk):
+        group = toPlace[start:start + self.journal_chunk]
         with self._lock:
-          oid: Optional[int] = self.responseTracker.nextOpId()
-          if oid:
-            if not movement.order.orderId:
-              movement.order.orderId = oid
-            _logger.info(
-              f"Placing order[{oid} of type {movement.order.orderType} for {movement.contract.symbol}]"
-              f"with strategy: {movement.order.algoStrategy}"
-            )
-            _logger.debug(f"Placing Order: {movement.order.__dict__}")
-            order: Order = movement.order.toOrder()
-            contract: Contract = movement.contract.to_contract()
-            self.placeOrder(oid, contract, order)
-            self.newlyOrdered[oid] = movement
-          else:
-            _logger.error("Cannot Generate Order Id")
-        if self.delay:
-          time.sleep(self.delay)
+          oids = [self.responseTracker.nextOpId() for _ in group]
+        if self.journal:
+          self.journal.record([(movement, placed, oid) for (movement, placed), oid in zip(group, oids)])
+        for (movement, placed), oid in zip(group, oids):
+          self._placeOne(movement, placed, oid)
+          if self.delay:
+            time.sleep(self.delay)
       _logger.debug("Placed Orders, requesting Updates")
       self.reqOpenOrders()
 
+  def _placeOne(self, movement: MovementRecord2, placed: OrderRecord2, oid: int) -> None:
+    with self._lock:
+      placed.orderId = oid
+      _logger.info(
+        "Placing order[%s of type %s for %s] with strategy: %s",
+        oid, placed.orderType, movement.contract.symbol, placed.algoStrategy
+      )
+      _logger.debug("Placing Order: %s", placed.__dict__)
+      order: Order = placed.toOrder()
+      contract: Contract = movement.contract.to_contract()
+      self._sending = oid
+      try:
+        self.placeOrder(oid, contract, order)
+      finally:
+        self._sending = None
+      self.newlyOrdered[oid] = movement
+      self.placedOrders[oid] = placed
+
+  def sendMsg(self, msg: str) -> None:
+    # The orderIds of a group are taken before sending any of them, each order is tracked under its own.
+    if self._sending is None:
+      super().sendMsg(msg)
+    else:
+      self.responseTracker.request(current_fn_name(1), msg, self._sending)
+      super(BaseProxy, self).sendMsg(msg)
+
   def orderStatus(
       self,
       orderId: OrderId,
@@ -128,20 +191,34 @@ class PlaceOrders(BaseProxy):
       mktCapPrice: float,
   ) -> None:
       _logger.info(
-          f"""
-    Receiving: orderStatus[{orderId}]
-    status: {status}
-    filled: {filled}
-    remaining: {remaining}
-    avgFillPrice: {avgFillPrice}
-    permId: {permId}
-    parentId: {parentId}
-    lastFillPrice: {lastFillPrice}
-    clientId: {clientId}
-    whyHeld: {whyHeld}
-    mktCapPrice: {mktCapPrice}
-  """
+          """
+    Receiving: orderStatus[%s]
+    status: %s
+    filled: %s
+    remaining: %s
+    avgFillPrice: %s
+    permId: %s
+    parentId: %s
+    lastFillPrice: %s
+    clientId: %s
+    whyHeld: %s
+    mktCapPrice: %s
+  """,
+          orderId, status, filled, remaining, avgFillPrice, permId, parentId, lastFillPrice, clientId, whyHeld, mktCapPrice
       )
+      movement = self._placedMovement(orderId)
+      if movement:
+        fills = self.sliceFills.get(movement.rid)
+        if fills:
+          fills.update(orderId, status, float(filled), avgFillPrice)
+          self.statusWriter.offer(fills.apply(movement))
+        else:
+          movement.status = MovementStatus.fromIbk(status)
+          movement.at = millis_epoch()
+        self.statusWriter.offer_transition(movement)
+      self.statusWriter.offer(OrderStatusResponse(
+        orderId, status, filled, remaining, avgFillPrice, permId, parentId, lastFillPrice, clientId, whyHeld, mktCapPrice
+      ))
 
   def openOrder(
       self,
@@ -150,20 +227,24 @@ class PlaceOrders(BaseProxy):
       order: Order,
       orderState: OrderState,
   ) -> None:
-      _logger.info(f"Receiving: openOrder[{orderId}] for {contract.symbol}")
+      _logger.info("Receiving: openOrder[%s] for %s", orderId, contract.symbol)
       with self._lock:
           pendingMovement = self.newlyOrdered.get(orderId)
       if not pendingMovement:
-          msg = f"Received openOrder for not pending orderId: {orderId}"
-          _logger.info(msg)
+          _logger.info("Received openOrder for not pending orderId: %s", orderId)
           if orderId not in self.previousOrderMessages:
             self.previousOrderMessages[orderId] = []
           self.previousOrderMessages[orderId].append(OrderNotification(orderId, contract, order, orderState))
       else:
           # del self.pendingOrders[orderId]
           self.partialResponse(orderId, {"openOrder": (contract, order, orderState)})
+          # The post processor applies the status transition to the movement in memory,
+          # the writer persists it in bulk with the rest of the batch. The status of a sliced movement is the
+          # aggregate of its children, kept by `orderStatus`, not the status of the child in this message.
+          if pendingMovement.rid not in self.sliceFills:
+            self.postProcess(orderId, contract, pendingMovement, orderState)
+            self.statusWriter.offer_transition(pendingMovement)
           self.completeResponse(orderId)
-          self.postProcess(orderId, contract, pendingMovement.order, orderState)
 
   def openOrderEnd(self) -> None:
       _logger.warning("Received openOrderEnd")
@@ -0,0 +1,167 @@
+import logging
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from ibapi.common import UNSET_DOUBLE, OrderId  # pyright: ignore
+from ibapi.contract import Contract  # pyright: ignore
+from ibapi.order import Order  # pyright: ignore
+from ibapi.order_state import OrderState  # pyright: ignore
+
+from salduba.corvino.persistence.movement_record import MovementRecord2
+from salduba.ib_tws_proxy.base_proxy.pacing import Pacer
+from salduba.ib_tws_proxy.base_proxy.tws_proxy import BaseProxy
+
+_logger = logging.getLogger(__name__)
+
+# The currency of the summary of the whole preview.
+all_currencies = "ALL"
+
+
+def amount(value: Any) -> Optional[float]:
+  """The value of an `OrderState` amount, reported as text for the margins, or None when TWS left it unset."""
+  try:
+    v = float(value)
+  except (TypeError, ValueError):
+    return None
+  return None if v >= UNSET_DOUBLE else v
+
+
+@dataclass
+class OrderPreview:
+  """
+  The margin and commission impact of one order, from the `OrderState` of its what-if copy.
+  TWS reports the margins in the base currency of the account and the commission in `commission_currency`.
+  """
+  orderId: int
+  ticker: str
+  symbol: str
+  currency: str
+  action: str
+  quantity: float
+  init_margin_change: Optional[float]
+  maint_margin_change: Optional[float]
+  equity_with_loan_change: Optional[float]
+  init_margin_before: Optional[float]
+  equity_with_loan_before: Optional[float]
+  commission: Optional[float]
+  commission_currency: str
+  warning: str
+
+  @classmethod
+  def of(cls, orderId: int, movement: MovementRecord2, order: Order, state: OrderState) -> 'OrderPreview':
+    return cls(
+      orderId=orderId,
+      ticker=movement.ticker,
+      symbol=movement.symbol,
+      currency=str(movement.currency),
+      action=order.action,
+      quantity=float(order.totalQuantity),
+      init_margin_change=amount(state.initMarginChange),
+      maint_margin_change=amount(state.maintMarginChange),
+      equity_with_loan_change=amount(state.equityWithLoanChange),
+      init_margin_before=amount(state.initMarginBefore),
+      equity_with_loan_before=amount(state.equityWithLoanBefore),
+      commission=amount(state.commission),
+      commission_currency=state.commissionCurrency,
+      warning=state.warningText
+    )
+
+
+@dataclass
+class MarginSummary:
+  """
+  The totals of the previews of the orders in `currency`, or of all of them for `all_currencies`.
+
+  Each what-if is evaluated on its own against the current portfolio, so the totals approximate the impact of the whole
+  batch. `projected_excess`, only in the `all_currencies` row, is the equity with loan after the batch minus the initial
+  margin it would need: a negative value is a margin breach.
+  """
+  currency: str
+  orders: int
+  init_margin_change: float
+  maint_margin_change: float
+  equity_with_loan_change: float
+  commission: Optional[float]
+  projected_excess: Optional[float] = None
+
+
+def summarize(previews: list[OrderPreview]) -> list[MarginSummary]:
+  """One summary per currency of the orders, followed by the summary of all of them."""
+  def total(ps: list[OrderPreview], currency: str) -> MarginSummary:
+    commission_currencies = {p.commission_currency for p in ps if p.commission is not None}
+    return MarginSummary(
+      currency=currency,
+      orders=len(ps),
+      init_margin_change=sum(p.init_margin_change or 0.0 for p in ps),
+      maint_margin_change=sum(p.maint_margin_change or 0.0 for p in ps),
+      equity_with_loan_change=sum(p.equity_with_loan_change or 0.0 for p in ps),
+      # Commissions in different currencies do not add up.
+      commission=sum(p.commission or 0.0 for p in ps) if len(commission_currencies) <= 1 else None
+    )
+  by_currency: dict[str, list[OrderPreview]] = {}
+  for p in previews:
+    by_currency.setdefault(p.currency, []).append(p)
+  summaries = [total(ps, c) for c, ps in sorted(by_currency.items())]
+  overall = total(previews, all_currencies)
+  # The account values before the batch are the same in every preview.
+  befores = [(p.equity_with_loan_before, p.init_margin_before) for p in previews]
+  equity, margin = next(((e, m) for e, m in befores if e is not None and m is not None), (None, None))
+  if equity is not None and margin is not None:
+    overall.projected_excess = (equity + overall.equity_with_loan_change) - (margin + overall.init_margin_change)
+  return summaries + [overall]
+
+
+class PreviewOrders(BaseProxy):
+  """
+  Places a what-if copy of the order of each target movement, without waiting for the response to one before sending
+  the next, at no more than `rate` messages per second. TWS answers each one with an `openOrder` carrying the margin
+  and commission impact in its `OrderState`, and never transmits them.
+  """
+  def __init__(
+      self,
+      targets: list[MovementRecord2],
+      host: str,
+      port: int,
+      clientId: int,
+      rate: float = 45.0,
+      timeout: Optional[float] = None,
+  ) -> None:
+    super().__init__(host, port, clientId, timeout=timeout if timeout else len(targets) / rate + 30)
+    self.pacer = Pacer(rate)
+    # Resolved before the session, so that the proxy threads do not touch the session of the records.
+    self.targets: list[tuple[MovementRecord2, Contract, Order]] = [
+      (m, m.contract.to_contract(), PreviewOrders.what_if(m.order.toOrder())) for m in targets
+    ]
+    self.requested: dict[int, tuple[MovementRecord2, Order]] = {}
+    self.previews: list[OrderPreview] = []
+
+  @staticmethod
+  def what_if(order: Order) -> Order:
+    order.whatIf = True
+    # TWS only evaluates transmitted orders. A what-if order is never executed.
+    order.transmit = True
+    return order
+
+  def runCommands(self) -> None:
+    if not self.targets:
+      _logger.error("No targets to preview")
+      self.stop("No Orders to Preview")
+      return
+    _logger.debug(f"Will preview orders for {len(self.targets)} movements")
+    for movement, contract, order in self.targets:
+      self.pacer.wait()
+      with self._lock:
+        oid = self.responseTracker.nextOpId()
+        _logger.debug("Previewing order[%s] for %s", oid, contract.symbol)
+        self.placeOrder(oid, contract, order)
+        self.requested[oid] = (movement, order)
+
+  def openOrder(self, orderId: OrderId, contract: Contract, order: Order, orderState: OrderState) -> None:
+    _logger.info("Receiving: openOrder[%s] for %s", orderId, contract.symbol)
+    with self._lock:
+      requested = self.requested.get(orderId)
+      pending = requested is not None and orderId in self.responseTracker.pending
+      if requested and pending:
+        self.previews.append(OrderPreview.of(orderId, requested[0], requested[1], orderState))
+    if pending:
+      self.completeResponse(orderId)
@@ -0,0 +1,81 @@
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+from ibapi.common import UNSET_DOUBLE, OrderId  # pyright: ignore
+from ibapi.contract import Contract  # pyright: ignore
+from ibapi.order import Order  # pyright: ignore
+from ibapi.order_state import OrderState  # pyright: ignore
+
+from salduba.ib_tws_proxy.base_proxy.tws_proxy import BaseProxy
+
+_logger = logging.getLogger(__name__)
+
+
+@dataclass
+class KnownOrder:
+  """
+  An order that TWS knows, open or completed. Completed orders are reported without their orderId, as 0. `filled` is
+  only reported for completed orders, 0 otherwise.
+  """
+  orderId: int
+  permId: int
+  clientId: int
+  orderRef: str
+  status: str
+  filled: float = 0.0
+
+
+class KnownOrders(BaseProxy):
+  """
+  Collects the orders that TWS knows with an `orderRef` starting with `orderRefPrefix`: the open orders of every client,
+  through `reqAllOpenOrders`, and those completed today, through `reqCompletedOrders`. An order reported as both
+  keeps the open one.
+  """
+  def __init__(self, orderRefPrefix: str, host: str, port: int, clientId: int, timeout: float = 60) -> None:
+    super().__init__(host, port, clientId, timeout=timeout)
+    self.orderRefPrefix = orderRefPrefix
+    self.open: dict[str, KnownOrder] = {}
+    self.completed: dict[str, KnownOrder] = {}
+    self._openReqId: Optional[int] = None
+    self._completedReqId: Optional[int] = None
+
+  @property
+  def known(self) -> dict[str, KnownOrder]:
+    """The known orders by `orderRef`."""
+    return {**self.completed, **self.open}
+
+  def runCommands(self) -> None:
+    with self._lock:
+      self._openReqId = self.responseTracker.nextOpId()
+      _logger.info(f"Requesting all open orders[{self._openReqId}] for '{self.orderRefPrefix}'")
+      self.reqAllOpenOrders()
+    with self._lock:
+      self._completedReqId = self.responseTracker.nextOpId()
+      _logger.info(f"Requesting completed orders[{self._completedReqId}] for '{self.orderRefPrefix}'")
+      self.reqCompletedOrders(False)
+
+  def _keep(self, into: dict[str, KnownOrder], orderId: int, order: Order, orderState: OrderState) -> None:
+    if order.orderRef and order.orderRef.startswith(self.orderRefPrefix):
+      with self._lock:
+        filled = order.filledQuantity if 0 < order.filledQuantity < UNSET_DOUBLE else 0.0
+        into[order.orderRef] = KnownOrder(
+          orderId, order.permId, order.clientId, order.orderRef, orderState.status, float(filled))
+
+  def openOrder(self, orderId: OrderId, contract: Contract, order: Order, orderState: OrderState) -> None:
+    _logger.debug("Receiving: openOrder[%s] %s for %s", orderId, order.orderRef, contract.symbol)
+    self._keep(self.open, orderId, order, orderState)
+
+  def openOrderEnd(self) -> None:
+    _logger.info(f"Received openOrderEnd with {len(self.open)} open orders")
+    if self._openReqId is not None:
+      self.completeResponse(self._openReqId)
+
+  def completedOrder(self, contract: Contract, order: Order, orderState: OrderState) -> None:
+    _logger.debug("Receiving: completedOrder %s for %s", order.orderRef, contract.symbol)
+    self._keep(self.completed, 0, order, orderState)
+
+  def completedOrdersEnd(self) -> None:
+    _logger.info(f"Received completedOrdersEnd with {len(self.completed)} completed orders")
+    if self._completedReqId is not None:
+      self.completeResponse(self._completedReqId)
@@ -0,0 +1,170 @@
+import datetime
+import math
+from dataclasses import dataclass
+from typing import Optional
+
+from salduba.corvino.persistence.movement_record import MovementRecord2, MovementStatus
+from salduba.ib_tws_proxy.domain.enumerations import Action, IbOrderStatus
+from salduba.ib_tws_proxy.orders.order_status_writer import SliceProgress
+from salduba.ib_tws_proxy.orders.OrderRepo import OrderRecord2, newOrderRecord
+from salduba.util.time import millis_epoch
+
+# TWS reads `goodAfterTime` without a time zone in the time zone of the TWS session.
+good_after_time_format = "%Y%m%d %H:%M:%S"
+
+
+@dataclass(frozen=True)
+class SlicingPolicy:
+  """
+  How to split the order of a movement into child orders ("slices").
+
+  The clip, the largest child order, is the smallest of:
+  - `max_clip` shares,
+  - `max_adv_fraction` of the average daily volume of the security, when it is known,
+  - the quantity divided in `slices` parts.
+
+  The quantity is then split in as few children as that clip allows, of sizes that differ by one share at most.
+  With an `interval`, child `i` only becomes active `i * interval` after `start` (the time of slicing by default)
+  through `goodAfterTime`, so that TWS holds the schedule and all children are placed in one session.
+  """
+  max_clip: Optional[int] = None
+  max_adv_fraction: Optional[float] = None
+  slices: Optional[int] = None
+  interval: Optional[datetime.timedelta] = None
+  start: Optional[datetime.datetime] = None
+
+  def __post_init__(self) -> None:
+    if self.max_clip is not None and self.max_clip < 1:
+      raise ValueError(f"The maximum clip must be at least one share, not {self.max_clip}")
+    if self.max_adv_fraction is not None and not 0 < self.max_adv_fraction <= 1:
+      raise ValueError(f"The fraction of the average daily volume must be in (0, 1], not {self.max_adv_fraction}")
+    if self.slices is not None and self.slices < 1:
+      raise ValueError(f"The number of slices must be at least one, not {self.slices}")
+
+  def clip(self, quantity: int, adv: Optional[float] = None) -> int:
+    candidates = [quantity]
+    if self.max_clip:
+      candidates.append(self.max_clip)
+    if self.max_adv_fraction and adv:
+      candidates.append(max(1, math.floor(adv * self.max_adv_fraction)))
+    if self.slices:
+      candidates.append(math.ceil(quantity / self.slices))
+    return max(1, min(candidates))
+
+  def sizes(self, quantity: int, adv: Optional[float] = None) -> list[int]:
+    """The quantities of the children for `quantity` shares, largest first."""
+    if quantity <= 0:
+      return []
+    count = math.ceil(quantity / self.clip(quantity, adv))
+    base, extra = divmod(quantity, count)
+    return [base + 1 if i < extra else base for i in range(count)]
+
+
+def slice_order(
+    parent: OrderRecord2,
+    policy: SlicingPolicy,
+    nowT: datetime.datetime,
+    adv: Optional[float] = None) -> list[OrderRecord2]:
+  """
+  The child orders of `parent` under `policy`, linked to it through `parent.slices`. They keep the direction, contract,
+  allocation and `transmit` of the parent, with `<parent orderRef>#<i>/<n>` references, `<i>` zero padded to the width
+  of `<n>` so that the references sort in the order of the slices. A parent that fits in a single clip is not sliced and
+  gets no children.
+  """
+  sizes = policy.sizes(int(parent.totalQuantity or 0), adv)
+  if len(sizes) < 2:
+    return []
+  sign = 1 if parent.action == Action.BUY else -1
+  start = policy.start if policy.start else nowT
+  children: list[OrderRecord2] = []
+  width = len(str(len(sizes)))
+  for idx, size in enumerate(sizes):
+    child = newOrderRecord(
+      sign * size,
+      parent.referenceContractId or 0,
+      nowT,
+      parent.account,
+      orderRef=f"{parent.orderRef}#{idx + 1:0{width}d}/{len(sizes)}",
+      transmit=parent.transmit)
+    if policy.interval and idx > 0:
+      child.goodAfterTime = (start + idx * policy.interval).strftime(good_after_time_format)
+    children.append(child)
+  parent.slices = children
+  return children
+
+
+class SliceFills:
+  """
+  The progress of a sliced order, aggregated from the latest `orderStatus` of each of its children.
+  """
+  _active = ["PreSubmitted", "Submitted"]
+  _terminal = ["Cancelled", "ApiCancelled", "Inactive", "Filled"]
+
+  def __init__(self, parent: OrderRecord2) -> None:
+    self.total = float(parent.totalQuantity or 0)
+    self.children = len(parent.slices)
+    # Taken now, `apply` is called from the threads of a placement, which must not load it from the db.
+    self.rid = parent.order_status.rid
+    self._latest: dict[int, tuple[str, float, float]] = {}
+
+  def update(self, orderId: int, status: str, filled: float, avgFillPrice: float) -> None:
+    self._latest[orderId] = (status, float(filled), avgFillPrice)
+
+  def seed(self, child: OrderRecord2) -> None:
+    """
+    Takes the stored status and fills of `child`, for a child whose `orderStatus` may not be received in this session.
+    Children that were never placed are left out.
+    """
+    status = child.order_status.status
+    if status == IbOrderStatus.NEW:
+      return
+    self.update(
+      child.orderId if child.orderId else -1 - len(self._latest),
+      "Cancelled" if status == IbOrderStatus.CANCELED else str(status),
+      child.order_status.filled or 0.0,
+      child.order_status.avg_fill_price or 0.0)
+
+  @property
+  def filled(self) -> float:
+    return sum(filled for _, filled, _ in self._latest.values())
+
+  @property
+  def remaining(self) -> float:
+    return max(0.0, self.total - self.filled)
+
+  @property
+  def avg_fill_price(self) -> float:
+    # The fills of a child seeded without an average price do not count towards it.
+    priced = [(f, price) for _, f, price in self._latest.values() if price]
+    filled = sum(f for f, _ in priced)
+    return sum(f * price for f, price in priced) / filled if filled else 0.0
+
+  @property
+  def status(self) -> str:
+    """
+    `Filled` when all the quantity is filled, `Cancelled` when every child ended before filling all of it, otherwise
+    the most advanced status of the children that are still working. A filled child of an order with quantity still
+    remaining leaves it `Submitted`.
+    """
+    if self.total and self.remaining <= 0:
+      return "Filled"
+    statuses = [s for s, _, _ in self._latest.values()]
+    if len(statuses) == self.children and all(s in self._terminal for s in statuses):
+      return "Cancelled"
+    working = [s for s in statuses if s in self._active]
+    if working:
+      return max(working, key=self._active.index)
+    if "Filled" in statuses:
+      return "Submitted"
+    return statuses[-1] if statuses else "PendingSubmit"
+
+  def apply(self, movement: MovementRecord2) -> SliceProgress:
+    """
+    Sets the status of the sliced `movement` from the aggregate of its children, `IN_PROGRESS` once any of them filled,
+    and returns the progress to write to the status of its parent order.
+    """
+    movement.status = MovementStatus.fromIbk(self.status)
+    if movement.status == MovementStatus.CONFIRMED and self.filled > 0:
+      movement.status = MovementStatus.IN_PROGRESS
+    movement.at = millis_epoch()
+    return SliceProgress(self.rid, self.status, self.filled, self.remaining, self.avg_fill_price)
@@ -0,0 +1,63 @@
+import logging
+from typing import Any, Callable, Iterable
+from uuid import uuid4
+
+from ibapi.contract import Contract  # pyright: ignore
+from sqlalchemy import Float, Integer, String, delete, insert
+from sqlalchemy.orm import Mapped, mapped_column
+
+from salduba.common.persistence.alchemy.db import UnitOfWork
+from salduba.common.persistence.alchemy.repo import RecordBase, RepoOps
+
+_logger = logging.getLogger(__name__)
+
+
+class PositionRecord2(RecordBase):
+  """
+  The position of an account in a contract, reported by TWS through `position`, in the snapshot taken at `at` that is
+  valid until `expires_on`. Each snapshot replaces the previous one, so the table holds one row per account and contract.
+  See: https://interactivebrokers.github.io/tws-api/positions.html
+  """
+  __tablename__: str = 'POSITION'
+  expires_on: Mapped[int] = mapped_column(Integer, nullable=False)
+  account: Mapped[str] = mapped_column(String(255), nullable=False)
+  con_id: Mapped[int] = mapped_column(Integer, nullable=False)
+  symbol: Mapped[str] = mapped_column(String(255), nullable=False)
+  sec_type: Mapped[str] = mapped_column(String(255), nullable=False)
+  currency: Mapped[str] = mapped_column(String(255), nullable=False)
+  position: Mapped[float] = mapped_column(Float, nullable=False)
+  avg_cost: Mapped[float] = mapped_column(Float, nullable=False)
+
+  @staticmethod
+  def row_of(account: str, contract: Contract, position: float, avgCost: float, at: int, expires_on: int) -> dict[str, Any]:
+    return {
+      'rid': str(uuid4()),
+      'at': at,
+      'expires_on': expires_on,
+      'account': account,
+      'con_id': contract.conId,
+      'symbol': contract.symbol,
+      'sec_type': contract.secType,
+      'currency': contract.currency,
+      'position': float(position),
+      'avg_cost': float(avgCost)
+    }
+
+
+class PositionRecordOps(RepoOps[PositionRecord2]):
+  def __init__(self) -> None:
+    super().__init__(PositionRecord2)
+
+  def current(self, atTime: int) -> Callable[[UnitOfWork], Iterable[PositionRecord2]]:
+    """The positions of the snapshot still valid at `atTime`, none if it expired."""
+    return self.find(lambda q: q.where(PositionRecord2.expires_on > atTime))
+
+  def replace(self, positions: list[dict[str, Any]]) -> Callable[[UnitOfWork], None]:
+    """Replaces the stored snapshot with `positions`, given as rows."""
+    def rs(uow: UnitOfWork) -> None:
+      with uow.in_unit() as s:
+        s.execute(delete(PositionRecord2))
+        if positions:
+          s.execute(insert(PositionRecord2), positions)
+      _logger.debug(f"Stored a snapshot of {len(positions)} positions")
+    return rs
@@ -0,0 +1,44 @@
+import logging
+from typing import Any, Optional
+
+from ibapi.contract import Contract  # pyright: ignore
+
+from salduba.ib_tws_proxy.base_proxy.tws_proxy import BaseProxy
+from salduba.ib_tws_proxy.positions.position_repo import PositionRecord2
+from salduba.util.time import millis_epoch
+
+_logger = logging.getLogger(__name__)
+
+
+class PositionsProxy(BaseProxy):
+  """
+  Takes a snapshot of the positions of all the accounts of the TWS session through `reqPositions`, as rows of
+  `POSITION` valid until `expires_on`. The subscription is cancelled at `positionEnd`, the updates that follow it are
+  not part of the snapshot.
+  """
+  def __init__(self, expires_on: int, host: str, port: int, clientId: int, timeout: float = 60) -> None:
+    super().__init__(host, port, clientId, timeout=timeout)
+    self.expires_on = expires_on
+    self.positions: list[dict[str, Any]] = []
+    self._reqId: Optional[int] = None
+    self._ended = False
+
+  def runCommands(self) -> None:
+    with self._lock:
+      self._reqId = self.responseTracker.nextOpId()
+      _logger.info(f"Requesting positions[{self._reqId}]")
+      self.reqPositions()
+
+  def position(self, account: str, contract: Contract, position: float, avgCost: float) -> None:
+    _logger.debug("Receiving: position %s %s[%s] %s@%s", account, contract.symbol, contract.conId, position, avgCost)
+    with self._lock:
+      if not self._ended:
+        self.positions.append(PositionRecord2.row_of(account, contract, position, avgCost, millis_epoch(), self.expires_on))
+
+  def positionEnd(self) -> None:
+    _logger.info(f"Received positionEnd with {len(self.positions)} positions")
+    with self._lock:
+      self._ended = True
+    self.cancelPositions()
+    if self._reqId is not None:
+      self.completeResponse(self._reqId)
@@ -1,8 +1,11 @@
+import atexit
 import logging
 import logging.config
+import logging.handlers
 import os
+import queue
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, List, Optional
 
 import yaml
 
@@ -43,7 +46,45 @@ class DefaultConfiguration:
   log_file_path = find_log_file(user_sub_dir, module_path(__name__), log_file_name)
 
 
+_queue_key = 'queue'
+
+_listeners: list[logging.handlers.QueueListener] = []
+
+
+def stop_queue_listeners() -> None:
+  """Stops the background listeners, writing out every record queued so far."""
+  while _listeners:
+    _listeners.pop().stop()
+
+
+atexit.register(stop_queue_listeners)
+
+
+def _enqueue_handlers(logger: logging.Logger) -> None:
+  handlers = [h for h in logger.handlers if not isinstance(h, logging.handlers.QueueHandler)]
+  if handlers:
+    log_queue: queue.SimpleQueue[Any] = queue.SimpleQueue()
+    for h in handlers:
+      logger.removeHandler(h)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+
+
 def init_logging(config_file: Path = DefaultConfiguration.log_file_path) -> None:
+  """
+  Configures logging from a `dictConfig` YAML file.
+
+  If the file has a `queue` section, the handlers of the loggers it lists (`root` when it gives none) are moved
+  behind a `QueueHandler` and served by a `QueueListener` thread, so that logging from the TWS callbacks never
+  waits on disk I/O. Listeners from a previous call are stopped, after writing out their records.
+  """
   with open(config_file) as f:
     config = yaml.safe_load(f)
-    logging.config.dictConfig(config)
+  queue_config = config.pop(_queue_key, None)
+  stop_queue_listeners()
+  logging.config.dictConfig(config)
+  if queue_config is not None:
+    for name in (queue_config or {}).get('loggers', ['root']):
+      _enqueue_handlers(logging.getLogger() if name == 'root' else logging.getLogger(name))
@@ -1,6 +1,9 @@
 import os
 import sys
-from typing import Optional
+from typing import TYPE_CHECKING, Optional, TypeVar
+
+if TYPE_CHECKING:
+  from salduba.ib_tws_proxy.base_proxy.tws_proxy import BaseProxy
 
 _tests_root_name = "tests"
 
@@ -11,3 +14,35 @@ def findTestsRoot() -> Optional[str]:
     if os.path.isdir(path):
       return path
   return None
+
+
+class StubConnection:
+  """A connection to TWS that drops the messages, counting them in `sent`."""
+  def __init__(self) -> None:
+    self.sent = 0
+
+  def isConnected(self) -> bool:
+    return True
+
+  def sendMsg(self, msg: bytes) -> int:
+    self.sent += 1
+    return len(msg)
+
+  def disconnect(self) -> None:
+    pass
+
+
+P = TypeVar('P', bound='BaseProxy')
+
+
+def connected(proxy: P) -> P:
+  """Sets up `proxy` as if it had connected to TWS, without a socket or listener thread."""
+  from ibapi.client import EClient  # pyright: ignore
+  from ibapi.server_versions import MAX_CLIENT_VER  # pyright: ignore
+
+  proxy.conn = StubConnection()
+  proxy.serverVersion_ = MAX_CLIENT_VER
+  proxy.setConnState(EClient.CONNECTED)
+  proxy.responseTracker.syncOpId(1)
+  proxy.responseTracker.start()
+  return proxy
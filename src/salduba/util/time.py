@@ -6,3 +6,4 @@ def millis_epoch(t: datetime.datetime = datetime.datetime.now()) -> int:
 
 
 ninety_days = 90 * 24 * 60 * 60 * 1000
+five_minutes = 5 * 60 * 1000
@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Generator, Optional, ParamSpec, TypeVar
+
+_default_category = 'corvino'
+
+P = ParamSpec('P')
+R = TypeVar('R')
+
+
+class Tracer:
+  """
+  Collects timeline events in the Chrome Trace Event format, which `chrome://tracing` and https://ui.perfetto.dev load
+  directly. Spans are complete (`X`) events on the thread that ran them; TWS request/response pairs are async (`b`/`e`)
+  events because the request leaves from the `Commander` thread and the response arrives on the `Listener` thread.
+  """
+
+  def __init__(self) -> None:
+    self.pid = os.getpid()
+    self.events: list[dict[str, Any]] = []
+    self._threads: dict[int, str] = {}
+    self._lock = threading.Lock()
+    self._origin = time.perf_counter_ns()
+
+  def now(self) -> float:
+    """Microseconds since the tracer was created."""
+    return (time.perf_counter_ns() - self._origin) / 1e3
+
+  def _record(self, event: dict[str, Any]) -> None:
+    thread = threading.current_thread()
+    tid = thread.native_id if thread.native_id is not None else threading.get_ident()
+    event.update(pid=self.pid, tid=tid)
+    with self._lock:
+      self._threads[tid] = thread.name
+      self.events.append(event)
+
+  def complete(self, name: str, start: float, category: str = _default_category, **args: Any) -> None:
+    self._record({'name': name, 'cat': category, 'ph': 'X', 'ts': start, 'dur': self.now() - start, 'args': args})
+
+  def instant(self, name: str, category: str = _default_category, **args: Any) -> None:
+    self._record({'name': name, 'cat': category, 'ph': 'i', 's': 't', 'ts': self.now(), 'args': args})
+
+  def begin(self, name: str, id: int, category: str = _default_category, **args: Any) -> None:
+    self._record({'name': name, 'cat': category, 'ph': 'b', 'id': id, 'ts': self.now(), 'args': args})
+
+  def end(self, name: str, id: int, category: str = _default_category, **args: Any) -> None:
+    self._record({'name': name, 'cat': category, 'ph': 'e', 'id': id, 'ts': self.now(), 'args': args})
+
+  def chrome_trace(self) -> dict[str, Any]:
+    with self._lock:
+      names = [
+        {'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid, 'args': {'name': name}}
+        for tid, name in self._threads.items()
+      ]
+      return {'traceEvents': names + list(self.events), 'displayTimeUnit': 'ms'}
+
+  def write(self, path: Path) -> Path:
+    with open(path, 'w') as f:
+      json.dump(self.chrome_trace(), f, default=str)
+    return path
+
+
+_tracer: Optional[Tracer] = None
+
+
+def start() -> Tracer:
+  """Starts collecting events for the whole process, replacing any tracer already active."""
+  global _tracer
+  _tracer = Tracer()
+  return _tracer
+
+
+def stop() -> Optional[Tracer]:
+  """Stops collecting events, returning the tracer that collected them, if any."""
+  global _tracer
+  tracer, _tracer = _tracer, None
+  return tracer
+
+
+def active() -> Optional[Tracer]:
+  return _tracer
+
+
+@contextmanager
+def span(name: str, category: str = _default_category, **args: Any) -> Generator[None, Any, None]:
+  """Records the block as a span of the current thread. Does nothing unless tracing was started."""
+  tracer = _tracer
+  if tracer is None:
+    yield
+    return
+  start_at = tracer.now()
+  try:
+    yield
+  finally:
+    tracer.complete(name, start_at, category, **args)
+
+
+def traced(name: str, category: str = _default_category) -> Callable[[Callable[P, R]], Callable[P, R]]:
+  """Records every call of the decorated function as a span named `name`."""
+  def decorator(fn: Callable[P, R]) -> Callable[P, R]:
+    @wraps(fn)
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+      with span(name, category):
+        return fn(*args, **kwargs)
+    return wrapper
+  return decorator
+
+
+def begin(name: str, id: int, category: str = _default_category, **args: Any) -> None:
+  if _tracer is not None:
+    _tracer.begin(name, id, category, **args)
+
+
+def end(name: str, id: int, category: str = _default_category, **args: Any) -> None:
+  if _tracer is not None:
+    _tracer.end(name, id, category, **args)
+
+
+def instant(name: str, category: str = _default_category, **args: Any) -> None:
+  if _tracer is not None:
+    _tracer.instant(name, category, **args)
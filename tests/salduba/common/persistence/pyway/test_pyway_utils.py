@@ -1,7 +1,13 @@
 import logging
+import sqlite3
 import tempfile
+import time
+from contextlib import closing
 from pathlib import Path
 
+import pytest
+from pyway.migrate import Migrate  # type: ignore
+
 from salduba.common.configuration import DbConfig
 from salduba.common.persistence.pyway.migrating import init_db
 from salduba.util.logging import init_logging
@@ -26,3 +32,50 @@ def test_migrate() -> None:
   )
 
   init_db(dbConfig)
+
+
+def test_migrate_skipped_when_current(monkeypatch: pytest.MonkeyPatch) -> None:
+  temp = tempfile.NamedTemporaryFile()
+  file_name = Path(temp.name)
+  temp.close()
+  dbConfig = DbConfig(storage_name=str(file_name.absolute()))
+  init_db(dbConfig)
+  with closing(sqlite3.connect(file_name)) as conn:
+    applied = conn.execute("SELECT count(*) FROM pyway_info").fetchone()[0]
+    assert applied == len(list(Path(dbConfig.migration_path).glob("*.sql")))
+
+  def no_migration(self: Migrate) -> str:
+    raise AssertionError("Migrations should not run for a current schema")
+  monkeypatch.setattr(Migrate, "run", no_migration)
+
+  init_db(dbConfig)
+  runs = 20
+  start = time.perf_counter()
+  for _ in range(runs):
+    init_db(dbConfig)
+  elapsed = (time.perf_counter() - start) / runs
+  _logger.info(f"No-op init_db: {elapsed * 1e3:.2f} ms")
+  assert elapsed < 0.005
+
+
+def test_migrate_runs_when_migrations_change(monkeypatch: pytest.MonkeyPatch) -> None:
+  temp = tempfile.NamedTemporaryFile()
+  file_name = Path(temp.name)
+  temp.close()
+  dbConfig = DbConfig(storage_name=str(file_name.absolute()))
+  init_db(dbConfig)
+  with closing(sqlite3.connect(file_name)) as conn, conn:
+    conn.execute("UPDATE schema_fingerprint SET migrations_hash = 'stale'")
+
+  runs: list[int] = []
+  original = Migrate.run
+
+  def counting(self: Migrate) -> str:
+    runs.append(1)
+    return str(original(self))
+  monkeypatch.setattr(Migrate, "run", counting)
+
+  init_db(dbConfig)
+  assert runs == [1]
+  init_db(dbConfig)
+  assert runs == [1]
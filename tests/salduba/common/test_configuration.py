@@ -0,0 +1,62 @@
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Callable
+
+import pytest
+
+from salduba.common.configuration import Cfg, Meta
+from salduba.util.logging import init_logging
+from salduba.util.tests import findTestsRoot
+
+_maybeTr = findTestsRoot()
+_tr = _maybeTr if _maybeTr else "./"
+init_logging(Path(_tr, "resources/logging.yaml"))
+_logger = logging.getLogger(__name__)
+
+
+class StatCounter:
+  def __init__(self, monkeypatch: pytest.MonkeyPatch) -> None:
+    self.count = 0
+    original: Callable[..., Any] = os.stat
+
+    def counting(*args: Any, **kwargs: Any) -> Any:
+      self.count += 1
+      return original(*args, **kwargs)
+    monkeypatch.setattr(os, "stat", counting)
+
+  def of(self, op: Callable[[], Any]) -> int:
+    before = self.count
+    op()
+    return self.count - before
+
+
+def command_paths(meta: Meta) -> Cfg:
+  """The paths a CLI command resolves: its configuration, logging configuration and storage."""
+  cfg = meta.resolve_config
+  meta.log_config_path
+  cfg.db.storage_path
+  cfg.db.storage_path
+  return cfg
+
+
+def test_resolution_is_cached(monkeypatch: pytest.MonkeyPatch) -> None:
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    underTest = Meta(home=Path(tmp_dir), cwd=Path(tmp_dir))
+    monkeypatch.setattr('salduba.common.configuration.defaultMeta', underTest)
+    stats = StatCounter(monkeypatch)
+
+    first = stats.of(lambda: command_paths(underTest))
+    second = stats.of(lambda: command_paths(underTest))
+    _logger.info(f"stat calls per command: first {first}, then {second}")
+    assert first > 0
+    # Only reading the configuration file itself remains once the paths are resolved.
+    assert second == 0
+    assert stats.of(lambda: underTest.resolve_storage_file('cervino.db')) == 0
+    assert stats.of(lambda: underTest.config_file_path) == 0
+
+    underTest.invalidate()
+    assert stats.of(lambda: underTest.config_file_path) > 0
+    assert underTest.config_file_path == Path(tmp_dir, ".cervino", underTest.config_file_name)
+    assert underTest.config_file_path.is_file()
@@ -1,11 +1,18 @@
+import csv
 import datetime
+import json
 import logging
+import tempfile
+import time
+import tracemalloc
 from pathlib import Path
 from typing import Any
 
+import pytest
 from openpyxl import load_workbook
 from openpyxl.worksheet.worksheet import Worksheet
 
+from salduba.common.configuration import Defaults, OutputFormat
 from salduba.corvino.io.parse_input import InputRow
 from salduba.corvino.io.results_out import ResultsBatch, contract_columns, error_columns, input_columns, movement_columns
 from salduba.corvino.persistence.movement_record import MovementRecord2, MovementStatus
@@ -308,3 +315,99 @@ def test_all_together() -> None:
       error_row += 1
     error_row = 1
   assert sheet.max_row == current_row - 1
+
+
+def all_together_probe(output_format: OutputFormat) -> ResultsBatch:
+  probe = ResultsBatch(
+    datetime.datetime.now(),
+    "Testing columnar render",
+    sample_inputs,
+    sample_contracts,
+    [],
+    [],
+    sample_movements,
+    sample_errors
+  )
+  probe.format = output_format
+  return probe
+
+
+def test_csv_output() -> None:
+  probe = all_together_probe(OutputFormat.CSV)
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    written = probe.write(str(Path(tmp_dir, "results.xlsx")))
+    assert [p.name for p in written] == [
+      f"results_{probe.input_sheet}.csv",
+      f"results_{probe.known_sheet}.csv",
+      f"results_{probe.movement_sheet}.csv",
+      f"results_{probe.error_sheet}.csv"]
+    with open(written[0], newline='') as f:
+      rows = list(csv.DictReader(f))
+    assert list(rows[0].keys()) == input_columns
+    assert [r['ticker'] for r in rows] == [i.ticker for i in sample_inputs]
+    assert rows[0]['country'] == Country.US.value
+    with open(written[1], newline='') as f:
+      rows = list(csv.DictReader(f))
+    assert [int(r['expires_on']) for r in rows] == [c.expires_on for c in sample_contracts]
+    with open(written[3], newline='') as f:
+      rows = list(csv.DictReader(f))
+    assert len(rows) == sum(len(errs) for errs in sample_errors.values())
+    assert rows[0] == {'key': 'error1', 'opId': '1', 'errorCode': '10', 'errorString': '1_error_str'}
+
+
+def test_jsonl_output() -> None:
+  probe = all_together_probe(OutputFormat.JSONL)
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    written = probe.write(str(Path(tmp_dir, "results.xlsx")))
+    assert len(written) == 4
+    with open(written[2]) as f:
+      rows = [json.loads(line) for line in f]
+    assert len(rows) == len(sample_movements)
+    for row, m in zip(rows, sample_movements):
+      assert list(row.keys()) == movement_columns
+      assert row['status'] == m.status
+      assert row['trade'] == m.trade
+      assert row['exchange2'] == m.exchange2
+
+
+def test_parquet_output() -> None:
+  pq = pytest.importorskip("pyarrow.parquet")
+  probe = all_together_probe(OutputFormat.PARQUET)
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    written = probe.write(str(Path(tmp_dir, "results.xlsx")))
+    movements = pq.read_table(written[2])
+    assert movements.column_names == movement_columns
+    assert movements.column('ticker').to_pylist() == [m.ticker for m in sample_movements]
+
+
+@pytest.mark.benchmark
+def test_write_large_batch() -> None:
+  def peak_for(rows: int, target: str) -> tuple[float, int]:
+    probe = ResultsBatch(
+      datetime.datetime.now(),
+      "Testing large render",
+      [inputProbe(i) for i in range(rows)],
+      [],
+      [],
+      [],
+      [movementProbe("LargeBatch", i) for i in range(rows)],
+      {}
+    )
+    tracemalloc.start()
+    start = time.perf_counter()
+    probe.write_xlsx(target)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    small_elapsed, small_peak = peak_for(500, str(Path(tmp_dir, "small.xlsx")))
+    large_elapsed, large_peak = peak_for(5_000, str(Path(tmp_dir, "large.xlsx")))
+    result = load_workbook(Path(tmp_dir, "large.xlsx"), read_only=True)
+    assert sum(1 for _ in result[Defaults.output.movement_sheet].iter_rows()) == 5_001
+  # Times are measured with tracemalloc enabled, which slows down openpyxl considerably.
+  _logger.info(f"500 rows: {small_elapsed:.3f} secs, peak {small_peak/1e6:.2f} MB")
+  _logger.info(f"5k rows: {large_elapsed:.3f} secs, peak {large_peak/1e6:.2f} MB")
+  # Beyond the column arrays (references to existing values) nothing should grow with the number of rows.
+  assert large_peak < 4 * small_peak
@@ -1,8 +1,12 @@
 import logging
 import os
+import tempfile
+import time
 from pathlib import Path
 
-from salduba.corvino.io.parse_input import InputParser, split_ticker
+import pytest
+
+from salduba.corvino.io.parse_input import InputParser, exchangeTable, split_ticker
 from salduba.ib_tws_proxy.domain.enumerations import Country, Currency, Exchange, SecType
 from salduba.util.logging import init_logging
 from salduba.util.tests import findTestsRoot
@@ -134,3 +138,40 @@ def test_read_excel_minimal() -> None:
     }
   first = result.iloc[0]  # pyright: ignore
   assert expect_in_0 == dict(first)  # pyright: ignore
+
+
+def test_unknown_country() -> None:
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    probe = Path(tmp_dir, "movements.csv")
+    probe.write_text("Ticker,Trade\nVBK GR Equity,100\nXYZ ZZ Equity,200\n")
+    with pytest.raises(ValueError, match="XYZ ZZ Equity"):
+      InputParser.input_rows_from(str(probe))
+
+
+def test_malformed_ticker() -> None:
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    probe = Path(tmp_dir, "movements.csv")
+    probe.write_text("Ticker,Trade\nVBK GR Equity,100\nXYZ,200\n")
+    with pytest.raises(ValueError, match="SYMBOL COUNTRY TYPE"):
+      InputParser.input_rows_from(str(probe))
+
+
+@pytest.mark.benchmark
+def test_input_rows_from_large_csv() -> None:
+  rows = 100_000
+  countries = list(exchangeTable.keys())
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    probe = Path(tmp_dir, "movements.csv")
+    with open(probe, "w") as f:
+      f.write("Ticker,Trade\n")
+      for i in range(rows):
+        f.write(f"S{i:06d} {countries[i % len(countries)]} Equity,{(i % 200 - 100) * 10}\n")
+    start = time.perf_counter()
+    result = InputParser.input_rows_from(str(probe))
+    elapsed = time.perf_counter() - start
+  _logger.info(f"Parsed {rows} movements in {elapsed:.3f} secs")
+  assert len(result) == rows
+  assert result[0].ticker == "S000000 SW Equity"
+  assert result[0].currency == Currency.CHF
+  assert result[0].exchange == Exchange.EBS
+  assert elapsed < 5.0
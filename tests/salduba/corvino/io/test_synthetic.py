@@ -0,0 +1,74 @@
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+from sqlalchemy import Engine, create_engine
+
+from salduba.common.persistence.alchemy.db import Db
+from salduba.common.persistence.alchemy.repo import RecordBase
+from salduba.corvino.io.parse_input import InputParser, exchangeTable
+from salduba.corvino.io.synthetic import SyntheticUniverse
+from salduba.corvino.persistence.movement_record import MovementRecordOps
+from salduba.corvino.services.app import CorvinoApp
+from salduba.ib_tws_proxy.contracts.contract_repo import ContractRecordOps, DeltaNeutralContractOps
+from salduba.ib_tws_proxy.orders.OrderRepo import OrderRecordOps
+from salduba.util.logging import init_logging
+from salduba.util.tests import findTestsRoot
+
+_maybeTr = findTestsRoot()
+_tr = _maybeTr if _maybeTr else "./"
+init_logging(Path(os.path.join(_tr, "resources/logging.yaml")))
+_logger = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def setup_db() -> Db:
+  temp = tempfile.NamedTemporaryFile()
+  file_name = Path(temp.name)
+  temp.close()
+  engine: Engine = create_engine(f"sqlite:///{file_name.absolute()}")
+  RecordBase.metadata.create_all(engine)
+  return Db(engine)
+
+
+def test_universe_shape() -> None:
+  universe = SyntheticUniverse(2000, duplicate_ratio=0.1, unknown_ratio=0.2)
+  movements = universe.movements()
+  tickers = [t for t, _ in movements]
+  assert len(movements) == 2000
+  assert all(trade != 0 for _, trade in movements)
+  assert universe.known == len({t for t in tickers if t.startswith('S')})
+  assert universe.unknown == len({t for t in tickers if t.startswith('U')})
+  assert len(tickers) - len(set(tickers)) == pytest.approx(200, rel=0.25)
+  assert universe.unknown == pytest.approx(400, rel=0.25)
+  assert {t.split(' ')[1] for t in tickers} == set(exchangeTable.keys())
+  assert SyntheticUniverse(2000, duplicate_ratio=0.1, unknown_ratio=0.2).movements() == movements
+
+
+def test_rejects_bad_ratios() -> None:
+  with pytest.raises(ValueError):
+    SyntheticUniverse(10, duplicate_ratio=0.6, unknown_ratio=0.6)
+  with pytest.raises(ValueError):
+    SyntheticUniverse(10, unknown_ratio=-0.1)
+
+
+@pytest.mark.parametrize("suffix", ["csv", "xlsx"])
+def test_seeded_universe_verifies(setup_db: Db, suffix: str) -> None:
+  universe = SyntheticUniverse(300, duplicate_ratio=0.05, unknown_ratio=0.1)
+  assert universe.seed_contracts(setup_db) == universe.known
+  app = CorvinoApp(
+    db=setup_db,
+    contract_repo=ContractRecordOps(),
+    dnc_repo=DeltaNeutralContractOps(),
+    movements_repo=MovementRecordOps(),
+    order_repo=OrderRecordOps(),
+    appFamily=1000)
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    input_rows = InputParser.input_rows_from(str(universe.write(Path(tmp_dir, f"movements.{suffix}"))))
+  assert len(input_rows) == 300
+  with setup_db.for_work() as uow:
+    rs = app.verify_contracts_for_input_rows(input_rows, uow)
+  assert {r.ticker for r in rs.unknown} == {t for t, _ in universe.movements() if t.startswith('U')}
+  assert len(rs.known) == universe.known
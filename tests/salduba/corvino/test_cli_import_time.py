@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from salduba.common import configuration
+
+_cli_module = 'salduba.corvino.commands.cli'
+
+# Generous enough for a loaded CI machine, far below the seconds it took when the CLI imported everything eagerly.
+_import_budget_us = 500_000
+
+_lazy_modules = ['pandas', 'numpy', 'openpyxl', 'sqlalchemy', 'ibapi', 'pyway', 'yaml', 'platformdirs']
+
+
+def import_times(module: str) -> dict[str, int]:
+  env = dict(os.environ)
+  src_dir = str(Path(configuration.__file__).parents[2])
+  env['PYTHONPATH'] = os.pathsep.join([src_dir] + ([env['PYTHONPATH']] if env.get('PYTHONPATH') else []))
+  result = subprocess.run(
+    [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+    env=env, capture_output=True, text=True, check=True)
+  times: dict[str, int] = {}
+  for line in result.stderr.splitlines():
+    if line.startswith('import time:') and '|' in line:
+      _, cumulative, name = line[len('import time:'):].split('|')
+      if cumulative.strip().isdigit():
+        times[name.strip()] = int(cumulative)
+  return times
+
+
+def test_cli_import_is_lazy() -> None:
+  times = import_times(_cli_module)
+  assert _cli_module in times
+  eager = [m for m in _lazy_modules if m in times]
+  assert not eager, f"{_cli_module} should not import {eager} at import time"
+  assert times[_cli_module] < _import_budget_us, \
+    f"Importing {_cli_module} took {times[_cli_module]/1e3:.1f} ms, budget is {_import_budget_us/1e3:.1f} ms"
@@ -0,0 +1,80 @@
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+from sqlalchemy import Engine, create_engine
+
+from salduba.common.configuration import Cfg
+from salduba.common.persistence.alchemy.db import Db
+from salduba.common.persistence.alchemy.repo import RecordBase
+from salduba.corvino.commands import client
+from salduba.corvino.persistence.movement_record import MovementRecordOps
+from salduba.corvino.services.app import CorvinoApp
+from salduba.corvino.services.daemon import CorvinoDaemon
+from salduba.ib_tws_proxy.contracts.contract_repo import ContractRecordOps, DeltaNeutralContractOps
+from salduba.ib_tws_proxy.orders.OrderRepo import OrderRecordOps
+from salduba.util.logging import init_logging
+from salduba.util.tests import findTestsRoot
+
+_maybeTr = findTestsRoot()
+_tr = _maybeTr if _maybeTr else "./"
+init_logging(Path(os.path.join(_tr, "resources/logging.yaml")))
+_logger = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def setup_db() -> Db:
+  temp = tempfile.NamedTemporaryFile()
+  file_name = Path(temp.name)
+  temp.close()
+  engine: Engine = create_engine(f"sqlite:///{file_name.absolute()}")
+  RecordBase.metadata.create_all(engine)
+  return Db(engine)
+
+
+def test_serves_requests(setup_db: Db) -> None:
+  app = CorvinoApp(
+    db=setup_db,
+    contract_repo=ContractRecordOps(),
+    dnc_repo=DeltaNeutralContractOps(),
+    movements_repo=MovementRecordOps(),
+    order_repo=OrderRecordOps(),
+    appFamily=100,
+    host="localhost",
+    port=7497,
+  )
+  probeFile = os.path.join(_tr, "resources/cervino_rebalance_v2_minimal.csv")
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    socket_path = Path(tmp_dir, "cervino.sock")
+    underTest = CorvinoDaemon(app, Cfg(), socket_path)
+    serving = threading.Thread(target=underTest.serve_forever, daemon=True)
+    serving.start()
+    try:
+      assert client.request(socket_path, {'command': client.PING}, timeout=10) == {'ok': True, 'message': 'pong', 'files': []}
+
+      output_file = str(Path(tmp_dir, "output.xlsx"))
+      reply = client.request(
+        socket_path, {'command': client.VERIFY, 'input_file': probeFile, 'output_file': output_file}, timeout=10)
+      assert reply == {'ok': True, 'message': "Some contracts not known", 'files': [output_file]}
+      assert Path(output_file).is_file()
+
+      reply = client.request(socket_path, {'command': 'no-such-command'}, timeout=10)
+      assert not reply['ok']
+      assert reply['message'] == "Unknown command: no-such-command"
+
+      missing_file = os.path.join(tmp_dir, "missing.csv")
+      reply = client.request(socket_path, {'command': client.VERIFY, 'input_file': missing_file}, timeout=10)
+      assert not reply['ok']
+
+      assert client.request(socket_path, {'command': client.SHUTDOWN}, timeout=10)['ok']
+      serving.join(10)
+      assert not serving.is_alive()
+    finally:
+      underTest.shutdown()
+      underTest.server_close()
+    assert not socket_path.exists()
+    with pytest.raises(client.DaemonUnavailable):
+      client.request(socket_path, {'command': client.PING}, timeout=10)
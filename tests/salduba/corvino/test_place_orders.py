@@ -5,15 +5,18 @@ import tempfile
 from pathlib import Path
 
 import pytest
+from ibapi.contract import Contract  # pyright: ignore
+from ibapi.order_state import OrderState  # pyright: ignore
 from sqlalchemy import Engine, create_engine
 
 from salduba.common.persistence.alchemy.db import Db
 from salduba.common.persistence.alchemy.repo import RecordBase
 from salduba.corvino.io.parse_input import InputParser
-from salduba.corvino.persistence.movement_record import MovementRecordOps
+from salduba.corvino.persistence.movement_record import MovementRecord2, MovementRecordOps, MovementStatus
 from salduba.corvino.services.app import CorvinoApp
 from salduba.ib_tws_proxy.contracts.contract_repo import ContractRecordOps, DeltaNeutralContractOps
-from salduba.ib_tws_proxy.orders.OrderRepo import OrderRecordOps
+from salduba.ib_tws_proxy.orders.OrderRepo import OrderRecordOps, newOrderRecord
+from salduba.ib_tws_proxy.orders.placing_orders import OpenOrderResponse
 from salduba.util.logging import init_logging
 from salduba.util.tests import findTestsRoot
 
@@ -72,3 +75,31 @@ def test_place_orders(setup_db: Db) -> None:
       assert f"{len(probe)} Movements Placed" == result.message, result
     else:
       assert False, f"Could not find all contracts, output at: {output_file_path}"
+
+
+def test_post_place_order_in_memory(setup_db: Db) -> None:
+  underTest = CorvinoApp(
+    db=setup_db,
+    contract_repo=ContractRecordOps(),
+    dnc_repo=DeltaNeutralContractOps(),
+    movements_repo=MovementRecordOps(),
+    order_repo=OrderRecordOps(),
+    appFamily=1000
+  )
+  movement = MovementRecord2(
+    rid="movement_rid",
+    at=0,
+    status=MovementStatus.NEW,
+    order=newOrderRecord(100, 1234, datetime.datetime.now(), "allocation", "TestBatch::ACN US Equity", False, 77)
+  )
+  contract = Contract()
+  contract.symbol = "ACN"
+  orderState = OrderState()
+  orderState.status = "PreSubmitted"
+  # Not persisted: routing the callback to the movement must not need the DB.
+  result = underTest.postPlaceOrder(77, contract, movement, orderState)
+  assert isinstance(result, OpenOrderResponse)
+  assert result.orderId == 77
+  assert result.order.totalQuantity == 100
+  assert movement.status == MovementStatus.CONFIRMED
+  assert movement.at > 0
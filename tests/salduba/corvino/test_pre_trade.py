@@ -0,0 +1,127 @@
+import datetime
+import os
+import time
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+
+from salduba.common.configuration import Meta, RiskConfig, RiskMode
+from salduba.corvino.persistence.movement_record import MovementRecord2, MovementStatus
+from salduba.corvino.services.pre_trade import check_batch
+from salduba.ib_tws_proxy.contracts.contract_repo import ContractRecord2
+from salduba.ib_tws_proxy.domain.enumerations import Country, Currency, Exchange, SecType
+from salduba.util.logging import init_logging
+from salduba.util.tests import findTestsRoot
+from salduba.util.time import millis_epoch
+
+_maybeTr = findTestsRoot()
+_tr = _maybeTr if _maybeTr else "./"
+init_logging(Path(os.path.join(_tr, "resources/logging.yaml")))
+
+
+def movementProbe(
+    symbol: str,
+    trade: int,
+    currency: Currency = Currency.USD,
+    country: Country = Country.US,
+    primary: Exchange = Exchange.NYSE) -> MovementRecord2:
+  nowT = datetime.datetime.now()
+  return MovementRecord2(
+    rid=str(uuid4()),
+    at=millis_epoch(nowT),
+    status=MovementStatus.NEW,
+    batch="TestBatch",
+    ticker=f"{symbol} {country} Equity",
+    trade=trade,
+    nombre=symbol,
+    symbol=symbol,
+    raw_type="Equity",
+    ibk_type=SecType.STK,
+    country=country,
+    currency=currency,
+    exchange=Exchange.SMART,
+    exchange2=primary,
+    contract=ContractRecord2(
+      rid=str(uuid4()),
+      at=millis_epoch(nowT),
+      expires_on=millis_epoch(nowT) + 10000,
+      con_id=1,
+      symbol=symbol,
+      sec_type=SecType.STK,
+      lookup_exchange=Exchange.SMART,
+      exchange=Exchange.SMART,
+      primary_exchange=primary,
+      currency=currency,
+      include_expired=False
+    )
+  )
+
+
+_batch = [
+  movementProbe("AAA", 100),
+  movementProbe("BBB", -50),
+  movementProbe("CCC", 10, Currency.EUR, Country.GR, Exchange.IBIS),
+]
+_prices = {"AAA US Equity": 10.0, "BBB US Equity": 20.0, "CCC GR Equity": 50.0}
+
+
+def test_configure_risk() -> None:
+  cfg = RiskConfig.configure(Meta(), {
+    'mode': 'flag', 'fx_rates': {'EUR': 1.1}, 'max_turnover': 1000, 'max_name_weight': None, 'max_notional_by_country': {}
+  })
+  assert cfg.mode == RiskMode.FLAG and cfg.fx_rates == {'EUR': 1.1} and cfg.max_turnover == 1000.0
+  assert cfg.max_name_weight is None and cfg.needs_prices
+  assert not RiskConfig().needs_prices
+
+
+def test_exposures() -> None:
+  check = check_batch(_batch, RiskConfig(fx_rates={"EUR": 2.0}), _prices)
+  assert not check.violations and not check.blocked
+  assert check.message == "Pre-trade checks passed"
+  by = {(e.dimension, e.key): e for e in check.exposures}
+  assert (by[("currency", "USD")].orders, by[("currency", "USD")].net, by[("currency", "USD")].gross) == (2, 0.0, 2000.0)
+  assert by[("country", "GR")].net == 1000.0
+  assert by[("country", "GR")].weight == pytest.approx(1000.0 / 3000.0)
+  assert by[("exchange", "NYSE")].gross == 2000.0
+  assert (by[("name", "AAA US Equity")].gross, by[("batch", "ALL")].gross) == (1000.0, 3000.0)
+
+
+def test_violations() -> None:
+  limits = RiskConfig(
+    fx_rates={"EUR": 2.0},
+    max_order_quantity=80,
+    max_turnover=2500,
+    max_name_weight=0.3,
+    max_notional_by_exchange={"IBIS": 500})
+  check = check_batch(_batch, limits, _prices)
+  assert sorted((v.check, v.key) for v in check.violations) == [
+    ("exchange_notional", "IBIS"), ("name_weight", "AAA US Equity"), ("order_quantity", "AAA US Equity"), ("turnover", "ALL")
+  ]
+  assert check.blocked
+  assert check.message == "Pre-trade checks blocked the batch with 4 violations"
+
+  flagged = check_batch(_batch, RiskConfig(mode=RiskMode.FLAG, max_order_notional=100.0), {"AAA US Equity": 10.0})
+  # Without a price for BBB and a rate for EUR their notional cannot be checked.
+  assert sorted((v.check, v.key) for v in flagged.violations) == [
+    ("fx_rate", "EUR"), ("order_notional", "AAA US Equity"), ("price", "BBB US Equity"), ("price", "CCC GR Equity")
+  ]
+  assert not flagged.blocked
+  assert flagged.message == "Pre-trade checks flagged with 4 violations"
+
+  off = check_batch(_batch, RiskConfig(mode=RiskMode.OFF, max_order_quantity=1), _prices)
+  assert (off.exposures, off.violations, off.blocked) == ([], [], False)
+
+
+def test_large_batch() -> None:
+  movements = [
+    movementProbe(f"S{idx}", idx - 2500, Currency.EUR if idx % 3 else Currency.USD) for idx in range(5000)
+  ]
+  prices = {m.ticker: 10.0 for m in movements}
+  limits = RiskConfig(fx_rates={"EUR": 1.1}, max_name_weight=0.5, max_notional_by_currency={"EUR": 1e9})
+  start = time.perf_counter()
+  check = check_batch(movements, limits, prices)
+  elapsed = time.perf_counter() - start
+  assert not check.violations
+  assert sum(e.orders for e in check.exposures if e.dimension == "currency") == 5000
+  assert elapsed < 1.0, f"Pre-trade checks of 5000 orders took {elapsed:.3f}s"
@@ -0,0 +1,73 @@
+import pstats
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+
+from salduba.corvino.commands.profiling import BOTH, CPROFILE, TRACEMALLOC, CommandProfiler
+
+
+def _busy_work() -> list[str]:
+  return [str(i) * 10 for i in range(20_000)]
+
+
+def test_profiles_with_both() -> None:
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    profiler = CommandProfiler(BOTH, Path(tmp_dir), "cervino_command_output")
+    profiler.start()
+    kept = _busy_work()
+    written = profiler.stop("batch 2024/01")
+    assert kept
+    names = sorted(p.name for p in written)
+    assert names == [
+      "cervino_command_output_batch_2024_01.collapsed",
+      "cervino_command_output_batch_2024_01.prof",
+      "cervino_command_output_batch_2024_01_cprofile.txt",
+      "cervino_command_output_batch_2024_01_tracemalloc.txt"
+    ]
+    assert all(p.parent == Path(tmp_dir) for p in written)
+    stats = pstats.Stats(str(Path(tmp_dir).joinpath("cervino_command_output_batch_2024_01.prof")))
+    assert any(name == '_busy_work' for (_, _, name) in stats.stats)  # type: ignore
+    collapsed = Path(tmp_dir).joinpath("cervino_command_output_batch_2024_01.collapsed").read_text()
+    assert all(len(line.rsplit(' ', 1)) == 2 and int(line.rsplit(' ', 1)[1]) > 0 for line in collapsed.splitlines())
+    assert "_busy_work (test_profiling.py" in collapsed
+    allocations = Path(tmp_dir).joinpath("cervino_command_output_batch_2024_01_tracemalloc.txt").read_text()
+    assert allocations.startswith("Peak traced memory:")
+    assert "test_profiling.py" in allocations
+
+
+@pytest.mark.parametrize("mode,suffixes", [(CPROFILE, ['.collapsed', '.prof', '.txt']), (TRACEMALLOC, ['.txt'])])
+def test_profiles_with_one(mode: str, suffixes: list[str]) -> None:
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    profiler = CommandProfiler(mode, Path(tmp_dir), "out")
+    profiler.start()
+    _busy_work()
+    assert sorted(p.suffix for p in profiler.stop("tag")) == suffixes
+
+
+def _threaded_work(done: list[int]) -> None:
+  done.append(len([str(i) * 10 for i in range(20_000)]))
+
+
+def test_profiles_other_threads() -> None:
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    profiler = CommandProfiler(CPROFILE, Path(tmp_dir), "out")
+    profiler.start()
+    done: list[int] = []
+    worker = threading.Thread(target=_threaded_work, args=(done,))
+    worker.start()
+    worker.join()
+    _busy_work()
+    profiler.stop("tag")
+    # Profiling must not keep the thread from running its target.
+    assert done == [20_000]
+    stats = pstats.Stats(str(Path(tmp_dir).joinpath("out_tag.prof")))
+    names = {name for (_, _, name) in stats.stats}  # type: ignore
+    assert {'_busy_work', '_threaded_work'} <= names
+    assert threading.getprofile() is None
+
+
+def test_unknown_mode() -> None:
+  with pytest.raises(ValueError):
+    CommandProfiler("perf", Path("."), "out")
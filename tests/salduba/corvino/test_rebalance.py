@@ -0,0 +1,141 @@
+import datetime
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from ibapi.contract import Contract  # pyright: ignore
+from sqlalchemy import Engine, create_engine
+
+from salduba.common.persistence.alchemy.db import Db
+from salduba.common.persistence.alchemy.repo import RecordBase
+from salduba.corvino.persistence.movement_record import MovementRecordOps
+from salduba.corvino.services.app import CorvinoApp
+from salduba.corvino.services.rebalance import RebalancePolicy, rebalance_rows, rebalance_trades, rebalance_universe, untargeted
+from salduba.ib_tws_proxy.contracts.contract_repo import ContractRecordOps, DeltaNeutralContractOps
+from salduba.ib_tws_proxy.domain.enumerations import Country, Currency, Exchange, SecType
+from salduba.ib_tws_proxy.orders.OrderRepo import OrderRecordOps
+from salduba.ib_tws_proxy.positions.position_repo import PositionRecord2, PositionRecordOps
+from salduba.util.logging import init_logging
+from salduba.util.tests import findTestsRoot
+from salduba.util.time import millis_epoch
+
+_maybeTr = findTestsRoot()
+_tr = _maybeTr if _maybeTr else "./"
+init_logging(Path(os.path.join(_tr, "resources/logging.yaml")))
+
+
+@pytest.fixture
+def setup_db() -> Db:
+  temp = tempfile.NamedTemporaryFile()
+  file_name = Path(temp.name)
+  temp.close()
+  engine: Engine = create_engine(f"sqlite:///{file_name.absolute()}")
+  RecordBase.metadata.create_all(engine)
+  return Db(engine)
+
+
+def universe(**columns: list[float]) -> pd.DataFrame:
+  tickers = ["AAA US Equity", "BBB US Equity", "CCC GR Equity"]
+  defaults = {'Weight': [0.5, 0.5, 0.0], 'Position': [0.0, 0.0, 0.0], 'Price': [10.0, 20.0, 50.0],
+              'Rate': [1.0, 1.0, 1.0], 'Lot': [1.0, 1.0, 1.0]}
+  return pd.DataFrame({**defaults, **columns}, index=pd.Index(tickers, name='Ticker'))
+
+
+def test_rebalance_trades() -> None:
+  trades = rebalance_trades(universe(Position=[100.0, 0.0, 20.0], Rate=[1.0, 1.0, 2.0]), RebalancePolicy())
+  # Valued at 100 * 10 + 20 * 50 * 2 = 3000, half of it in each of AAA and BBB.
+  assert trades['Current'].sum() == 3000.0
+  assert trades['Trade'].to_list() == [50, 75, -20]
+
+  lots = rebalance_trades(universe(Lot=[100.0, 1.0, 1.0]), RebalancePolicy(nav=16000.0))
+  assert lots['Trade'].to_list() == [800, 400, 0]
+  assert rebalance_trades(universe(Lot=[300.0, 1.0, 1.0]), RebalancePolicy(nav=16000.0))['Trade'].to_list()[0] == 900
+
+  # Closing a position is never skipped as a small trade.
+  small = rebalance_trades(
+    universe(Position=[98.0, 55.0, 1.0]), RebalancePolicy(nav=2000.0, min_notional=50.0, min_weight_change=0.01))
+  assert small['Trade'].to_list() == [0, -5, -1]
+
+  with pytest.raises(ValueError, match="BBB US Equity"):
+    rebalance_trades(universe(Price=[10.0, np.nan, 50.0]), RebalancePolicy(nav=1000.0))
+  with pytest.raises(ValueError, match="net asset value"):
+    rebalance_trades(universe(), RebalancePolicy())
+
+
+def test_rebalance_universe() -> None:
+  weights = pd.Series({"AAA US Equity": 0.6, "CCC GR Equity": 0.4})
+  held = pd.Series([10.0, 7.0], index=pd.MultiIndex.from_tuples([("AAA", "USD"), ("CCC", "USD")]))
+  frame = rebalance_universe(weights, held, {"AAA US Equity": 10.0}, {"USD": 1.0, "EUR": 1.1}, {"CCC GR Equity": 5})
+  assert frame['Position'].to_list() == [10.0, 0.0]
+  assert frame['Rate'].to_list() == [1.0, 1.1]
+  assert frame['Lot'].to_list() == [1.0, 5.0]
+  assert np.isnan(frame['Price'].iloc[1])
+  # BBB has no target weight, only the positions that are not closed are reported.
+  held = pd.Series(
+    [10.0, 5.0, 0.0], index=pd.MultiIndex.from_tuples([("AAA", "USD"), ("BBB", "USD"), ("DDD", "USD")]))
+  assert untargeted(weights, held).to_dict() == {("BBB", "USD"): 5.0}
+
+  rows = rebalance_rows(rebalance_trades(universe(), RebalancePolicy(nav=1000.0)))
+  assert [(r.ticker, r.trade, r.country, r.ibk_type, r.currency, r.exchange) for r in rows] == [
+    ("AAA US Equity", 50, Country.US, SecType.STK, Currency.USD, Exchange.ISLAND),
+    ("BBB US Equity", 25, Country.US, SecType.STK, Currency.USD, Exchange.ISLAND),
+  ]
+
+
+def position(account: str, symbol: str, currency: str, quantity: float, expires_on: int) -> dict[str, object]:
+  contract = Contract()
+  contract.conId = 1
+  contract.symbol = symbol
+  contract.secType = "STK"
+  contract.currency = currency
+  return PositionRecord2.row_of(account, contract, quantity, 1.0, 0, expires_on)
+
+
+def test_app_rebalance(setup_db: Db) -> None:
+  expires_on = millis_epoch(datetime.datetime.now()) + 60000
+  with setup_db.for_work() as uow:
+    PositionRecordOps().replace([
+      position("DU0000001", "AAA", "USD", 100.0, expires_on),
+      position("DU0000002", "AAA", "USD", 300.0, expires_on),
+      position("DU0000001", "CCC", "EUR", 10.0, expires_on),
+      position("DU0000001", "DDD", "USD", 40.0, expires_on),
+    ])(uow)
+  underTest = CorvinoApp(
+    db=setup_db,
+    contract_repo=ContractRecordOps(),
+    dnc_repo=DeltaNeutralContractOps(),
+    movements_repo=MovementRecordOps(),
+    order_repo=OrderRecordOps(),
+    appFamily=1000,
+  )
+  weights = pd.Series({"AAA US Equity": 0.5, "BBB US Equity": 0.5, "CCC GR Equity": 0.0})
+  prices = {"AAA US Equity": 10.0, "BBB US Equity": 20.0, "CCC GR Equity": 50.0}
+  with setup_db.for_work() as uow:
+    trades, outside, errors = underTest.rebalance(weights, uow, prices, {"USD": 1.0, "EUR": 2.0}, allocation="DU0000001")
+  assert not errors
+  # 100 * 10 + 10 * 50 * 2 = 2000 held by the account, the snapshot is not requested from TWS.
+  assert trades['Trade'].to_list() == [0, 50, -10]
+  # DDD has no target weight, it is neither valued nor traded.
+  assert outside.to_dict() == {("DDD", "USD"): 40.0}
+
+
+def test_large_rebalance() -> None:
+  names = 5000
+  rnd = np.random.default_rng(7)
+  tickers = [f"S{idx:07d} US Equity" for idx in range(names)]
+  weights = pd.Series(rnd.dirichlet(np.ones(names)), index=tickers)
+  held = pd.Series(
+    rnd.integers(0, 1000, names).astype(float),
+    index=pd.MultiIndex.from_arrays([[t.split(" ")[0] for t in tickers], ["USD"] * names]))
+  prices = dict(zip(tickers, rnd.uniform(1.0, 500.0, names)))
+
+  start = time.perf_counter()
+  trades = rebalance_trades(rebalance_universe(weights, held, prices, {"USD": 1.0}), RebalancePolicy(min_notional=100.0))
+  rows = rebalance_rows(trades)
+  elapsed = time.perf_counter() - start
+  assert len(trades) == names and 0 < len(rows) <= names
+  assert elapsed < 1.0, f"Rebalancing {names} names took {elapsed:.3f}s"
@@ -0,0 +1,101 @@
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+from ibapi.commission_report import CommissionReport  # pyright: ignore
+from ibapi.common import UNSET_DOUBLE  # pyright: ignore
+from ibapi.contract import Contract  # pyright: ignore
+from ibapi.execution import Execution, ExecutionFilter  # pyright: ignore
+from sqlalchemy import Engine, create_engine
+
+from salduba.common.persistence.alchemy.db import Db
+from salduba.common.persistence.alchemy.repo import RecordBase
+from salduba.ib_tws_proxy.executions.execution_repo import CommissionRecordOps, ExecutionRecordOps
+from salduba.ib_tws_proxy.executions.executions_proxy import ExecutionsProxy, filter_time
+from salduba.util.logging import init_logging
+from salduba.util.tests import connected, findTestsRoot
+
+_maybeTr = findTestsRoot()
+_tr = _maybeTr if _maybeTr else "./"
+init_logging(Path(os.path.join(_tr, "resources/logging.yaml")))
+
+
+@pytest.fixture
+def setup_db() -> Db:
+  temp = tempfile.NamedTemporaryFile()
+  file_name = Path(temp.name)
+  temp.close()
+  engine: Engine = create_engine(f"sqlite:///{file_name.absolute()}")
+  RecordBase.metadata.create_all(engine)
+  return Db(engine)
+
+
+def execution(execId: str, orderRef: str, time: str = "20240301  15:30:00") -> tuple[Contract, Execution]:
+  contract = Contract()
+  contract.conId = 1000
+  contract.symbol = orderRef.split("::")[-1].split("#")[0]
+  contract.secType = "STK"
+  contract.currency = "USD"
+  ex = Execution()
+  ex.execId = execId
+  ex.time = time
+  ex.acctNumber = "DU0000000"
+  ex.exchange = "NYSE"
+  ex.side = "BOT"
+  ex.shares = 100.0
+  ex.price = 10.5
+  ex.cumQty = 100.0
+  ex.avgPrice = 10.5
+  ex.orderId = 7
+  ex.permId = 1007
+  ex.clientId = 100001
+  ex.orderRef = orderRef
+  return contract, ex
+
+
+def commission(execId: str, amount: float) -> CommissionReport:
+  report = CommissionReport()
+  report.execId = execId
+  report.commission = amount
+  report.currency = "USD"
+  report.realizedPNL = UNSET_DOUBLE
+  report.yield_ = UNSET_DOUBLE
+  return report
+
+
+def test_captures_batch_executions(setup_db: Db) -> None:
+  underTest = ExecutionsProxy(
+    setup_db, ExecutionFilter(), "localhost", 0, 100001,
+    orderRefPrefix="B1::", known={"e0"}, commission_wait=10.0, chunk=2
+  )
+  connected(underTest)
+  underTest.runCommands()
+  underTest.responseTracker.requestsComplete()
+
+  underTest.execDetails(1, *execution("e0", "B1::SYM0"))
+  underTest.execDetails(1, *execution("e1", "B1::SYM1"))
+  underTest.execDetails(1, *execution("e2", "B2::SYM2"))
+  underTest.execDetails(1, *execution("e3", "B1::SYM3#1/2", "20240301  15:31:00 US/Eastern"))
+  underTest.commissionReport(commission("e1", 1.0))
+  underTest.commissionReport(commission("e2", 2.0))
+  underTest.execDetailsEnd(1)
+  assert not underTest.done
+  # The last missing commission ends the session without waiting the rest of `commission_wait`.
+  underTest.commissionReport(commission("e3", 3.0))
+
+  assert underTest.done
+  assert (underTest.executions, underTest.commissions) == (2, 2)
+  repo = ExecutionRecordOps()
+  with setup_db.for_work() as uow:
+    stored = list(repo.for_batch("B1")(uow))
+    assert [e.exec_id for e in stored] == ["e1", "e3"]
+    assert stored[1].exec_time == "20240301 15:31:00 US/Eastern"
+    commissions = list(CommissionRecordOps().for_executions(["e1", "e3"])(uow))
+    assert sorted(c.commission for c in commissions) == [1.0, 3.0]
+    assert all(c.realized_pnl is None for c in commissions)
+
+    last = repo.last_exec_time()(uow)
+    assert last and filter_time(last) == "20240301 15:31:00"
+    assert repo.exec_ids_since(filter_time(last))(uow) == {"e3"}
+    assert repo.exec_ids_since("20240301 00:00:00", commissioned=True)(uow) == {"e1", "e3"}
@@ -0,0 +1,251 @@
+import datetime
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+from uuid import uuid4
+
+import numpy as np
+import numpy.typing as npt
+import pytest
+from ibapi.common import BarData  # pyright: ignore
+from ibapi.contract import Contract  # pyright: ignore
+from sqlalchemy import Engine, create_engine
+
+from salduba.common.persistence.alchemy.db import Db
+from salduba.common.persistence.alchemy.repo import RecordBase
+from salduba.corvino.persistence.movement_record import MovementRecordOps
+from salduba.corvino.services.app import CorvinoApp
+from salduba.ib_tws_proxy.contracts.contract_repo import ContractRecord2, ContractRecordOps, DeltaNeutralContractOps
+from salduba.ib_tws_proxy.domain.enumerations import Currency, Exchange, SecType
+from salduba.ib_tws_proxy.historical.bar_store import BarStore, bar_columns, chunks, duration_of
+from salduba.ib_tws_proxy.historical.historical_proxy import HistoricalBarsProxy, bar_time, end_date_time
+from salduba.ib_tws_proxy.operations import ErrorResponse
+from salduba.ib_tws_proxy.orders.OrderRepo import OrderRecordOps
+from salduba.util.logging import init_logging
+from salduba.util.tests import connected, findTestsRoot
+from salduba.util.time import millis_epoch
+
+_maybeTr = findTestsRoot()
+_tr = _maybeTr if _maybeTr else "./"
+init_logging(Path(os.path.join(_tr, "resources/logging.yaml")))
+
+_day = 86400
+
+
+@pytest.fixture
+def setup_db() -> Db:
+  temp = tempfile.NamedTemporaryFile()
+  file_name = Path(temp.name)
+  temp.close()
+  engine: Engine = create_engine(f"sqlite:///{file_name.absolute()}")
+  RecordBase.metadata.create_all(engine)
+  return Db(engine)
+
+
+def contract(conId: int) -> Contract:
+  c = Contract()
+  c.conId = conId
+  c.symbol = f"SYM{conId}"
+  c.secType = "STK"
+  c.currency = "USD"
+  c.exchange = "SMART"
+  return c
+
+
+def contractRecord(conId: int) -> ContractRecord2:
+  nowT = datetime.datetime.now()
+  return ContractRecord2(
+    rid=str(uuid4()),
+    at=millis_epoch(nowT),
+    expires_on=millis_epoch(nowT) + 10000,
+    con_id=conId,
+    symbol=f"SYM{conId}",
+    sec_type=SecType.STK,
+    strike=0.0,
+    lookup_exchange=Exchange.SMART,
+    exchange=Exchange.SMART,
+    primary_exchange=Exchange.NYSE,
+    currency=Currency.USD,
+    include_expired=False
+  )
+
+
+def bar(date: str, close: float) -> BarData:
+  b = BarData()
+  b.date = date
+  b.open, b.high, b.low, b.close = close, close, close, close
+  b.volume = 100
+  b.barCount = 10
+  b.average = close
+  return b
+
+
+def bars(times: list[int], close: float) -> npt.NDArray[np.float64]:
+  rs = np.zeros((len(bar_columns), len(times)))
+  rs[0] = times
+  rs[bar_columns.index('close')] = close
+  return rs
+
+
+def test_bar_store(tmp_path: Path) -> None:
+  store = BarStore(tmp_path)
+  assert store.read(1, "1 day").shape == (len(bar_columns), 0)
+  assert store.missing(1, "1 day", 0, 10 * _day) == [(0, 10 * _day)]
+
+  assert store.append(1, "1 day", bars([3 * _day, 1 * _day, 2 * _day], 10.0)) == 3
+  # The new bar of day 3 replaces the stored one.
+  assert store.append(1, "1 day", bars([3 * _day, 4 * _day], 20.0)) == 4
+  stored = store.read(1, "1 day")
+  assert isinstance(stored, np.memmap)
+  assert stored[0].tolist() == [_day, 2 * _day, 3 * _day, 4 * _day]
+  assert stored[bar_columns.index('close')].tolist() == [10.0, 10.0, 20.0, 20.0]
+  assert store.read(1, "1 day", 2 * _day, 4 * _day)[0].tolist() == [2 * _day, 3 * _day]
+  assert store.frame(1, "1 day")['close'].iloc[-1] == 20.0
+  assert store.path(1, "1 day") == tmp_path.joinpath("1day", "1.npy")
+
+  assert store.missing(1, "1 day", 0, 4 * _day + 3600) == [(0, _day)]
+  assert store.missing(1, "1 day", 2 * _day, 6 * _day) == [(4 * _day, 6 * _day)]
+  with pytest.raises(ValueError, match="Unsupported bar size"):
+    store.read(1, "2 days")
+
+
+def test_requests() -> None:
+  assert chunks(0, 3 * 7 * _day, "5 mins") == [(14 * _day, 21 * _day), (7 * _day, 14 * _day), (0, 7 * _day)]
+  assert chunks(_day, 400 * _day, "1 day") == [(35 * _day, 400 * _day), (_day, 35 * _day)]
+  assert duration_of(3600, "1 min") == "3600 S"
+  assert duration_of(3600, "1 day") == "1 D"
+  assert duration_of(7 * _day, "5 mins") == "7 D"
+  assert duration_of(400 * _day, "1 day") == "2 Y"
+  assert bar_time("20240301") == 1709251200
+  assert bar_time("1709285400") == 1709285400
+  assert end_date_time(1709285400) == "20240301 09:30:00 GMT" and end_date_time(None) == ""
+
+
+def test_historical_bars() -> None:
+  targets = [(contract(1), None, "2 D"), (contract(2), 1709251200, "1 D")]
+  underTest = HistoricalBarsProxy(targets, "1 day", "localhost", 0, 100001)
+  connected(underTest)
+  underTest.runCommands()
+  underTest.responseTracker.requestsComplete()
+  assert underTest.requested == {1: 0, 2: 1}
+
+  underTest.historicalData(1, bar("20240228", 10.0))
+  underTest.historicalData(1, bar("20240229", 11.0))
+  underTest.historicalDataEnd(1, "", "")
+  assert not underTest.done
+  underTest.error(2, 162, "Historical Market Data Service error message:HMDS query returned no data")
+
+  assert underTest.done
+  errors = underTest.responseTracker.errorResults()
+  assert errors and not errors['error']
+  assert underTest.bars[0][0].tolist() == [1709078400, 1709164800]
+  assert underTest.bars[0][bar_columns.index('close')].tolist() == [10.0, 11.0]
+  assert underTest.bars[1].shape == (len(bar_columns), 0)
+
+
+class _HistoricalInProcess(HistoricalBarsProxy):
+  """Reports a daily bar for each day of the span of each request, within `activate`."""
+  requests: list[tuple[int, Optional[int], str]] = []
+  now = 0
+
+  def activate(self) -> None:
+    connected(self)
+    self.runCommands()
+    self.responseTracker.requestsComplete()
+    for reqId, row in list(self.requested.items()):
+      target, end, duration = self.targets[row]
+      _HistoricalInProcess.requests.append((target.conId, end, duration))
+      self.respond(reqId, end, duration)
+
+  def respond(self, reqId: int, end: Optional[int], duration: str) -> None:
+    last = (end if end else self.now) // _day * _day
+    for day in range(int(duration.split(' ')[0])):
+      date = datetime.datetime.fromtimestamp(last - day * _day, datetime.timezone.utc)
+      self.historicalData(reqId, bar(date.strftime("%Y%m%d"), 10.0))
+    self.historicalDataEnd(reqId, "", "")
+
+  def wait_for_me(self) -> Optional[dict[str, list[ErrorResponse]]]:
+    return self.responseTracker.errorResults()
+
+
+def test_top_up_bars(setup_db: Db, tmp_path: Path) -> None:
+  with setup_db.for_work() as uow:
+    ContractRecordOps().insert([contractRecord(1), contractRecord(2)])(uow)
+  store = BarStore(tmp_path)
+  underTest = CorvinoApp(
+    db=setup_db,
+    contract_repo=ContractRecordOps(),
+    dnc_repo=DeltaNeutralContractOps(),
+    movements_repo=MovementRecordOps(),
+    order_repo=OrderRecordOps(),
+    appFamily=1000,
+    bar_store=store,
+  )
+  underTest.historical_proxy = _HistoricalInProcess
+  _HistoricalInProcess.requests = []
+  nowT = datetime.datetime.now()
+  _HistoricalInProcess.now = int(nowT.timestamp())
+
+  with setup_db.for_work() as uow:
+    counts, errors = underTest.top_up_bars(uow, "1 day", nowT - datetime.timedelta(days=5), {1})
+  assert not errors.get('error') and counts == {1: 5}
+  assert _HistoricalInProcess.requests == [(1, None, "5 D")]
+
+  # Only the days before the first stored bar are requested, the last one is up to date.
+  _HistoricalInProcess.requests = []
+  first, last = store.span(1, "1 day") or (0, 0)
+  since = nowT - datetime.timedelta(days=8)
+  with setup_db.for_work() as uow:
+    counts, _ = underTest.top_up_bars(uow, "1 day", since)
+  assert sorted(_HistoricalInProcess.requests, key=lambda r: r[0]) == [
+    (1, first, duration_of(first - int(since.timestamp()), "1 day")), (2, None, "8 D")
+  ]
+  assert store.span(1, "1 day") == (first - 3 * _day, last)
+
+
+def test_top_up_bars_failed_request(setup_db: Db, tmp_path: Path) -> None:
+  with setup_db.for_work() as uow:
+    ContractRecordOps().insert([contractRecord(1)])(uow)
+  store = BarStore(tmp_path)
+  underTest = CorvinoApp(
+    db=setup_db,
+    contract_repo=ContractRecordOps(),
+    dnc_repo=DeltaNeutralContractOps(),
+    movements_repo=MovementRecordOps(),
+    order_repo=OrderRecordOps(),
+    appFamily=1000,
+    bar_store=store,
+  )
+  nowT = datetime.datetime.now()
+  until = int(nowT.timestamp())
+  since = nowT - datetime.timedelta(days=3 * 365)
+
+  class _FailingInProcess(_HistoricalInProcess):
+    """Fails the request of the middle year of bars."""
+
+    def respond(self, reqId: int, end: Optional[int], duration: str) -> None:
+      if end == until - 365 * _day:
+        self.error(reqId, 366, "No historical data query found for ticker id")
+      else:
+        super().respond(reqId, end, duration)
+
+  underTest.historical_proxy = _FailingInProcess
+  _HistoricalInProcess.requests = []
+  _HistoricalInProcess.now = until
+  with setup_db.for_work() as uow:
+    counts, errors = underTest.top_up_bars(uow, "1 day", since)
+  assert len(_HistoricalInProcess.requests) == 3 and [e.errorCode for e in errors['error']] == [366]
+  # The oldest year is received but not stored, it would leave the failed year as a gap.
+  assert counts == {1: 365}
+  first, last = store.span(1, "1 day") or (0, 0)
+  assert last - first == 364 * _day
+
+  underTest.historical_proxy = _HistoricalInProcess
+  _HistoricalInProcess.requests = []
+  with setup_db.for_work() as uow:
+    underTest.top_up_bars(uow, "1 day", since)
+  # The years before the stored ones are requested again and stored without a gap.
+  assert _HistoricalInProcess.requests[0][1] == first
+  stored = store.read(1, "1 day")[0]
+  assert stored[0] <= int(since.timestamp()) + _day and np.all(np.diff(stored) == _day)
@@ -0,0 +1,272 @@
+import datetime
+import math
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from uuid import uuid4
+
+import pytest
+from ibapi.common import TickAttrib  # pyright: ignore
+from ibapi.contract import Contract  # pyright: ignore
+from ibapi.ticktype import TickTypeEnum  # pyright: ignore
+from sqlalchemy import Engine, create_engine
+
+from salduba.common.configuration import MarketDataConfig, RiskConfig, RiskMode
+from salduba.common.persistence.alchemy.db import Db
+from salduba.common.persistence.alchemy.repo import RecordBase
+from salduba.corvino.persistence.movement_record import MovementRecord2, MovementRecordOps, MovementStatus
+from salduba.corvino.services.app import CorvinoApp
+from salduba.ib_tws_proxy.contracts.contract_repo import ContractRecord2, ContractRecordOps, DeltaNeutralContractOps
+from salduba.ib_tws_proxy.domain.enumerations import Country, Currency, Exchange, SecType
+from salduba.ib_tws_proxy.market_data.price_repo import MarketPriceOps
+from salduba.ib_tws_proxy.market_data.price_table import PriceTable
+from salduba.ib_tws_proxy.market_data.snapshot_proxy import MarketSnapshotProxy
+from salduba.ib_tws_proxy.operations import ErrorResponse
+from salduba.ib_tws_proxy.orders.OrderRepo import OrderRecordOps
+from salduba.util.logging import init_logging
+from salduba.util.tests import connected, findTestsRoot
+from salduba.util.time import millis_epoch
+
+_maybeTr = findTestsRoot()
+_tr = _maybeTr if _maybeTr else "./"
+init_logging(Path(os.path.join(_tr, "resources/logging.yaml")))
+
+
+@pytest.fixture
+def setup_db() -> Db:
+  temp = tempfile.NamedTemporaryFile()
+  file_name = Path(temp.name)
+  temp.close()
+  engine: Engine = create_engine(f"sqlite:///{file_name.absolute()}")
+  RecordBase.metadata.create_all(engine)
+  return Db(engine)
+
+
+def contract(conId: int) -> Contract:
+  c = Contract()
+  c.conId = conId
+  c.symbol = f"SYM{conId}"
+  c.secType = "STK"
+  c.currency = "USD"
+  c.exchange = "SMART"
+  return c
+
+
+def contractRecord(conId: int) -> ContractRecord2:
+  nowT = datetime.datetime.now()
+  return ContractRecord2(
+    rid=str(uuid4()),
+    at=millis_epoch(nowT),
+    expires_on=millis_epoch(nowT) + 10000,
+    con_id=conId,
+    symbol=f"SYM{conId}",
+    sec_type=SecType.STK,
+    strike=0.0,
+    lookup_exchange=Exchange.SMART,
+    exchange=Exchange.SMART,
+    primary_exchange=Exchange.NYSE,
+    currency=Currency.USD,
+    include_expired=False
+  )
+
+
+def movementProbe(conId: int, trade: int) -> MovementRecord2:
+  nowT = datetime.datetime.now()
+  return MovementRecord2(
+    rid=str(uuid4()),
+    at=millis_epoch(nowT),
+    status=MovementStatus.NEW,
+    batch="TestBatch",
+    ticker=f"SYM{conId} US Equity",
+    trade=trade,
+    nombre=f"SYM{conId}",
+    symbol=f"SYM{conId}",
+    raw_type="Equity",
+    ibk_type=SecType.STK,
+    country=Country.US,
+    currency=Currency.USD,
+    exchange=Exchange.SMART,
+    exchange2=Exchange.NYSE,
+    contract=contractRecord(conId)
+  )
+
+
+def test_price_table() -> None:
+  table = PriceTable(["A", "B", "C", "D"], [1, 2, 3, 4])
+  table.set(0, 'last', 10.0, 1)
+  table.set(0, 'bid', 9.9, 1)
+  table.set(0, 'ask', 10.1, 1)
+  table.set(1, 'bid', 19.0, 1)
+  table.set(1, 'ask', 21.0, 1)
+  table.set(2, 'close', 30.0, 1)
+  assert table.prices() == {"A": 10.0, "B": 20.0, "C": 30.0}
+  # Buys round up and sells down: 10.1 * 1.001 = 10.1101, 19.0 * 0.999 = 18.981 and 30.0 * 1.001 = 30.03.
+  assert table.limit_prices({"A": 10, "B": -5, "C": 1, "D": 7}, offset_bps=10) == {"A": 10.12, "B": 18.98, "C": 30.03}
+
+  # Sub-cent quotes are not rounded inside the spread, nor are whole cents moved by a tick.
+  quotes = PriceTable(["A", "B", "C"], [1, 2, 3])
+  for row, (bid, ask) in enumerate([(9.995, 10.005), (9.995, 10.005), (10.1, 10.2)]):
+    quotes.set(row, 'bid', bid, 1)
+    quotes.set(row, 'ask', ask, 1)
+  assert quotes.limit_prices({"A": 10, "B": -10, "C": 10}) == {"A": 10.01, "B": 9.99, "C": 10.2}
+  assert quotes.limit_prices({"C": -10}) == {"C": 10.1}
+
+  other = PriceTable(["D", "E"], [4, 5])
+  other.set(0, 'last', 40.0, 2)
+  table.update(other)
+  assert table.prices()["D"] == 40.0 and table.at.tolist() == [1, 1, 1, 2]
+
+
+def test_snapshot() -> None:
+  underTest = MarketSnapshotProxy([("A", contract(1)), ("B", contract(2))], "localhost", 0, 100001, market_data_type=3)
+  connected(underTest)
+  underTest.runCommands()
+  underTest.responseTracker.requestsComplete()
+  assert underTest.requested == {1: 0, 2: 1}
+
+  underTest.tickPrice(1, TickTypeEnum.DELAYED_BID, 9.5, TickAttrib())
+  underTest.tickPrice(1, TickTypeEnum.DELAYED_ASK, 10.5, TickAttrib())
+  # Prices that are not available come as -1.
+  underTest.tickPrice(1, TickTypeEnum.DELAYED_LAST, -1.0, TickAttrib())
+  underTest.tickSnapshotEnd(1)
+  assert not underTest.done
+  underTest.error(2, 10167, "Displaying delayed market data")
+  underTest.tickPrice(2, TickTypeEnum.CLOSE, 20.0, TickAttrib())
+  underTest.tickSnapshotEnd(2)
+
+  assert underTest.done
+  errors = underTest.responseTracker.errorResults()
+  assert errors and not errors['error']
+  assert underTest.table.prices() == {"A": 10.0, "B": 20.0}
+  assert math.isnan(underTest.table.last[0])
+
+
+def test_snapshot_lines() -> None:
+  targets = [(f"S{idx}", contract(idx)) for idx in range(1, 6)]
+  underTest = MarketSnapshotProxy(targets, "localhost", 0, 100001, max_lines=2, rate=50.0)
+  connected(underTest)
+  requesting = threading.Thread(target=underTest.runCommands)
+  requesting.start()
+  time.sleep(0.2)
+  # No more than 2 snapshots open at once, the next one waits for one of them to end.
+  assert len(underTest.requested) == 2
+  underTest.tickSnapshotEnd(1)
+  underTest.error(2, 200, "No security definition has been found for the request")
+  time.sleep(0.2)
+  assert len(underTest.requested) == 4
+  for reqId in [3, 4]:
+    underTest.tickSnapshotEnd(reqId)
+  requesting.join(timeout=5.0)
+  underTest.responseTracker.requestsComplete()
+  underTest.tickSnapshotEnd(5)
+
+  assert not requesting.is_alive() and underTest.done
+  errors = underTest.responseTracker.errorResults()
+  assert errors and [e.errorCode for e in errors['error']] == [200]
+
+
+class _SnapshotInProcess(MarketSnapshotProxy):
+  """Reports the `reported` last prices by conId, within `activate`."""
+  reported: dict[int, float] = {}
+  requests: list[list[str]] = []
+
+  def activate(self) -> None:
+    _SnapshotInProcess.requests.append([k for k, _ in self.targets])
+    connected(self)
+    self.runCommands()
+    self.responseTracker.requestsComplete()
+    for reqId, row in list(self.requested.items()):
+      price = self.reported.get(self.targets[row][1].conId)
+      if price:
+        self.tickPrice(reqId, TickTypeEnum.LAST, price, TickAttrib())
+      self.tickSnapshotEnd(reqId)
+
+  def wait_for_me(self) -> Optional[dict[str, list[ErrorResponse]]]:
+    return self.responseTracker.errorResults()
+
+
+def test_market_prices(setup_db: Db) -> None:
+  underTest = CorvinoApp(
+    db=setup_db,
+    contract_repo=ContractRecordOps(),
+    dnc_repo=DeltaNeutralContractOps(),
+    movements_repo=MovementRecordOps(),
+    order_repo=OrderRecordOps(),
+    appFamily=1000,
+    price_repo=MarketPriceOps(),
+    market_data=MarketDataConfig(staleness=60),
+  )
+  underTest.snapshot_proxy = _SnapshotInProcess
+  _SnapshotInProcess.reported = {1: 10.0, 2: 20.0}
+  _SnapshotInProcess.requests = []
+  contracts = {"A": contractRecord(1), "B": contractRecord(2)}
+
+  with setup_db.for_work() as uow:
+    table, errors = underTest.market_prices(contracts, uow)
+  assert not errors.get('error') and table.prices() == {"A": 10.0, "B": 20.0}
+
+  # Only the contracts without a fresh price are requested again.
+  _SnapshotInProcess.reported = {1: 11.0, 2: 21.0, 3: 31.0}
+  with setup_db.for_work() as uow:
+    table, _ = underTest.market_prices({**contracts, "C": contractRecord(3)}, uow)
+  assert table.prices() == {"A": 10.0, "B": 20.0, "C": 31.0}
+  assert _SnapshotInProcess.requests == [["A", "B"], ["C"]]
+
+  with setup_db.for_work() as uow:
+    table, _ = underTest.market_prices(contracts, uow, refresh=True)
+    assert table.prices() == {"A": 11.0, "B": 21.0}
+    assert len(list(MarketPriceOps().fresh([1, 2, 3], 0)(uow))) == 3
+
+  underTest.market_data = MarketDataConfig(staleness=0)
+  with setup_db.for_work() as uow:
+    time.sleep(0.01)
+    underTest.market_prices({"C": contractRecord(3)}, uow)
+  assert _SnapshotInProcess.requests[-1] == ["C"]
+
+
+class _FailingSnapshotInProcess(_SnapshotInProcess):
+  """Fails the snapshots of the contracts without a `reported` price, within `activate`."""
+
+  def activate(self) -> None:
+    connected(self)
+    self.runCommands()
+    self.responseTracker.requestsComplete()
+    for reqId, row in list(self.requested.items()):
+      price = self.reported.get(self.targets[row][1].conId)
+      if price:
+        self.tickPrice(reqId, TickTypeEnum.LAST, price, TickAttrib())
+        self.tickSnapshotEnd(reqId)
+      else:
+        self.error(reqId, 200, "No security definition has been found for the request")
+
+
+def test_pre_trade_snapshot_errors(setup_db: Db) -> None:
+  underTest = CorvinoApp(
+    db=setup_db,
+    contract_repo=ContractRecordOps(),
+    dnc_repo=DeltaNeutralContractOps(),
+    movements_repo=MovementRecordOps(),
+    order_repo=OrderRecordOps(),
+    appFamily=1000,
+    price_repo=MarketPriceOps(),
+    market_data=MarketDataConfig(staleness=60),
+  )
+  underTest.snapshot_proxy = _FailingSnapshotInProcess
+  _FailingSnapshotInProcess.reported = {1: 10.0}
+  movements = [movementProbe(1, 100), movementProbe(2, 50)]
+
+  with setup_db.for_work() as uow:
+    check, errors = underTest._pre_trade_check(movements, uow, RiskConfig(max_order_notional=5000.0), None)
+  assert [e.errorCode for e in errors['error']] == [200]
+  assert check.blocked
+  assert check.message == "Pre-trade checks blocked the batch with Errors[1] taking a snapshot of the market prices"
+
+  # Only flagged, the errors of the snapshot are reported with the names it could not price.
+  with setup_db.for_work() as uow:
+    check, errors = underTest._pre_trade_check(
+      movements, uow, RiskConfig(mode=RiskMode.FLAG, max_order_notional=5000.0), None)
+  assert [e.errorCode for e in errors['error']] == [200]
+  assert not check.blocked and [(v.check, v.key) for v in check.violations] == [("price", "SYM2 US Equity")]
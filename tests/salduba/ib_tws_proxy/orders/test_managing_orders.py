@@ -0,0 +1,183 @@
+import datetime
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Optional
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import Engine, create_engine
+
+from salduba.common.persistence.alchemy.db import Db
+from salduba.common.persistence.alchemy.repo import RecordBase
+from salduba.corvino.persistence.movement_record import MovementRecord2, MovementRecordOps, MovementStatus
+from salduba.corvino.services.app import CorvinoApp
+from salduba.ib_tws_proxy.contracts.contract_repo import ContractRecord2, ContractRecordOps, DeltaNeutralContractOps
+from salduba.ib_tws_proxy.domain.enumerations import Country, Currency, Exchange, IbOrderStatus, OrderType, SecType
+from salduba.ib_tws_proxy.operations import ErrorResponse
+from salduba.ib_tws_proxy.orders.managing_orders import CancelOrders, ModifyOrders, OrderChange, open_orders_of
+from salduba.ib_tws_proxy.orders.OrderRepo import OrderRecordOps, OrderStatusOps, newOrderRecord
+from salduba.ib_tws_proxy.orders.slicing import SlicingPolicy, slice_order
+from salduba.util.logging import init_logging
+from salduba.util.tests import StubConnection, connected, findTestsRoot
+from salduba.util.time import millis_epoch
+
+_maybeTr = findTestsRoot()
+_tr = _maybeTr if _maybeTr else "./"
+init_logging(Path(os.path.join(_tr, "resources/logging.yaml")))
+
+
+@pytest.fixture
+def setup_db() -> Db:
+  temp = tempfile.NamedTemporaryFile()
+  file_name = Path(temp.name)
+  temp.close()
+  engine: Engine = create_engine(f"sqlite:///{file_name.absolute()}")
+  RecordBase.metadata.create_all(engine)
+  return Db(engine)
+
+
+def movementProbe(seed: int, orderId: int, status: IbOrderStatus = IbOrderStatus.PRE_SUBMITTED) -> MovementRecord2:
+  nowT = datetime.datetime.now()
+  order = newOrderRecord(100 * seed, seed, nowT, "allocation", f"TestBatch::SYM{seed}", False, orderId)
+  order.order_status.status = status
+  return MovementRecord2(
+    rid=str(uuid4()),
+    at=millis_epoch(nowT),
+    status=MovementStatus.CONFIRMED,
+    batch="TestBatch",
+    ticker=f"SYM{seed} US Equity",
+    trade=100 * seed,
+    nombre=f"SYM{seed}",
+    symbol=f"SYM{seed}",
+    raw_type="Equity",
+    ibk_type=SecType.STK,
+    country=Country.US,
+    currency=Currency.USD,
+    exchange=Exchange.SMART,
+    exchange2=Exchange.NYSE,
+    contract=ContractRecord2(
+      rid=str(uuid4()),
+      at=millis_epoch(nowT),
+      expires_on=millis_epoch(nowT) + 10000,
+      con_id=seed,
+      symbol=f"SYM{seed}",
+      sec_type=SecType.STK,
+      lookup_exchange=Exchange.SMART,
+      exchange=Exchange.SMART,
+      primary_exchange=Exchange.NYSE,
+      currency=Currency.USD,
+      include_expired=False
+    ),
+    order=order
+  )
+
+
+def save(db: Db, movements: list[MovementRecord2]) -> None:
+  with db.for_work() as uow:
+    ContractRecordOps().insert([m.contract for m in movements])(uow)
+    OrderRecordOps().insert([m.order for m in movements])(uow)
+    MovementRecordOps().insert(movements)(uow)
+
+
+def test_open_orders_of() -> None:
+  assert open_orders_of(movementProbe(1, 101))
+  assert not open_orders_of(movementProbe(2, 102, IbOrderStatus.FILLED))
+  assert not open_orders_of(movementProbe(3, 0))
+
+
+def test_cancel_orders(setup_db: Db) -> None:
+  save(setup_db, [movementProbe(1, 101), movementProbe(2, 102), movementProbe(3, 103)])
+  with setup_db.for_work() as uow:
+    targets = [OrderChange.of(m, m.order) for m in MovementRecordOps().find_for_batch("TestBatch")(uow)]
+    underTest = connected(CancelOrders(setup_db, targets, "localhost", 0, 100001, rate=50.0))
+    underTest.statusWriter.start()
+
+    underTest.runCommands()
+    underTest.responseTracker.requestsComplete()
+    assert sorted(underTest.responseTracker.pending.keys()) == [101, 102, 103]
+    assert isinstance(underTest.conn, StubConnection) and underTest.conn.sent == 3
+
+    underTest.orderStatus(101, "Cancelled", 0.0, 100.0, 0.0, 1101, 0, 0.0, 100001, "", 0.0)
+    underTest.error(102, 202, "Order Canceled - reason:")
+    underTest.error(103, 10148, "OrderId 103 that needs to be cancelled cannot be cancelled, state: Filled.")
+    # A late acknowledgement of a cancellation already confirmed is ignored.
+    underTest.error(101, 202, "Order Canceled - reason:")
+
+  assert underTest.done
+  assert sorted(c.orderId for c in underTest.confirmed) == [101, 102]
+  errors: dict[str, list[ErrorResponse]] = underTest.responseTracker.errorResults()
+  assert [e.opId for e in errors["error"]] == [103]
+  with setup_db.for_work() as uow:
+    assert next(iter(OrderStatusOps().for_order(101)(uow))).status == IbOrderStatus.CANCELED
+    statuses = {m.symbol: m.status for m in MovementRecordOps().find_for_batch("TestBatch")(uow)}
+    assert statuses["SYM1"] == MovementStatus.CANCELLED
+
+
+def test_cancel_sliced_order(setup_db: Db) -> None:
+  movement = movementProbe(10, 0)
+  children = slice_order(movement.order, SlicingPolicy(slices=2), datetime.datetime.now())
+  for child, orderId, status, filled in zip(children, [201, 202], [IbOrderStatus.FILLED, IbOrderStatus.SUBMITTED], [500.0, 0.0]):
+    child.orderId = orderId
+    child.order_status.status = status
+    child.order_status.filled = filled
+  save(setup_db, [movement])
+  with setup_db.for_work() as uow:
+    m = next(iter(MovementRecordOps().find_for_batch("TestBatch")(uow)))
+    targets = [OrderChange.of(m, o) for o in open_orders_of(m)]
+    assert [t.orderId for t in targets] == [202]
+    underTest = connected(CancelOrders(setup_db, targets, "localhost", 0, 100001, rate=50.0))
+    underTest.statusWriter.start()
+    underTest.runCommands()
+    underTest.responseTracker.requestsComplete()
+
+    # The movement follows the aggregate of its children, not the status of the one changed.
+    underTest.orderStatus(202, "Submitted", 0.0, 500.0, 0.0, 1202, 0, 0.0, 100001, "", 0.0)
+    assert m.status == MovementStatus.IN_PROGRESS
+    underTest.orderStatus(202, "Cancelled", 0.0, 500.0, 0.0, 1202, 0, 0.0, 100001, "", 0.0)
+
+  assert underTest.done
+  with setup_db.for_work() as uow:
+    resumed = next(iter(MovementRecordOps().find_for_batch("TestBatch")(uow)))
+    assert resumed.status == MovementStatus.CANCELLED
+    parent = resumed.order.order_status
+    assert (parent.status, parent.filled, parent.remaining) == (IbOrderStatus.CANCELED, 500.0, 500.0)
+
+
+class _ModifyInProcess(ModifyOrders):
+  """Confirms every modification as TWS would, within `activate`."""
+
+  def activate(self) -> None:
+    connected(self)
+    self.statusWriter.start()
+    self.runCommands()
+    self.responseTracker.requestsComplete()
+    for t in self.targets:
+      self.openOrder(t.orderId, t.contract, t.ibOrder, None)
+
+  def wait_for_me(self) -> Optional[dict[str, list[ErrorResponse]]]:
+    return self.responseTracker.errorResults()
+
+
+def test_modify_batch(setup_db: Db) -> None:
+  movements = [movementProbe(1, 101), movementProbe(2, 102), movementProbe(3, 103, IbOrderStatus.FILLED)]
+  save(setup_db, movements)
+  underTest = CorvinoApp(
+    db=setup_db,
+    contract_repo=ContractRecordOps(),
+    dnc_repo=DeltaNeutralContractOps(),
+    movements_repo=MovementRecordOps(),
+    order_repo=OrderRecordOps(),
+    appFamily=1000,
+  )
+  underTest.modify_proxy = _ModifyInProcess
+  prices: dict[str, Any] = {"SYM1 US Equity": 10.5, "SYM3 US Equity": 30.0}
+
+  with setup_db.for_work() as uow:
+    rs = underTest.modify_batch("TestBatch", uow, limit_prices=prices)
+    assert rs.message == "1 of 1 open Orders Modified in batch: TestBatch"
+  with setup_db.for_work() as uow:
+    orders = {m.symbol: m.order for m in MovementRecordOps().find_for_batch("TestBatch")(uow)}
+    assert orders["SYM1"].orderType == OrderType.LMT and orders["SYM1"].lmtPrice == 10.5
+    assert orders["SYM2"].orderType == OrderType.MKT
+    assert orders["SYM3"].lmtPrice is None
@@ -1,11 +1,17 @@
+import logging
+import time
 from datetime import datetime
 from typing import Set, Tuple
 
+import pytest
 from ibapi.order import Order  # pyright: ignore
 from sqlalchemy import inspect
 
+from salduba.ib_tws_proxy.domain.enumerations import AlgoStrategy
 from salduba.ib_tws_proxy.orders.OrderRepo import OrderRecord2, newOrderRecord
 
+_logger = logging.getLogger(__name__)
+
 probe = {
   # "eTradeOnly": False,
   # "firmQuoteOnly": False,
@@ -195,3 +201,32 @@ def test_from_order() -> None:
     from_order[f] = getattr(order, f)
     from_probe[f] = getattr(recovered, f)
   assert from_order == from_probe
+
+
+def test_to_order_algo_params_not_shared() -> None:
+  first = OrderRecord2(**probe).toOrder()
+  second = OrderRecord2(**probe).toOrder()
+  assert first.algoStrategy == AlgoStrategy.ADAPTIVE
+  assert [(tv.tag, tv.value) for tv in first.algoParams] == [("adaptivePriority", "Patient")]
+  first.algoParams.clear()
+  assert len(second.algoParams) == 1
+
+
+@pytest.mark.benchmark
+def test_conversion_micro_benchmark() -> None:
+  conversions = 100_000
+  record = newOrderRecord(22, 222, datetime.now(), "allocation", "orderRef", False, 33333)
+  start = time.perf_counter()
+  for _ in range(conversions):
+    record.toOrder()
+  to_order_elapsed = time.perf_counter() - start
+  order = record.toOrder()
+  start = time.perf_counter()
+  for _ in range(conversions):
+    OrderRecord2.newFromOrder("RID", 1111, order)
+  from_order_elapsed = time.perf_counter() - start
+  _logger.info(f"toOrder: {1e6 * to_order_elapsed / conversions:.2f} usec/conversion over {conversions}")
+  _logger.info(f"newFromOrder: {1e6 * from_order_elapsed / conversions:.2f} usec/conversion over {conversions}")
+  # Generous bounds, only meant to catch a regression to per-call mapper inspection.
+  assert to_order_elapsed / conversions < 100e-6
+  assert from_order_elapsed / conversions < 500e-6
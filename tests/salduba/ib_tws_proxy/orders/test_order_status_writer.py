@@ -0,0 +1,153 @@
+import datetime
+import logging
+import os
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+from typing import Callable, Optional
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import Engine, create_engine
+
+from salduba.common.persistence.alchemy.db import Db
+from salduba.common.persistence.alchemy.repo import RecordBase
+from salduba.corvino.persistence.movement_record import MovementRecord2, MovementRecordOps, MovementStatus
+from salduba.ib_tws_proxy.contracts.contract_repo import ContractRecord2, ContractRecordOps
+from salduba.ib_tws_proxy.domain.enumerations import Country, Currency, Exchange, IbOrderStatus, SecType
+from salduba.ib_tws_proxy.orders.order_status_writer import OrderStatusResponse, OrderStatusWriter, StatusEvent
+from salduba.ib_tws_proxy.orders.OrderRepo import OrderRecord2, OrderRecordOps, OrderStatusOps, newOrderRecord
+from salduba.util.logging import init_logging
+from salduba.util.tests import findTestsRoot
+from salduba.util.time import millis_epoch
+
+_maybeTr = findTestsRoot()
+_tr = _maybeTr if _maybeTr else "./"
+init_logging(Path(os.path.join(_tr, "resources/logging.yaml")))
+_logger = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def setup_db() -> Db:
+  temp = tempfile.NamedTemporaryFile()
+  file_name = Path(temp.name)
+  temp.close()
+  engine: Engine = create_engine(f"sqlite:///{file_name.absolute()}")
+  RecordBase.metadata.create_all(engine)
+  return Db(engine)
+
+
+def movementProbe(seed: int, orderId: int) -> MovementRecord2:
+  nowT = datetime.datetime.now()
+  contract = ContractRecord2(
+    rid=str(uuid4()),
+    at=millis_epoch(nowT),
+    expires_on=millis_epoch(nowT) + 10000,
+    con_id=seed,
+    symbol=f"SYM{seed}",
+    sec_type=SecType.STK,
+    lookup_exchange=Exchange.SMART,
+    exchange=Exchange.SMART,
+    primary_exchange=Exchange.NYSE,
+    currency=Currency.USD,
+    include_expired=False
+  )
+  return MovementRecord2(
+    rid=str(uuid4()),
+    at=millis_epoch(nowT),
+    status=MovementStatus.NEW,
+    batch="TestBatch",
+    ticker=f"SYM{seed} US Equity",
+    trade=100 * seed,
+    nombre=f"SYM{seed}",
+    symbol=f"SYM{seed}",
+    raw_type="Equity",
+    ibk_type=SecType.STK,
+    country=Country.US,
+    currency=Currency.USD,
+    exchange=Exchange.SMART,
+    exchange2=Exchange.NYSE,
+    contract=contract,
+    order=newOrderRecord(100 * seed, seed, nowT, "allocation", f"TestBatch::SYM{seed}", False, orderId)
+  )
+
+
+def statusProbe(orderId: int, status: str, filled: int, remaining: int) -> OrderStatusResponse:
+  return OrderStatusResponse(
+    orderId, status, Decimal(filled), Decimal(remaining), 10.5, 1000 + orderId, 0, 10.25, 7, "", 0.0
+  )
+
+
+def save(db: Db, movements: dict[int, MovementRecord2]) -> None:
+  with db.for_work() as uow:
+    ContractRecordOps().insert([m.contract for m in movements.values()])(uow)
+    OrderRecordOps().insert([m.order for m in movements.values()])(uow)
+    MovementRecordOps().insert(movements.values())(uow)
+
+
+def orders_of(movements: dict[int, MovementRecord2]) -> Callable[[int], Optional[OrderRecord2]]:
+  return lambda orderId: movements[orderId].order if orderId in movements else None
+
+
+def test_coalesces_and_persists(setup_db: Db) -> None:
+  movements = {100 + i: movementProbe(i, 100 + i) for i in range(1, 4)}
+  save(setup_db, movements)
+
+  underTest = OrderStatusWriter(setup_db, orders_of(movements), flush_interval=60.0)
+  underTest.start()
+  underTest.offer(statusProbe(101, "PreSubmitted", 0, 100))
+  underTest.offer(statusProbe(101, "Submitted", 40, 60))
+  underTest.offer(statusProbe(102, "Filled", 200, 0))
+  underTest.offer(statusProbe(999, "Filled", 1, 0))
+  movements[101].status = MovementStatus.SUBMITTED
+  underTest.offer_transition(movements[101])
+  movements[101].status = MovementStatus.CONFIRMED
+  underTest.offer_transition(movements[101])
+  movements[102].status = MovementStatus.COMPLETED
+  underTest.offer_transition(movements[102])
+  # Closing flushes what is pending even though the flush window has not elapsed.
+  underTest.close()
+
+  with setup_db.for_work() as uow:
+    first = list(OrderStatusOps().for_order(101)(uow))
+    assert len(first) == 1
+    assert first[0].status == IbOrderStatus.SUBMITTED
+    assert first[0].filled == 40.0 and first[0].remaining == 60.0
+    assert first[0].avg_fill_price == 10.5
+    assert first[0].perm_id == 1101
+    second = list(OrderStatusOps().for_order(102)(uow))
+    assert second[0].status == IbOrderStatus.FILLED
+    untouched = list(OrderStatusOps().for_order(103)(uow))
+    assert untouched[0].status == IbOrderStatus.NEW
+    assert not list(OrderStatusOps().for_order(999)(uow))
+
+    statuses: dict[str, Optional[MovementStatus]] = \
+      {m.symbol: m.status for m in MovementRecordOps().find_for_batch("TestBatch")(uow)}
+    assert statuses == {
+      "SYM1": MovementStatus.CONFIRMED,
+      "SYM2": MovementStatus.COMPLETED,
+      "SYM3": MovementStatus.NEW
+    }
+
+
+def test_flushes_on_window(setup_db: Db) -> None:
+  movements = {201: movementProbe(1, 201)}
+  save(setup_db, movements)
+
+  flushed: list[int] = []
+
+  class Probe(OrderStatusWriter):
+    def flush(self, events: list[StatusEvent]) -> None:
+      super().flush(events)
+      flushed.append(len(events))
+
+  underTest = Probe(setup_db, orders_of(movements), flush_interval=0.01)
+  underTest.start()
+  underTest.offer(statusProbe(201, "Submitted", 0, 100))
+  for _ in range(500):
+    if flushed:
+      break
+    underTest._writer.join(0.01)
+  assert flushed == [1]
+  underTest.close()
+  assert flushed == [1]
@@ -0,0 +1,131 @@
+import datetime
+import os
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+from ibapi.common import UNSET_DOUBLE  # pyright: ignore
+from ibapi.order_state import OrderState  # pyright: ignore
+
+from salduba.corvino.persistence.movement_record import MovementRecord2, MovementStatus
+from salduba.ib_tws_proxy.base_proxy.pacing import Pacer
+from salduba.ib_tws_proxy.contracts.contract_repo import ContractRecord2
+from salduba.ib_tws_proxy.domain.enumerations import Country, Currency, Exchange, SecType
+from salduba.ib_tws_proxy.orders.OrderRepo import newOrderRecord
+from salduba.ib_tws_proxy.orders.previewing_orders import OrderPreview, PreviewOrders, all_currencies, amount, summarize
+from salduba.util.logging import init_logging
+from salduba.util.tests import connected, findTestsRoot
+from salduba.util.time import millis_epoch
+
+_maybeTr = findTestsRoot()
+_tr = _maybeTr if _maybeTr else "./"
+init_logging(Path(os.path.join(_tr, "resources/logging.yaml")))
+
+
+def movementProbe(seed: int, currency: Currency = Currency.USD) -> MovementRecord2:
+  nowT = datetime.datetime.now()
+  return MovementRecord2(
+    rid=str(uuid4()),
+    at=millis_epoch(nowT),
+    status=MovementStatus.NEW,
+    batch="TestBatch",
+    ticker=f"SYM{seed} US Equity",
+    trade=100 * seed,
+    nombre=f"SYM{seed}",
+    symbol=f"SYM{seed}",
+    raw_type="Equity",
+    ibk_type=SecType.STK,
+    country=Country.US,
+    currency=currency,
+    exchange=Exchange.SMART,
+    exchange2=Exchange.NYSE,
+    contract=ContractRecord2(
+      rid=str(uuid4()),
+      at=millis_epoch(nowT),
+      expires_on=millis_epoch(nowT) + 10000,
+      con_id=seed,
+      strike=0.0,
+      symbol=f"SYM{seed}",
+      sec_type=SecType.STK,
+      lookup_exchange=Exchange.SMART,
+      exchange=Exchange.SMART,
+      primary_exchange=Exchange.NYSE,
+      currency=currency,
+      include_expired=False
+    ),
+    order=newOrderRecord(100 * seed, seed, nowT, "allocation", f"TestBatch::SYM{seed}", False, 0)
+  )
+
+
+def orderState(initChange: float, commission: float, commissionCurrency: str = "USD") -> OrderState:
+  state = OrderState()
+  state.initMarginBefore = "1000.0"
+  state.equityWithLoanBefore = "5000.0"
+  state.initMarginChange = str(initChange)
+  state.maintMarginChange = str(initChange / 2)
+  state.equityWithLoanChange = "-1.0"
+  state.commission = commission
+  state.commissionCurrency = commissionCurrency
+  return state
+
+
+def preview(orderId: int, currency: str, initChange: float, commission: float, commissionCurrency: str) -> OrderPreview:
+  movement = movementProbe(orderId)
+  p = OrderPreview.of(orderId, movement, movement.order.toOrder(), orderState(initChange, commission, commissionCurrency))
+  p.currency = currency
+  return p
+
+
+def test_pacer_limits() -> None:
+  with pytest.raises(ValueError):
+    Pacer(0.0)
+  with pytest.raises(ValueError):
+    Pacer(51.0)
+  Pacer(50.0).wait()
+
+
+def test_amount() -> None:
+  assert amount("1234.5") == 1234.5
+  assert amount("") is None
+  assert amount(str(UNSET_DOUBLE)) is None
+  assert amount(UNSET_DOUBLE) is None
+
+
+def test_summarize() -> None:
+  summaries = summarize([
+    preview(1, "USD", 100.0, 1.0, "USD"),
+    preview(2, "USD", 200.0, 2.0, "USD"),
+    preview(3, "EUR", 50.0, 1.5, "EUR"),
+  ])
+  assert [s.currency for s in summaries] == ["EUR", "USD", all_currencies]
+  eur, usd, overall = summaries
+  assert (usd.orders, usd.init_margin_change, usd.commission) == (2, 300.0, 3.0)
+  assert (eur.orders, eur.init_margin_change, eur.commission) == (1, 50.0, 1.5)
+  assert overall.orders == 3 and overall.init_margin_change == 350.0
+  # Commissions in USD and EUR do not add up.
+  assert overall.commission is None
+  assert usd.projected_excess is None
+  assert overall.projected_excess == (5000.0 - 3.0) - (1000.0 + 350.0)
+  assert [(s.currency, s.orders, s.projected_excess) for s in summarize([])] == [(all_currencies, 0, None)]
+
+
+def test_preview_orders() -> None:
+  movements = [movementProbe(1), movementProbe(2), movementProbe(3, Currency.EUR)]
+  underTest = PreviewOrders(movements, "localhost", 0, 100001, rate=50.0)
+  connected(underTest)
+
+  underTest.runCommands()
+  underTest.responseTracker.requestsComplete()
+  assert sorted(underTest.requested.keys()) == [1, 2, 3]
+  assert all(order.whatIf and order.transmit for _, order in underTest.requested.values())
+
+  for oid, (movement, order) in list(underTest.requested.items()):
+    underTest.openOrder(oid, movement.contract.to_contract(), order, orderState(10.0 * oid, 1.0))
+  # A repeated response is ignored.
+  underTest.openOrder(1, movements[0].contract.to_contract(), underTest.requested[1][1], orderState(10.0, 1.0))
+
+  assert underTest.done
+  assert [p.symbol for p in underTest.previews] == ["SYM1", "SYM2", "SYM3"]
+  margins = summarize(underTest.previews)
+  assert [m.currency for m in margins] == ["EUR", "USD", all_currencies]
+  assert margins[-1].init_margin_change == 60.0
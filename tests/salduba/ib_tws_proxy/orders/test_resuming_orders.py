@@ -0,0 +1,285 @@
+import datetime
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+from uuid import uuid4
+
+import pytest
+from ibapi.contract import Contract  # pyright: ignore
+from ibapi.order import Order  # pyright: ignore
+from ibapi.order_state import OrderState  # pyright: ignore
+from sqlalchemy import Engine, create_engine
+
+from salduba.common.persistence.alchemy.db import Db
+from salduba.common.persistence.alchemy.repo import RecordBase
+from salduba.corvino.persistence.movement_record import MovementRecord2, MovementRecordOps, MovementStatus
+from salduba.corvino.services.app import CorvinoApp
+from salduba.ib_tws_proxy.contracts.contract_repo import ContractRecord2, ContractRecordOps, DeltaNeutralContractOps
+from salduba.ib_tws_proxy.domain.enumerations import Country, Currency, Exchange, IbOrderStatus, SecType
+from salduba.ib_tws_proxy.operations import ErrorResponse
+from salduba.ib_tws_proxy.orders.OrderRepo import OrderRecordOps, newOrderRecord
+from salduba.ib_tws_proxy.orders.placement_journal import PlacementIntentOps, PlacementJournal
+from salduba.ib_tws_proxy.orders.placing_orders import OpenOrderResponse, PlaceOrders
+from salduba.ib_tws_proxy.orders.reconciling_orders import KnownOrders
+from salduba.ib_tws_proxy.orders.slicing import SlicingPolicy, slice_order
+from salduba.util.logging import init_logging
+from salduba.util.tests import connected, findTestsRoot
+from salduba.util.time import millis_epoch
+
+_maybeTr = findTestsRoot()
+_tr = _maybeTr if _maybeTr else "./"
+init_logging(Path(os.path.join(_tr, "resources/logging.yaml")))
+
+
+@pytest.fixture
+def setup_db() -> Db:
+  temp = tempfile.NamedTemporaryFile()
+  file_name = Path(temp.name)
+  temp.close()
+  engine: Engine = create_engine(f"sqlite:///{file_name.absolute()}")
+  RecordBase.metadata.create_all(engine)
+  return Db(engine)
+
+
+def movementProbe(seed: int, status: IbOrderStatus = IbOrderStatus.NEW) -> MovementRecord2:
+  nowT = datetime.datetime.now()
+  order = newOrderRecord(100 * seed, seed, nowT, "allocation", f"TestBatch::SYM{seed}", False)
+  order.order_status.status = status
+  return MovementRecord2(
+    rid=str(uuid4()),
+    at=millis_epoch(nowT),
+    status=MovementStatus.NEW,
+    batch="TestBatch",
+    ticker=f"SYM{seed} US Equity",
+    trade=100 * seed,
+    nombre=f"SYM{seed}",
+    symbol=f"SYM{seed}",
+    raw_type="Equity",
+    ibk_type=SecType.STK,
+    country=Country.US,
+    currency=Currency.USD,
+    exchange=Exchange.SMART,
+    exchange2=Exchange.NYSE,
+    contract=ContractRecord2(
+      rid=str(uuid4()),
+      at=millis_epoch(nowT),
+      expires_on=millis_epoch(nowT) + 10000,
+      con_id=seed,
+      symbol=f"SYM{seed}",
+      sec_type=SecType.STK,
+      lookup_exchange=Exchange.SMART,
+      exchange=Exchange.SMART,
+      primary_exchange=Exchange.NYSE,
+      currency=Currency.USD,
+      include_expired=False
+    ),
+    order=order
+  )
+
+
+def save(db: Db, movements: list[MovementRecord2]) -> None:
+  with db.for_work() as uow:
+    ContractRecordOps().insert([m.contract for m in movements])(uow)
+    OrderRecordOps().insert([m.order for m in movements])(uow)
+    MovementRecordOps().insert(movements)(uow)
+
+
+def known(orderRef: str, permId: int, status: str, clientId: int = 100001) -> tuple[Contract, Order, OrderState]:
+  order = Order()
+  order.orderRef = orderRef
+  order.permId = permId
+  order.clientId = clientId
+  state = OrderState()
+  state.status = status
+  return Contract(), order, state
+
+
+def test_journaled_placement(setup_db: Db) -> None:
+  save(setup_db, [movementProbe(1), movementProbe(2), movementProbe(3)])
+  with setup_db.for_work() as uow:
+    targets = list(MovementRecordOps().find_for_batch("TestBatch")(uow))
+    skipped = next(m for m in targets if m.symbol == "SYM2")
+    # Loaded before placing, as `CorvinoApp.resume_batch` does.
+    assert all(m.contract.rid for m in targets)
+    underTest = PlaceOrders(
+      setup_db, targets, OrderRecordOps(), ContractRecordOps(),
+      lambda oid, c, m, s: OpenOrderResponse(oid, c, m.order.toOrder()), "localhost", 0, 100001,
+      journal=PlacementJournal(setup_db, 100001), journal_chunk=1, alreadyPlaced={skipped.order.rid}
+    )
+    connected(underTest)
+    underTest.runCommands()
+    assert sorted(underTest.placedOrders.keys()) == [1, 2]
+    assert {1, 2} <= set(underTest.responseTracker.pending.keys())
+
+  with Db(setup_db.engine).for_work() as uow:
+    intents = list(PlacementIntentOps().for_batch("TestBatch")(uow))
+    assert sorted((i.order_ref, i.order_id) for i in intents) == [("TestBatch::SYM1", 1), ("TestBatch::SYM3", 2)]
+    orderIds = {m.symbol: m.order.orderId for m in MovementRecordOps().find_for_batch("TestBatch")(uow)}
+    assert orderIds == {"SYM1": 1, "SYM2": 0, "SYM3": 2}
+
+
+def test_known_orders() -> None:
+  underTest = KnownOrders("TestBatch::", "localhost", 0, 100001)
+  connected(underTest)
+  underTest.runCommands()
+  underTest.responseTracker.requestsComplete()
+
+  underTest.openOrder(7, *known("TestBatch::SYM1", 1007, "PreSubmitted"))
+  underTest.openOrder(8, *known("OtherBatch::SYM1", 1008, "PreSubmitted"))
+  underTest.openOrderEnd()
+  assert not underTest.done
+  underTest.completedOrder(*known("TestBatch::SYM1", 1007, "Filled"))
+  underTest.completedOrder(*known("TestBatch::SYM2", 1009, "Cancelled"))
+  underTest.completedOrdersEnd()
+
+  assert underTest.done
+  found = underTest.known
+  assert sorted(found.keys()) == ["TestBatch::SYM1", "TestBatch::SYM2"]
+  assert (found["TestBatch::SYM1"].orderId, found["TestBatch::SYM1"].status) == (7, "PreSubmitted")
+  assert (found["TestBatch::SYM2"].orderId, found["TestBatch::SYM2"].permId) == (0, 1009)
+
+
+class _KnownInProcess(KnownOrders):
+  """Reports the orders in `reported` as open in TWS, within `activate`."""
+  reported: list[tuple[int, str, int]] = []
+
+  def activate(self) -> None:
+    connected(self)
+    self.runCommands()
+    self.responseTracker.requestsComplete()
+    for orderId, orderRef, permId in self.reported:
+      self.openOrder(orderId, *known(orderRef, permId, "PreSubmitted"))
+    self.openOrderEnd()
+    self.completedOrdersEnd()
+
+  def wait_for_me(self) -> Optional[dict[str, list[ErrorResponse]]]:
+    return self.responseTracker.errorResults()
+
+
+class _PlaceInProcess(PlaceOrders):
+  """Acknowledges every order placed as TWS would, within `activate`."""
+  placed: list[str] = []
+
+  def activate(self) -> None:
+    connected(self)
+    self.statusWriter.start()
+    self.runCommands()
+    self.responseTracker.requestsComplete()
+    for oid, movement in list(self.newlyOrdered.items()):
+      _PlaceInProcess.placed.append(movement.symbol)
+      state = OrderState()
+      state.status = "PreSubmitted"
+      self.openOrder(oid, movement.contract.to_contract(), self.placedOrders[oid].toOrder(), state)
+
+  def wait_for_me(self) -> Optional[dict[str, list[ErrorResponse]]]:
+    return self.responseTracker.errorResults()
+
+
+def test_resume_batch(setup_db: Db) -> None:
+  save(setup_db, [movementProbe(1), movementProbe(2), movementProbe(3, IbOrderStatus.PRE_SUBMITTED)])
+  underTest = CorvinoApp(
+    db=setup_db,
+    contract_repo=ContractRecordOps(),
+    dnc_repo=DeltaNeutralContractOps(),
+    movements_repo=MovementRecordOps(),
+    order_repo=OrderRecordOps(),
+    appFamily=1000,
+  )
+  underTest.known_orders_proxy = _KnownInProcess
+  underTest.placement_proxy = _PlaceInProcess
+  _KnownInProcess.reported = [(7, "TestBatch::SYM1", 1007)]
+  _PlaceInProcess.placed = []
+
+  with setup_db.for_work() as uow:
+    rs = underTest.resume_batch("TestBatch", uow)
+    assert rs.message == \
+      "1 missing Orders placed, 1 already known to TWS in batch: TestBatch, 1 not known to TWS and not placed again"
+  assert _PlaceInProcess.placed == ["SYM2"]
+  with setup_db.for_work() as uow:
+    movements = {m.symbol: m for m in MovementRecordOps().find_for_batch("TestBatch")(uow)}
+    assert (movements["SYM1"].order.orderId, movements["SYM1"].order.permId) == (7, 1007)
+    assert movements["SYM1"].status == MovementStatus.CONFIRMED
+    assert movements["SYM2"].order.orderId == 1
+    assert [i.order_ref for i in PlacementIntentOps().for_batch("TestBatch")(uow)] == ["TestBatch::SYM2"]
+
+  # Resuming again places nothing twice.
+  _KnownInProcess.reported = [(7, "TestBatch::SYM1", 1007), (1, "TestBatch::SYM2", 1001)]
+  _PlaceInProcess.placed = []
+  with setup_db.for_work() as uow:
+    rs = underTest.resume_batch("TestBatch", uow)
+    assert rs.message.startswith("0 missing Orders placed, 2 already known to TWS")
+  assert _PlaceInProcess.placed == []
+
+
+def knownCompleted(reported: list[tuple[str, int, str, float]]) -> type[KnownOrders]:
+  """A `KnownOrders` that reports the orders in `reported` as completed in TWS with their filled quantity."""
+
+  class _KnownCompletedInProcess(KnownOrders):
+    def activate(self) -> None:
+      connected(self)
+      self.runCommands()
+      self.responseTracker.requestsComplete()
+      self.openOrderEnd()
+      for orderRef, permId, status, filled in reported:
+        contract, order, state = known(orderRef, permId, status)
+        order.filledQuantity = filled
+        self.completedOrder(contract, order, state)
+      self.completedOrdersEnd()
+
+    def wait_for_me(self) -> Optional[dict[str, list[ErrorResponse]]]:
+      return self.responseTracker.errorResults()
+
+  return _KnownCompletedInProcess
+
+
+class _FillInProcess(PlaceOrders):
+  """Fills every order placed at 10.0, within `activate`."""
+
+  def activate(self) -> None:
+    connected(self)
+    self.statusWriter.start()
+    self.runCommands()
+    self.responseTracker.requestsComplete()
+    for oid, movement in list(self.newlyOrdered.items()):
+      placed = self.placedOrders[oid]
+      self.orderStatus(oid, "Filled", placed.totalQuantity or 0.0, 0.0, 10.0, 0, 0, 10.0, 100001, "", 0.0)
+      state = OrderState()
+      state.status = "Filled"
+      self.openOrder(oid, movement.contract.to_contract(), placed.toOrder(), state)
+
+  def wait_for_me(self) -> Optional[dict[str, list[ErrorResponse]]]:
+    return self.responseTracker.errorResults()
+
+
+def test_resume_sliced_batch(setup_db: Db) -> None:
+  movement = movementProbe(10)
+  children = slice_order(movement.order, SlicingPolicy(slices=2), datetime.datetime.now())
+  children[0].orderId = 5
+  children[0].order_status.status = IbOrderStatus.SUBMITTED
+  save(setup_db, [movement])
+  with setup_db.for_work() as uow:
+    OrderRecordOps().insert(children)(uow)
+  underTest = CorvinoApp(
+    db=setup_db,
+    contract_repo=ContractRecordOps(),
+    dnc_repo=DeltaNeutralContractOps(),
+    movements_repo=MovementRecordOps(),
+    order_repo=OrderRecordOps(),
+    appFamily=1000,
+  )
+  # The first child filled while the placement was interrupted, the second one never reached TWS.
+  assert children[0].orderRef
+  underTest.known_orders_proxy = knownCompleted([(children[0].orderRef, 1005, "Filled", 500.0)])
+  underTest.placement_proxy = _FillInProcess
+
+  with setup_db.for_work() as uow:
+    rs = underTest.resume_batch("TestBatch", uow)
+    assert rs.message.startswith("1 missing Orders placed, 1 already known to TWS")
+  with setup_db.for_work() as uow:
+    resumed = next(iter(MovementRecordOps().find_for_batch("TestBatch")(uow)))
+    assert resumed.status == MovementStatus.COMPLETED
+    parent = resumed.order.order_status
+    assert (parent.status, parent.filled, parent.remaining) == (IbOrderStatus.FILLED, 1000.0, 0.0)
+    # TWS does not report the average price of a completed order, only the child placed again prices the fills.
+    assert parent.avg_fill_price == 10.0
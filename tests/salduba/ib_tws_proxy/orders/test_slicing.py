@@ -0,0 +1,174 @@
+import datetime
+import os
+import tempfile
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+from ibapi.order_state import OrderState  # pyright: ignore
+from sqlalchemy import Engine, create_engine
+
+from salduba.common.persistence.alchemy.db import Db
+from salduba.common.persistence.alchemy.repo import RecordBase
+from salduba.corvino.persistence.movement_record import MovementRecord2, MovementStatus
+from salduba.ib_tws_proxy.contracts.contract_repo import ContractRecord2, ContractRecordOps
+from salduba.ib_tws_proxy.domain.enumerations import Action, Country, Currency, Exchange, SecType
+from salduba.ib_tws_proxy.orders.order_status_writer import SliceProgress
+from salduba.ib_tws_proxy.orders.OrderRepo import OrderRecord2, OrderRecordOps, newOrderRecord
+from salduba.ib_tws_proxy.orders.placing_orders import OpenOrderResponse, PlaceOrders
+from salduba.ib_tws_proxy.orders.slicing import SliceFills, SlicingPolicy, slice_order
+from salduba.util.logging import init_logging
+from salduba.util.tests import connected, findTestsRoot
+from salduba.util.time import millis_epoch
+
+_maybeTr = findTestsRoot()
+_tr = _maybeTr if _maybeTr else "./"
+init_logging(Path(os.path.join(_tr, "resources/logging.yaml")))
+
+
+@pytest.fixture
+def setup_db() -> Db:
+  temp = tempfile.NamedTemporaryFile()
+  file_name = Path(temp.name)
+  temp.close()
+  engine: Engine = create_engine(f"sqlite:///{file_name.absolute()}")
+  RecordBase.metadata.create_all(engine)
+  return Db(engine)
+
+
+def slicedMovement(trade: int, slices: int) -> MovementRecord2:
+  nowT = datetime.datetime.now()
+  order = newOrderRecord(trade, 42, nowT, "allocation", "TestBatch::SYM", False)
+  slice_order(order, SlicingPolicy(slices=slices), nowT)
+  return MovementRecord2(
+    rid=str(uuid4()),
+    at=millis_epoch(nowT),
+    status=MovementStatus.NEW,
+    batch="TestBatch",
+    ticker="SYM US Equity",
+    trade=trade,
+    nombre="SYM",
+    symbol="SYM",
+    raw_type="Equity",
+    ibk_type=SecType.STK,
+    country=Country.US,
+    currency=Currency.USD,
+    exchange=Exchange.SMART,
+    exchange2=Exchange.NYSE,
+    contract=ContractRecord2(
+      rid=str(uuid4()),
+      at=millis_epoch(nowT),
+      expires_on=millis_epoch(nowT) + 10000,
+      con_id=42,
+      symbol="SYM",
+      sec_type=SecType.STK,
+      strike=0.0,
+      lookup_exchange=Exchange.SMART,
+      exchange=Exchange.SMART,
+      primary_exchange=Exchange.NYSE,
+      currency=Currency.USD,
+      include_expired=False
+    ),
+    order=order
+  )
+
+
+def test_policy_sizes() -> None:
+  assert SlicingPolicy(max_clip=300).sizes(1000) == [250, 250, 250, 250]
+  assert SlicingPolicy(slices=3).sizes(1000) == [334, 333, 333]
+  assert SlicingPolicy(max_adv_fraction=0.01).sizes(1000, adv=40_000) == [334, 333, 333]
+  # Without a known volume, the volume limit does not apply.
+  assert SlicingPolicy(max_adv_fraction=0.01).sizes(1000) == [1000]
+  assert SlicingPolicy(max_clip=500, slices=4).clip(1000) == 250
+  assert SlicingPolicy(max_clip=10).sizes(0) == []
+  with pytest.raises(ValueError):
+    SlicingPolicy(max_clip=0)
+  with pytest.raises(ValueError):
+    SlicingPolicy(max_adv_fraction=1.5)
+
+
+def test_slice_order(setup_db: Db) -> None:
+  nowT = datetime.datetime(2024, 3, 1, 15, 30)
+  parent = newOrderRecord(-1000, 42, nowT, "allocation", "Batch::SYM")
+  policy = SlicingPolicy(max_clip=400, interval=datetime.timedelta(minutes=10))
+  children = slice_order(parent, policy, nowT)
+
+  assert [c.totalQuantity for c in children] == [334, 333, 333]
+  assert all(c.action == Action.SELL and c.referenceContractId == 42 for c in children)
+  assert [c.orderRef for c in children] == ["Batch::SYM#1/3", "Batch::SYM#2/3", "Batch::SYM#3/3"]
+  assert [c.goodAfterTime for c in children] == [None, "20240301 15:40:00", "20240301 15:50:00"]
+  assert not slice_order(newOrderRecord(100, 42, nowT, "allocation", "Batch::SMALL"), policy, nowT)
+
+  with setup_db.for_work() as uow:
+    OrderRecordOps().insert([parent] + children)(uow)
+  with setup_db.for_work() as uow:
+    stored = list(OrderRecordOps().slices_of(parent.rid)(uow))
+    assert [s.orderRef for s in stored] == [c.orderRef for c in children]
+
+  # With 10 slices or more the references still sort in the order of the slices.
+  many = newOrderRecord(1200, 42, nowT, "allocation", "Batch::MANY")
+  slices = slice_order(many, SlicingPolicy(slices=12), nowT)
+  assert [c.orderRef for c in slices][8:10] == ["Batch::MANY#09/12", "Batch::MANY#10/12"]
+  with setup_db.for_work() as uow:
+    OrderRecordOps().insert([many] + slices)(uow)
+  with setup_db.for_work() as uow:
+    assert [s.orderRef for s in OrderRecordOps().slices_of(many.rid)(uow)] == [c.orderRef for c in slices]
+    loaded = OrderRecordOps().find_one(lambda q: q.where(OrderRecord2.rid == many.rid))(uow)
+    assert loaded and [s.orderRef for s in loaded.slices] == [c.orderRef for c in slices]
+
+
+def test_slice_fills() -> None:
+  nowT = datetime.datetime.now()
+  parent = newOrderRecord(1000, 42, nowT, "allocation", "Batch::SYM")
+  slice_order(parent, SlicingPolicy(slices=2), nowT)
+  underTest = SliceFills(parent)
+  assert underTest.status == "PendingSubmit"
+
+  underTest.update(1, "Submitted", 200, 10.0)
+  underTest.update(2, "PreSubmitted", 0, 0.0)
+  assert underTest.status == "Submitted"
+  assert underTest.filled == 200 and underTest.remaining == 800
+
+  underTest.update(1, "Filled", 500, 10.0)
+  underTest.update(2, "Submitted", 0, 0.0)
+  # A filled child does not fill the parent while quantity remains.
+  assert underTest.status == "Submitted" and underTest.remaining == 500.0
+  underTest.update(2, "Submitted", 250, 12.0)
+  assert underTest.status == "Submitted" and underTest.remaining == 250.0
+  assert underTest.avg_fill_price == pytest.approx((500 * 10.0 + 250 * 12.0) / 750)
+  underTest.update(2, "Cancelled", 250, 12.0)
+  assert underTest.status == "Cancelled"
+
+  underTest.update(2, "Filled", 500, 12.0)
+  assert underTest.status == "Filled" and underTest.remaining == 0
+
+
+def test_sliced_placement_status(setup_db: Db) -> None:
+  movement = slicedMovement(1000, 2)
+  underTest = PlaceOrders(
+    setup_db, [movement], OrderRecordOps(), ContractRecordOps(),
+    lambda oid, c, m, s: OpenOrderResponse(oid, c, m.order.toOrder()), "localhost", 0, 100001
+  )
+  connected(underTest)
+  underTest.runCommands()
+  assert sorted(underTest.newlyOrdered.keys()) == [1, 2]
+
+  def status(orderId: int, status: str, filled: float, avgFillPrice: float) -> None:
+    remaining = 500.0 - filled
+    underTest.orderStatus(orderId, status, filled, remaining, avgFillPrice, 0, 0, avgFillPrice, 100001, "", 0.0)
+
+  statuses: list[MovementStatus] = []
+  status(1, "Filled", 500, 10.0)
+  status(2, "Submitted", 0, 0.0)
+  statuses.append(movement.status)
+  # A late acknowledgement of a child does not replace the aggregate status of the movement.
+  state = OrderState()
+  state.status = "PreSubmitted"
+  underTest.openOrder(2, movement.contract.to_contract(), underTest.placedOrders[2].toOrder(), state)
+  statuses.append(movement.status)
+
+  status(2, "Filled", 500, 12.0)
+  statuses.append(movement.status)
+  assert statuses == [MovementStatus.IN_PROGRESS, MovementStatus.IN_PROGRESS, MovementStatus.COMPLETED]
+  progress = [e for e in list(underTest.statusWriter._queue.queue) if isinstance(e, SliceProgress)]
+  assert [(p.status, p.remaining) for p in progress] == [("Submitted", 500.0), ("Submitted", 500.0), ("Filled", 0.0)]
@@ -0,0 +1,178 @@
+import datetime
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+from uuid import uuid4
+
+import pytest
+from ibapi.contract import Contract  # pyright: ignore
+from sqlalchemy import Engine, create_engine
+
+from salduba.common.persistence.alchemy.db import Db
+from salduba.common.persistence.alchemy.repo import RecordBase
+from salduba.corvino.persistence.movement_record import MovementRecord2, MovementRecordOps, MovementStatus
+from salduba.corvino.services.app import CorvinoApp
+from salduba.corvino.services.positions import PositionIssue
+from salduba.ib_tws_proxy.contracts.contract_repo import ContractRecord2, ContractRecordOps, DeltaNeutralContractOps
+from salduba.ib_tws_proxy.domain.enumerations import Country, Currency, Exchange, SecType
+from salduba.ib_tws_proxy.executions.execution_repo import ExecutionRecordOps
+from salduba.ib_tws_proxy.operations import ErrorResponse
+from salduba.ib_tws_proxy.orders.OrderRepo import OrderRecordOps, newOrderRecord
+from salduba.ib_tws_proxy.positions.position_repo import PositionRecordOps
+from salduba.ib_tws_proxy.positions.positions_proxy import PositionsProxy
+from salduba.util.logging import init_logging
+from salduba.util.tests import connected, findTestsRoot
+from salduba.util.time import millis_epoch
+
+_maybeTr = findTestsRoot()
+_tr = _maybeTr if _maybeTr else "./"
+init_logging(Path(os.path.join(_tr, "resources/logging.yaml")))
+
+
+@pytest.fixture
+def setup_db() -> Db:
+  temp = tempfile.NamedTemporaryFile()
+  file_name = Path(temp.name)
+  temp.close()
+  engine: Engine = create_engine(f"sqlite:///{file_name.absolute()}")
+  RecordBase.metadata.create_all(engine)
+  return Db(engine)
+
+
+def contract(conId: int) -> Contract:
+  c = Contract()
+  c.conId = conId
+  c.symbol = f"SYM{conId}"
+  c.secType = "STK"
+  c.currency = "USD"
+  return c
+
+
+def movementProbe(seed: int, trade: int) -> MovementRecord2:
+  nowT = datetime.datetime.now()
+  return MovementRecord2(
+    rid=str(uuid4()),
+    at=millis_epoch(nowT),
+    status=MovementStatus.CONFIRMED,
+    batch="TestBatch",
+    ticker=f"SYM{seed} US Equity",
+    trade=trade,
+    nombre=f"SYM{seed}",
+    symbol=f"SYM{seed}",
+    raw_type="Equity",
+    ibk_type=SecType.STK,
+    country=Country.US,
+    currency=Currency.USD,
+    exchange=Exchange.SMART,
+    exchange2=Exchange.NYSE,
+    contract=ContractRecord2(
+      rid=str(uuid4()),
+      at=millis_epoch(nowT),
+      expires_on=millis_epoch(nowT) + 10000,
+      con_id=seed,
+      symbol=f"SYM{seed}",
+      sec_type=SecType.STK,
+      lookup_exchange=Exchange.SMART,
+      exchange=Exchange.SMART,
+      primary_exchange=Exchange.NYSE,
+      currency=Currency.USD,
+      include_expired=False
+    ),
+    order=newOrderRecord(trade, seed, nowT, "DU0000001", f"TestBatch::SYM{seed} US Equity", False, seed)
+  )
+
+
+def executionRow(orderRef: str, side: str, shares: float) -> dict[str, object]:
+  return {
+    'rid': str(uuid4()), 'at': 0, 'exec_id': str(uuid4()), 'exec_time': "20240301 15:30:00", 'account': "DU0000001",
+    'order_id': 1, 'perm_id': 1, 'client_id': 100001, 'order_ref': orderRef, 'con_id': 1, 'symbol': "SYM",
+    'sec_type': "STK", 'currency': "USD", 'exchange': "NYSE", 'side': side, 'shares': shares, 'price': 10.0,
+    'cum_qty': shares, 'avg_price': 10.0, 'liquidation': 0, 'last_liquidity': 0
+  }
+
+
+def test_positions_snapshot() -> None:
+  underTest = PositionsProxy(12345, "localhost", 0, 100001)
+  connected(underTest)
+  underTest.runCommands()
+  underTest.responseTracker.requestsComplete()
+
+  underTest.position("DU0000001", contract(1), 100.0, 10.0)
+  underTest.position("DU0000002", contract(1), -20.0, 11.0)
+  assert not underTest.done
+  underTest.positionEnd()
+  # An update after the end of the snapshot is not part of it.
+  underTest.position("DU0000001", contract(2), 5.0, 1.0)
+
+  assert underTest.done
+  assert [(p['account'], p['con_id'], p['position'], p['expires_on']) for p in underTest.positions] == [
+    ("DU0000001", 1, 100.0, 12345), ("DU0000002", 1, -20.0, 12345)
+  ]
+
+
+class _PositionsInProcess(PositionsProxy):
+  """Reports `reported` as the positions of the accounts, within `activate`."""
+  reported: list[tuple[str, int, float]] = []
+  sessions = 0
+
+  def activate(self) -> None:
+    _PositionsInProcess.sessions += 1
+    connected(self)
+    self.runCommands()
+    self.responseTracker.requestsComplete()
+    for account, conId, position in self.reported:
+      self.position(account, contract(conId), position, 10.0)
+    self.positionEnd()
+
+  def wait_for_me(self) -> Optional[dict[str, list[ErrorResponse]]]:
+    return self.responseTracker.errorResults()
+
+
+def test_check_positions(setup_db: Db) -> None:
+  movements = [movementProbe(1, -150), movementProbe(2, -10), movementProbe(3, 50), movementProbe(4, -30),
+               movementProbe(5, 40)]
+  with setup_db.for_work() as uow:
+    ContractRecordOps().insert([m.contract for m in movements])(uow)
+    OrderRecordOps().insert([m.order for m in movements])(uow)
+    MovementRecordOps().insert(movements)(uow)
+    ExecutionRecordOps().insert_rows([
+      executionRow("TestBatch::SYM3 US Equity", "BOT", 50.0),
+      executionRow("TestBatch::SYM5 US Equity#1/2", "BOT", 25.0),
+      executionRow("OtherBatch::SYM5 US Equity", "SLD", 25.0),
+    ], [])(uow)
+  underTest = CorvinoApp(
+    db=setup_db,
+    contract_repo=ContractRecordOps(),
+    dnc_repo=DeltaNeutralContractOps(),
+    movements_repo=MovementRecordOps(),
+    order_repo=OrderRecordOps(),
+    appFamily=1000,
+  )
+  underTest.positions_proxy = _PositionsInProcess
+  _PositionsInProcess.reported = [("DU0000001", 1, 100.0), ("DU0000002", 1, 500.0), ("DU0000001", 4, 30.0)]
+  _PositionsInProcess.sessions = 0
+
+  with setup_db.for_work() as uow:
+    rs = underTest.check_positions("TestBatch", uow, "DU0000001")
+  assert rs.message == "2 of 5 Movements would leave a short position, 1 already executed in batch: TestBatch"
+  checks = {c.symbol: c for c in rs.positions}
+  assert (checks["SYM1"].issue, checks["SYM1"].position, checks["SYM1"].resulting) == (PositionIssue.OVER_SELL, 100.0, -50.0)
+  assert (checks["SYM2"].issue, checks["SYM2"].resulting) == (PositionIssue.SHORT, -10.0)
+  assert (checks["SYM3"].issue, checks["SYM3"].remaining) == (PositionIssue.EXECUTED, 0.0)
+  assert checks["SYM4"].issue is None
+  assert (checks["SYM5"].issue, checks["SYM5"].executed) == (PositionIssue.PARTIALLY_EXECUTED, 25.0)
+
+  # The snapshot is reused while valid, across all the accounts without an allocation.
+  with setup_db.for_work() as uow:
+    rs = underTest.check_positions("TestBatch", uow)
+    assert {c.symbol: c.issue for c in rs.positions}["SYM1"] is None
+    assert len(list(PositionRecordOps().current(millis_epoch(datetime.datetime.now()))(uow))) == 3
+  assert _PositionsInProcess.sessions == 1
+
+  _PositionsInProcess.reported = [("DU0000001", 1, 200.0)]
+  with setup_db.for_work() as uow:
+    rs = underTest.check_positions("TestBatch", uow, "DU0000001", refresh=True)
+    assert {c.symbol: c.issue for c in rs.positions}["SYM1"] is None
+    assert len(list(PositionRecordOps().current(millis_epoch(datetime.datetime.now()))(uow))) == 1
+  assert _PositionsInProcess.sessions == 2
@@ -0,0 +1,56 @@
+import logging
+import logging.handlers
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import yaml
+
+from salduba.util import logging as salduba_logging
+from salduba.util.logging import init_logging, stop_queue_listeners
+from salduba.util.tests import findTestsRoot
+
+_maybeTr = findTestsRoot()
+_tr = _maybeTr if _maybeTr else "./"
+_test_config = Path(_tr, "resources/logging.yaml")
+
+
+def test_queued_handlers_do_not_block_callers() -> None:
+  with open(_test_config) as f:
+    config = yaml.safe_load(f)
+  config['queue'] = {'loggers': ['root']}
+  release = threading.Event()
+  emitted: list[tuple[str, str]] = []
+
+  class Blocking(logging.Handler):
+    def emit(self, record: logging.LogRecord) -> None:
+      release.wait(10)
+      emitted.append((threading.current_thread().name, record.getMessage()))
+
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    config_file = Path(tmp_dir, "logging.yaml")
+    with open(config_file, 'w') as f:
+      yaml.safe_dump(config, f)
+    try:
+      init_logging(config_file)
+      root = logging.getLogger()
+      assert len(root.handlers) == 1 and isinstance(root.handlers[0], logging.handlers.QueueHandler)
+      listener = salduba_logging._listeners[-1]
+      assert [type(h) for h in listener.handlers] == [logging.StreamHandler]
+      listener.handlers = (Blocking(),)
+
+      start = time.perf_counter()
+      logging.getLogger("test_logging").warning("Order %s is %s", 101, "Filled")
+      assert time.perf_counter() - start < 1.0
+      assert not emitted
+
+      release.set()
+      stop_queue_listeners()
+      assert len(emitted) == 1
+      assert emitted[0][0] != threading.current_thread().name
+      assert emitted[0][1] == "Order 101 is Filled"
+    finally:
+      release.set()
+      init_logging(_test_config)
+  assert not salduba_logging._listeners
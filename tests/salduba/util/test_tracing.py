@@ -0,0 +1,54 @@
+import json
+import tempfile
+import threading
+from pathlib import Path
+
+from salduba.ib_tws_proxy.operations import OperationsTracker, SuccessResponse
+from salduba.util import tracing
+
+
+def test_spans_are_noop_unless_started() -> None:
+  assert tracing.active() is None
+  with tracing.span("ignored"):
+    tracing.begin("ignored", 1)
+    tracing.end("ignored", 1)
+  assert tracing.stop() is None
+
+
+def test_exports_cross_thread_timeline() -> None:
+  tracer = tracing.start()
+  try:
+    tracker = OperationsTracker()
+    tracker.syncOpId(10)
+
+    def commander() -> None:
+      with tracing.span("run commands", "tws"):
+        tracker.nextOpId()
+        tracker.request("reqContractDetails", "msg")
+
+    def listener() -> None:
+      tracker.complete(SuccessResponse(10))
+
+    with tracing.span("place orders", batch="B1"):
+      for target, name in [(commander, "Proxy::Commander::1"), (listener, "Proxy::Listener::1")]:
+        thread = threading.Thread(target=target, name=name)
+        thread.start()
+        thread.join()
+  finally:
+    assert tracing.stop() is tracer
+
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    with open(tracer.write(Path(tmp_dir, "run.trace.json"))) as f:
+      events = json.load(f)['traceEvents']
+
+  threads = {e['tid']: e['args']['name'] for e in events if e['ph'] == 'M'}
+  by_phase = {(e['ph'], e['name']): e for e in events if e['ph'] != 'M'}
+  outer, inner = by_phase[('X', 'place orders')], by_phase[('X', 'run commands')]
+  assert outer['args'] == {'batch': 'B1'}
+  assert outer['ts'] <= inner['ts'] and inner['ts'] + inner['dur'] <= outer['ts'] + outer['dur']
+  assert threads[inner['tid']] == "Proxy::Commander::1"
+  request, response = by_phase[('b', 'reqContractDetails')], by_phase[('e', 'reqContractDetails')]
+  assert request['id'] == response['id'] == 10
+  assert threads[request['tid']] == "Proxy::Commander::1"
+  assert threads[response['tid']] == "Proxy::Listener::1"
+  assert request['ts'] <= response['ts']
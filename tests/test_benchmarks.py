@@ -0,0 +1,16 @@
+import pytest
+
+from benchmarks.compare import compare
+from benchmarks.run import cases, run_suite
+
+
+@pytest.mark.benchmark
+def test_suite_runs() -> None:
+  results = run_suite([100], repeat=1, memory=False, label="smoke")
+  assert results['label'] == "smoke"
+  assert [r['case'] for r in results['results']] == [c.name for c in cases]
+  for r in results['results']:
+    assert r['rows'] == 100 and len(r['times']) == 1 and r['best'] > 0
+
+  slower = {'label': "slower", 'results': [dict(r, best=2 * r['best']) for r in results['results']]}
+  assert [ratio for _, _, _, _, ratio in compare(results, slower)] == pytest.approx([2.0] * len(cases))